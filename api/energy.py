@@ -3,15 +3,33 @@
 from __future__ import annotations
 
 from flask import Blueprint, jsonify, request
-from utils.db_utils import fetch_query
+from utils import dataset_version
+from utils.cache import SWRCache
+from utils.columnar import fetcher
+from utils.cube import cube_for
+from utils.singleflight import fetch_rows_cached, fetch_rows_shared
+from utils.filters import SEASONS, filter_months, filters_to_sql, parse_filters
+from utils.classify import BREAKS_CACHE, compute_breaks, parse_breaks_args, with_breaks
+from utils.pagination import is_paged, parse_page_args, page_clauses, page_response, wants
 
 energy_bp = Blueprint("energy", __name__)
 
 ALLOWED_LEVELS = {"comune", "province", "region"}
 ALLOWED_RES = {"hourly", "monthly", "annual"}
 ALLOWED_DAY_TYPES = {"weekday", "weekend"}
+ALLOWED_SEASONS = set(SEASONS)
 ALLOWED_DOMAINS = {"consumption", "production", "future_production"}
 
+# keys of a /values item, in response order (usable in fields=)
+VALUE_FIELDS = [
+    "territory_id", "name", "reg_cod", "prov_cod", "mun_cod",
+    "value_mwh", "domain", "base_group", "category_code",
+]
+
+# /values rows per (query, params); filled ahead of time by utils/warmup.py
+_VALUES_CACHE = SWRCache("charts_values", soft_ttl=600, hard_ttl=3600, max_entries=256,
+                         version=dataset_version.current)
+
 
 def _pick_data_source(level: str, resolution: str) -> str:
     if level == "comune":
@@ -41,16 +59,40 @@ def _pick_data_source(level: str, resolution: str) -> str:
     raise ValueError("Unsupported level/resolution")
 
 
+def _cube(level: str, resolution: str, domain: str):
+    """In-memory cube for the agg_* source of this request, or None to query SQL (utils/cube.py)."""
+    if domain == "future_production":
+        return None
+    return cube_for(level, resolution)
+
+
+def _validate_filters(filters: dict, resolution: str) -> str | None:
+    if not filters["years"]:
+        return "Missing year"
+    # monthly / annual rows have no hour: the filter would silently match nothing
+    if filters["hours"] and resolution != "hourly":
+        return "hour filters require resolution=hourly"
+    if any(dt not in ALLOWED_DAY_TYPES for dt in filters["day_types"]):
+        return "Invalid day_type"
+    if any(se not in ALLOWED_SEASONS for se in filters["seasons"]):
+        return "Invalid season"
+    if any(not (1 <= m <= 12) for m in filters["months"]):
+        return "Invalid month"
+    return None
+
+
 def _build_where(
     level: str,
     resolution: str,
-    year: int,
+    years: list[int],
     domain: str,
     scenario: str,
-    day_type: str | None,
+    day_types: list[str],
     base_group: str,
     category_code: str,
-    month: int | None,
+    months: list[int],
+    seasons: list[str] | None = None,
+    hours: list[int] | None = None,
 ):
     data_source = _pick_data_source(level, resolution)
 
@@ -61,21 +103,21 @@ def _build_where(
     where_parts = [
         "t.level = %s",
         "f.time_resolution = %s",
-        "tm.year = %s",
         "ec.domain = %s",
         "sc.code = %s",
     ]
-    params = [level, resolution, year, domain_for_ec, scenario]
-
-    # day_type OPTIONAL
-    if day_type is not None:
-        where_parts.append("tm.day_type = %s")
-        params.append(day_type)
-
-    # month OPTIONAL
-    if month is not None:
-        where_parts.append("tm.month = %s")
-        params.append(month)
+    params = [level, resolution, domain_for_ec, scenario]
+
+    # year REQUIRED; month / season / day_type / hour OPTIONAL (seasons narrow to their months)
+    time_sql, time_params = filters_to_sql({
+        "years": years,
+        "months": months,
+        "seasons": seasons,
+        "day_types": day_types,
+        "hours": hours,
+    })
+    where_parts.append(time_sql)
+    params += time_params
 
     if is_future:
         where_parts.append("f.data_source LIKE 'future_production_%'")
@@ -99,15 +141,15 @@ def _build_where(
 
 
 @energy_bp.get("/values")
+@dataset_version.etagged
 def choropleth_values_only():
     level = (request.args.get("level") or "").lower().strip()
     resolution = (request.args.get("resolution") or "").lower().strip()
     domain = (request.args.get("domain") or "").lower().strip()
     scenario = (request.args.get("scenario") or "0").strip()
-    year = request.args.get("year", type=int)
 
-    day_type = request.args.get("day_type")
-    day_type = day_type.lower().strip() if day_type else None
+    # year / month / season / day_type / hour may be repeated
+    filters = parse_filters()
 
     base_group = (request.args.get("base_group") or "").lower().strip()
     category_code = (request.args.get("category_code") or "").strip()
@@ -117,12 +159,18 @@ def choropleth_values_only():
         return jsonify({"error": "Invalid level"}), 400
     if resolution not in ALLOWED_RES:
         return jsonify({"error": "Invalid resolution"}), 400
-    if not year:
-        return jsonify({"error": "Missing year"}), 400
     if domain not in ALLOWED_DOMAINS:
         return jsonify({"error": "Invalid domain"}), 400
-    if day_type is not None and day_type not in ALLOWED_DAY_TYPES:
-        return jsonify({"error": "Invalid day_type"}), 400
+    err = _validate_filters(filters, resolution)
+    if err:
+        return jsonify({"error": err}), 400
+
+    page, err = parse_page_args(request.args, VALUE_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+    breaks_spec, err = parse_breaks_args(request.args)
+    if err:
+        return jsonify({"error": err}), 400
 
     if level == "comune":
         name_expr = "t.municipality_name"
@@ -134,62 +182,134 @@ def choropleth_values_only():
     where_sql, params = _build_where(
         level=level,
         resolution=resolution,
-        year=year,
+        years=filters["years"],
         domain=domain,
         scenario=scenario,
-        day_type=day_type,
+        day_types=filters["day_types"],
         base_group=base_group,
         category_code=category_code,
-        month=None,
+        months=filters["months"],
+        seasons=filters["seasons"],
+        hours=filters["hours"],
     )
 
+    # projection: only select (and group by) the territory columns asked for
+    dim_exprs = {
+        "name": name_expr,
+        "reg_cod": "t.reg_cod",
+        "prov_cod": "t.prov_cod",
+        "mun_cod": "t.mun_cod",
+    }
+    dim_cols = [c for c in dim_exprs if wants(page, c)]
+    select_dims = "".join(f"{dim_exprs[c]} AS {c},\n        " for c in dim_cols)
+    group_dims = "".join(f", {dim_exprs[c]}" for c in dim_cols)
+
+    page_where, page_tail, page_params = page_clauses(page, "value_mwh")
+
     sql = f"""
-    SELECT
-      t.id AS territory_id,
-      {name_expr} AS name,
-      t.reg_cod,
-      t.prov_cod,
-      t.mun_cod,
-      SUM(f.value_mwh) AS value_mwh
-    FROM energy_dw.fact_energy f
-    JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
-    JOIN energy_dw.dim_time tm ON tm.id = f.time_id
-    JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
-    JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
-    WHERE {where_sql}
-    GROUP BY t.id, {name_expr}, t.reg_cod, t.prov_cod, t.mun_cod
-    ORDER BY t.id;
+    SELECT *
+    FROM (
+      SELECT
+        t.id AS territory_id,
+        {select_dims}COALESCE(SUM(f.value_mwh), 0) AS value_mwh
+      FROM energy_dw.fact_energy f
+      JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+      JOIN energy_dw.dim_time tm ON tm.id = f.time_id
+      JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
+      JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
+      WHERE {where_sql}
+      GROUP BY t.id{group_dims}
+    ) q
+    WHERE {page_where}
+    {page_tail};
     """
 
-    rows = fetch_query(sql, tuple(params))
-    out = [
-        {
-            "territory_id": r["territory_id"],
-            "name": r["name"],
-            "reg_cod": r["reg_cod"],
-            "prov_cod": r["prov_cod"],
-            "mun_cod": r["mun_cod"],
-            "value_mwh": float(r["value_mwh"]) if r["value_mwh"] is not None else 0.0,
-            "domain": domain,
-            "base_group": base_group if base_group else None,
-            "category_code": category_code if category_code else None,
-        }
-        for r in rows
+    cube = _cube(level, resolution, domain)
+    if cube is not None and not is_paged(page):
+        cols, rows = cube.values_by_territory(
+            scenario, filters["years"], domain, base_group, category_code,
+            filter_months(filters["months"], filters["seasons"]), filters["day_types"], filters["hours"],
+            dim_cols, page["order_by"], page["order"],
+        )
+    else:
+        cols, rows = fetch_rows_cached(_VALUES_CACHE, sql, tuple(params + page_params), fetcher("charts_values"))
+    col = {c: i for i, c in enumerate(cols)}
+    i_value = col["value_mwh"]
+
+    const = [
+        (k, v) for k, v in (
+            ("domain", domain),
+            ("base_group", base_group if base_group else None),
+            ("category_code", category_code if category_code else None),
+        )
+        if wants(page, k)
     ]
-    return jsonify(out)
+    # (item key, row index) in response order
+    picks = [(k, col[k]) for k in ("territory_id", *dim_cols)]
+    if wants(page, "value_mwh"):
+        picks.append(("value_mwh", i_value))
+
+    out = []
+    for r in rows:
+        item = {k: r[i] for k, i in picks}
+        if "value_mwh" in item and item["value_mwh"] is None:
+            item["value_mwh"] = 0.0
+        item.update(const)
+        out.append(item)
+
+    last_row = None
+    if rows:
+        last_row = {"territory_id": rows[-1][col["territory_id"]], "value_mwh": rows[-1][i_value]}
+    resp = page_response(out, page, "value_mwh", last_row)
+
+    if breaks_spec:
+        def _all_values():
+            if not is_paged(page):
+                return [r[i_value] for r in rows]
+            # a page only holds part of the level: classify the full value set
+            vals_sql = f"""
+            SELECT COALESCE(SUM(f.value_mwh), 0) AS value_mwh
+            FROM energy_dw.fact_energy f
+            JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+            JOIN energy_dw.dim_time tm ON tm.id = f.time_id
+            JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
+            JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
+            WHERE {where_sql}
+            GROUP BY t.id;
+            """
+            return [r[0] for r in fetch_rows_shared(vals_sql, tuple(params), fetcher("charts_values"))[1]]
+
+        breaks_key = (
+            "charts_values", level, resolution, domain, scenario, base_group, category_code,
+            *(tuple(sorted(set(filters[k]))) for k in ("years", "months", "seasons", "day_types", "hours")),
+            breaks_spec["classes"], breaks_spec["methods"],
+        )
+        breaks = BREAKS_CACHE.get_or_compute(
+            breaks_key,
+            lambda: compute_breaks(_all_values(), breaks_spec["classes"], breaks_spec["methods"]),
+        )
+        resp = with_breaks(resp, breaks)
+
+    return jsonify(resp)
 
 
 @energy_bp.get("/series")
+@dataset_version.etagged
 def chart_series():
+    """
+    GET /charts/series?level=province&province_code=1&resolution=monthly&domain=consumption&year=2019
+
+    year, month, season, day_type and hour may be repeated. A repeated filter
+    that is not already the x axis becomes an extra grouping key on each
+    point, e.g. year=2019&year=2020 -> [{"year": 2019, "x": 1, ...}, ...],
+    so multi-year trends are a single request and a single query.
+    """
     level = (request.args.get("level") or "").lower().strip()
     resolution = (request.args.get("resolution") or "").lower().strip()
     domain = (request.args.get("domain") or "").lower().strip()
     scenario = (request.args.get("scenario") or "0").strip()
-    year = request.args.get("year", type=int)
 
-    month = request.args.get("month", type=int)
-    day_type = request.args.get("day_type")
-    day_type = day_type.lower().strip() if day_type else None
+    filters = parse_filters()
 
     base_group = (request.args.get("base_group") or "").lower().strip()
     category_code = (request.args.get("category_code") or "").strip()
@@ -199,12 +319,11 @@ def chart_series():
         return jsonify({"error": "Invalid level"}), 400
     if resolution not in {"hourly", "monthly", "annual"}:
         return jsonify({"error": "Invalid resolution"}), 400
-    if not year:
-        return jsonify({"error": "Missing year"}), 400
     if domain not in ALLOWED_DOMAINS:
         return jsonify({"error": "Invalid domain"}), 400
-    if day_type is not None and day_type not in ALLOWED_DAY_TYPES:
-        return jsonify({"error": "Invalid day_type"}), 400
+    err = _validate_filters(filters, resolution)
+    if err:
+        return jsonify({"error": err}), 400
 
     # code per level
     if level == "comune":
@@ -223,13 +342,15 @@ def chart_series():
     where_sql, params = _build_where(
         level=level,
         resolution=resolution,
-        year=year,
+        years=filters["years"],
         domain=domain,
         scenario=scenario,
-        day_type=day_type,
+        day_types=filters["day_types"],
         base_group=base_group,
         category_code=category_code,
-        month=month,
+        months=filters["months"],
+        seasons=filters["seasons"],
+        hours=filters["hours"],
     )
 
     # apply code filter
@@ -237,62 +358,56 @@ def chart_series():
     params.append(code)
 
     if resolution == "hourly":
-        sql = f"""
-            SELECT
-              tm.hour AS x,
-              SUM(f.value_mwh) AS value_mwh
-            FROM energy_dw.fact_energy f
-            JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
-            JOIN energy_dw.dim_time tm ON tm.id = f.time_id
-            JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
-            JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
-            WHERE {where_sql}
-              AND tm.hour IS NOT NULL
-            GROUP BY tm.hour
-            ORDER BY tm.hour;
-        """
-
+        x_expr = "tm.hour"
+        x_where = "tm.hour IS NOT NULL"
     elif resolution == "monthly":
-        sql = f"""
-            SELECT
-              tm.month AS x,
-              SUM(f.value_mwh) AS value_mwh
-            FROM energy_dw.fact_energy f
-            JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
-            JOIN energy_dw.dim_time tm ON tm.id = f.time_id
-            JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
-            JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
-            WHERE {where_sql}
-              AND tm.month IS NOT NULL
-              AND tm.hour IS NULL
-            GROUP BY tm.month
-            ORDER BY tm.month;
-        """
-
+        x_expr = "tm.month"
+        x_where = "tm.month IS NOT NULL AND tm.hour IS NULL"
     else:  # annual
-        sql = f"""
-            SELECT
-              tm.year AS x,
-              SUM(f.value_mwh) AS value_mwh
-            FROM energy_dw.fact_energy f
-            JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
-            JOIN energy_dw.dim_time tm ON tm.id = f.time_id
-            JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
-            JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
-            WHERE {where_sql}
-              AND tm.month IS NULL
-              AND tm.hour IS NULL
-            GROUP BY tm.year
-            ORDER BY tm.year;
-        """
-
-    rows = fetch_query(sql, tuple(params))
-    return jsonify(
-        [
-            {
-                "x": int(r["x"]) if r["x"] is not None else None,
-                "value_mwh": float(r["value_mwh"]) if r["value_mwh"] is not None else 0.0,
-            }
-            for r in rows
-        ]
-    )
+        x_expr = "tm.year"
+        x_where = "tm.month IS NULL AND tm.hour IS NULL"
+
+    # repeated filters that are not the x axis -> extra group keys
+    group_exprs = {}
+    if len(set(filters["years"])) > 1 and resolution != "annual":
+        group_exprs["year"] = "tm.year"
+    if len(set(filters["months"])) > 1 and resolution == "hourly":
+        group_exprs["month"] = "tm.month"
+    if len(set(filters["seasons"])) > 1 and resolution == "hourly":
+        group_exprs["season"] = "tm.season"
+    if len(set(filters["day_types"])) > 1:
+        group_exprs["day_type"] = "tm.day_type"
+
+    select_groups = "".join(f"{e} AS {k},\n              " for k, e in group_exprs.items())
+    group_by = ", ".join([*group_exprs.values(), x_expr])
+
+    sql = f"""
+        SELECT
+          {select_groups}{x_expr} AS x,
+          SUM(f.value_mwh) AS value_mwh
+        FROM energy_dw.fact_energy f
+        JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+        JOIN energy_dw.dim_time tm ON tm.id = f.time_id
+        JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
+        JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
+        WHERE {where_sql}
+          AND {x_where}
+        GROUP BY {group_by}
+        ORDER BY {group_by};
+    """
+
+    cube = _cube(level, resolution, domain)
+    if cube is not None:
+        rows = cube.series(
+            scenario, filters["years"], domain, base_group, category_code,
+            filter_months(filters["months"], filters["seasons"]), filters["day_types"], filters["hours"],
+            code_field.removeprefix("t."), code, list(group_exprs),
+        )
+    else:
+        _, rows = fetch_rows_shared(sql, tuple(params), fetcher("charts_series"))
+    keys = [*group_exprs, "x", "value_mwh"]
+    out = [dict(zip(keys, r)) for r in rows]
+    for p in out:
+        if p["value_mwh"] is None:
+            p["value_mwh"] = 0.0
+    return jsonify(out)
@@ -3,14 +3,51 @@
 
 from __future__ import annotations
 
+import time
+
+import numpy as np
 from flask import Blueprint, jsonify, request
 from utils.db_utils import fetch_query, execute_query, bulk_insert_values
+from utils.singleflight import fetch_query_cached, fetch_query_shared, fetch_rows_shared
+from utils import dataset_version, indicators
+from utils.sweep import run_sweep
+from utils.cache import SWRCache
+from utils.cube import cube_for
+from utils.classify import BREAKS_CACHE, compute_breaks, parse_breaks_args, with_breaks
+from utils.pagination import is_paged, parse_page_args, page_clauses, page_response, wants
 
 scenarios_bp = Blueprint("scenarios", __name__)
 
 ALLOWED_LEVELS = {"comune", "province", "region"}
 ALLOWED_RES = {"annual", "monthly", "seasonal"}
 
+# keys of a /values item, in response order (usable in fields=)
+VALUE_FIELDS = [
+    "territory_id", "name", "reg_cod", "prov_cod", "mun_cod",
+    "param_key", "value", "unit", "meta",
+]
+
+MAX_RANKING_N = 500
+MAX_HISTOGRAM_BUCKETS = 100
+MAX_SWEEP_UPLIFTS = 101
+MAX_SWEEP_COMBINATIONS = 16
+# indicator curves a sweep returns when no param_key is given
+DEFAULT_SWEEP_KEYS = ["self_sufficiency_index", "self_consumption_index", "over_production_index"]
+
+# ranking results per (scenario, year, level, param_key, n, buckets, percentiles)
+_RANKING_CACHE = SWRCache("scenario_ranking", soft_ttl=600, hard_ttl=3600, version=dataset_version.current)
+# comparisons per (level, a, b, year, param_key)
+_COMPARE_CACHE = SWRCache("scenario_compare", soft_ttl=600, hard_ttl=3600, version=dataset_version.current)
+# /values rows per (query, params)
+_VALUES_CACHE = SWRCache("scenario_values", soft_ttl=600, hard_ttl=3600, max_entries=256,
+                         version=dataset_version.current)
+# sweep results per (level, year, base, time_resolution, uplifts, combinations, keys)
+_SWEEP_CACHE = SWRCache("scenario_sweep", soft_ttl=600, hard_ttl=3600, max_entries=32,
+                        version=dataset_version.current)
+# scenario list and param keys (dimension lookups)
+_DIM_CACHE = SWRCache("scenario_dims", soft_ttl=3600, hard_ttl=86400, max_entries=16,
+                      version=dataset_version.current)
+
 PARAM_META = {
     "consumption_mwh": {"label": "Consumption", "unit": "MWh", "group": "Energy (MWh)", "format": "number"},
     "production_mwh": {"label": "Production", "unit": "MWh", "group": "Energy (MWh)", "format": "number"},
@@ -33,6 +70,36 @@ def _name_expr(level: str) -> str:
     return "t.region_name"
 
 
+# fact_scenario_wide exists: None = not checked yet; a missing table is looked for again every minute
+_WIDE_TABLE = {"exists": None, "checked": 0.0}
+_WIDE_RECHECK_S = 60.0
+
+
+def _has_wide_table() -> bool:
+    """True once sql/fact_scenario_wide.sql has been applied; until then reads stay on the EAV table."""
+    if _WIDE_TABLE["exists"] or time.monotonic() - _WIDE_TABLE["checked"] < _WIDE_RECHECK_S:
+        return bool(_WIDE_TABLE["exists"])
+    _, rows = fetch_rows_shared("SELECT to_regclass('energy_dw.fact_scenario_wide') IS NOT NULL;")
+    _WIDE_TABLE["exists"] = bool(rows[0][0])
+    _WIDE_TABLE["checked"] = time.monotonic()
+    return _WIDE_TABLE["exists"]
+
+
+def _param_source(param_key: str) -> tuple[str, str, str, list]:
+    """
+    (table, value_expr, key_filter, key_params) to read one param_key.
+    PARAM_META keys are columns of the wide table (sql/fact_scenario_wide.sql),
+    one row per territory; any other key, or every key while the wide table
+    is missing, is read from the EAV rows. Both drop NULL values (a NULL wide
+    column can't be told apart from a missing key), so /values, /ranking and
+    /compare list the same territories whichever table answers.
+    """
+    if param_key in PARAM_META and _has_wide_table():
+        return "energy_dw.fact_scenario_wide", f"f.{param_key}", f"f.{param_key} IS NOT NULL", []
+    return ("energy_dw.fact_scenario_param", "f.param_value",
+            "f.param_key = %s AND f.param_value IS NOT NULL", [param_key])
+
+
 def _pick_agg_source(level: str, resolution: str) -> tuple[str, str]:
     # seasonal derived from monthly aggregation
     if resolution == "seasonal":
@@ -105,7 +172,7 @@ def list_scenarios():
         ) y ON y.scenario_id = s.id
         ORDER BY s.id;
     """
-    return jsonify(fetch_query(sql))
+    return jsonify(fetch_query_cached(_DIM_CACHE, sql))
 
 
 @scenarios_bp.get("/param-keys")
@@ -119,7 +186,7 @@ def list_param_keys():
         FROM energy_dw.fact_scenario_param
         ORDER BY param_key;
     """
-    rows = fetch_query(sql)
+    rows = fetch_query_cached(_DIM_CACHE, sql)
     keys = [r["param_key"] for r in rows]
     out = []
     for k in keys:
@@ -129,15 +196,138 @@ def list_param_keys():
 
 
 @scenarios_bp.get("/values")
+@dataset_version.etagged
 def scenario_values_choropleth():
     """
     GET /scenarios/values?level=province&scenario=4&year=2019&param_key=consumption_mwh
     Choropleth values for all territories at a level.
+
+    Optional: fields=, limit=, order_by=value, order=, after=, after_value=
+    e.g. top 50 comuni: level=comune&...&order_by=value&limit=50
+
+    classes=5[&breaks=quantile,equal_interval,jenks] adds legend class breaks
+    computed over the whole level: {"items": [...], "breaks": {...}}
+    """
+    level = (request.args.get("level") or "").lower().strip()
+    scenario_code = (request.args.get("scenario") or "").strip()
+    year = request.args.get("year", type=int)
+    param_key = (request.args.get("param_key") or "").strip()
+
+    if level not in ALLOWED_LEVELS:
+        return jsonify({"error": "Invalid level"}), 400
+    if not scenario_code:
+        return jsonify({"error": "Missing scenario"}), 400
+    if not year:
+        return jsonify({"error": "Missing year"}), 400
+    if not param_key:
+        return jsonify({"error": "Missing param_key"}), 400
+
+    page, err = parse_page_args(request.args, VALUE_FIELDS)
+    if err:
+        return jsonify({"error": err}), 400
+    breaks_spec, err = parse_breaks_args(request.args)
+    if err:
+        return jsonify({"error": err}), 400
+
+    table, value_expr, key_filter, key_params = _param_source(param_key)
+    meta = PARAM_META.get(param_key, {"label": param_key, "unit": None, "group": "Other", "format": "number"})
+
+    # projection: only select the territory columns asked for
+    dim_exprs = {
+        "name": _name_expr(level),
+        "reg_cod": "t.reg_cod",
+        "prov_cod": "t.prov_cod",
+        "mun_cod": "t.mun_cod",
+    }
+    if table == "energy_dw.fact_scenario_param":
+        # wide columns carry the PARAM_META unit
+        dim_exprs["unit"] = "f.unit"
+    dim_cols = [c for c in dim_exprs if wants(page, c)]
+    select_dims = "".join(f"{dim_exprs[c]} AS {c},\n            " for c in dim_cols)
+
+    page_where, page_tail, page_params = page_clauses(page, "param_value")
+
+    sql = f"""
+        SELECT *
+        FROM (
+          SELECT
+            t.id AS territory_id,
+            {select_dims}{value_expr} AS param_value
+          FROM {table} f
+          JOIN energy_dw.dim_scenario s ON s.id = f.scenario_id
+          JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+          WHERE t.level = %s
+            AND s.code = %s
+            AND f.year = %s
+            AND {key_filter}
+        ) q
+        WHERE {page_where}
+        {page_tail};
+    """
+    rows = fetch_query_cached(_VALUES_CACHE, sql, (level, scenario_code, year, *key_params, *page_params))
+
+    out = []
+    for r in rows:
+        r["param_value"] = float(r["param_value"]) if r["param_value"] is not None else None
+        item = {k: r[k] for k in ("territory_id", *dim_cols) if k != "unit"}
+        if wants(page, "param_key"):
+            item["param_key"] = param_key
+        if wants(page, "value"):
+            item["value"] = r["param_value"]
+        if wants(page, "unit"):
+            item["unit"] = r["unit"] if "unit" in dim_exprs else meta["unit"]
+        if wants(page, "meta"):
+            item["meta"] = meta
+        out.append(item)
+
+    resp = page_response(out, page, "param_value", rows[-1] if rows else None)
+
+    if breaks_spec:
+        def _all_values():
+            if not is_paged(page):
+                return [r["param_value"] for r in rows]
+            # a page only holds part of the level: classify the full value set
+            vals_sql = f"""
+                SELECT {value_expr} AS param_value
+                FROM {table} f
+                JOIN energy_dw.dim_scenario s ON s.id = f.scenario_id
+                JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+                WHERE t.level = %s
+                  AND s.code = %s
+                  AND f.year = %s
+                  AND {key_filter}
+                  AND {value_expr} IS NOT NULL;
+            """
+            return [r["param_value"] for r in fetch_query_shared(vals_sql, (level, scenario_code, year, *key_params))]
+
+        breaks_key = (
+            "scenario_values", level, scenario_code, year, param_key,
+            breaks_spec["classes"], breaks_spec["methods"],
+        )
+        breaks = BREAKS_CACHE.get_or_compute(
+            breaks_key,
+            lambda: compute_breaks(_all_values(), breaks_spec["classes"], breaks_spec["methods"]),
+        )
+        resp = with_breaks(resp, breaks)
+
+    return jsonify(resp)
+
+
+@scenarios_bp.get("/ranking")
+def scenario_ranking():
+    """
+    GET /scenarios/ranking?level=comune&scenario=4&year=2019&param_key=self_sufficiency_index
+    Top/bottom-N territories, percentiles and histogram buckets for one param_key.
+
+    Optional: n=10, buckets=10, percentiles=0.1,0.25,0.5,0.75,0.9
     """
     level = (request.args.get("level") or "").lower().strip()
     scenario_code = (request.args.get("scenario") or "").strip()
     year = request.args.get("year", type=int)
     param_key = (request.args.get("param_key") or "").strip()
+    n = request.args.get("n", default=10, type=int)
+    buckets = request.args.get("buckets", default=10, type=int)
+    percentiles_raw = (request.args.get("percentiles") or "0.1,0.25,0.5,0.75,0.9").strip()
 
     if level not in ALLOWED_LEVELS:
         return jsonify({"error": "Invalid level"}), 400
@@ -147,48 +337,263 @@ def scenario_values_choropleth():
         return jsonify({"error": "Missing year"}), 400
     if not param_key:
         return jsonify({"error": "Missing param_key"}), 400
+    if not (0 < n <= MAX_RANKING_N):
+        return jsonify({"error": f"n must be between 1 and {MAX_RANKING_N}"}), 400
+    if not (0 < buckets <= MAX_HISTOGRAM_BUCKETS):
+        return jsonify({"error": f"buckets must be between 1 and {MAX_HISTOGRAM_BUCKETS}"}), 400
+    try:
+        percentiles = sorted({float(x) for x in percentiles_raw.split(",") if x.strip()})
+    except ValueError:
+        return jsonify({"error": "Invalid percentiles"}), 400
+    if not percentiles or any(not (0.0 <= q <= 1.0) for q in percentiles):
+        return jsonify({"error": "percentiles must be in [0, 1]"}), 400
+
+    cache_key = (scenario_code, year, level, param_key, n, buckets, tuple(percentiles))
+    result = _RANKING_CACHE.get_or_compute(
+        cache_key,
+        lambda: _compute_ranking(level, scenario_code, year, param_key, n, buckets, percentiles),
+    )
+    return jsonify(result)
+
+
+def _compute_ranking(level, scenario_code, year, param_key, n, buckets, percentiles) -> dict:
+    name_expr = _name_expr(level)
+    table, value_expr, key_filter, key_params = _param_source(param_key)
+
+    # shared filtered set; an index scan on the wide table's primary key
+    # (or the (scenario_id, year, param_key) EAV index for other keys)
+    values_cte = f"""
+        v AS (
+          SELECT
+            t.id AS territory_id,
+            {name_expr} AS name,
+            t.reg_cod,
+            t.prov_cod,
+            t.mun_cod,
+            {value_expr} AS value
+          FROM {table} f
+          JOIN energy_dw.dim_scenario s ON s.id = f.scenario_id
+          JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+          WHERE t.level = %s
+            AND s.code = %s
+            AND f.year = %s
+            AND {key_filter}
+            AND {value_expr} IS NOT NULL
+        )
+    """
+    base_params = [level, scenario_code, year, *key_params]
+
+    rank_sql = f"""
+        WITH {values_cte},
+        r AS (
+          SELECT
+            v.*,
+            RANK() OVER (ORDER BY value DESC) AS rank,
+            PERCENT_RANK() OVER (ORDER BY value) AS percentile,
+            ROW_NUMBER() OVER (ORDER BY value DESC, territory_id) AS rn_desc,
+            ROW_NUMBER() OVER (ORDER BY value ASC, territory_id) AS rn_asc
+          FROM v
+        )
+        SELECT *
+        FROM r
+        WHERE rn_desc <= %s OR rn_asc <= %s
+        ORDER BY value DESC, territory_id;
+    """
+    rows = fetch_query_shared(rank_sql, (*base_params, n, n))
+
+    stats_sql = f"""
+        WITH {values_cte},
+        s AS (
+          SELECT
+            COUNT(*) AS n,
+            MIN(value) AS min,
+            MAX(value) AS max,
+            AVG(value) AS mean,
+            percentile_cont(%s::float8[]) WITHIN GROUP (ORDER BY value) AS pcts
+          FROM v
+        ),
+        h AS (
+          SELECT
+            CASE
+              WHEN s.max > s.min THEN LEAST(width_bucket(v.value, s.min, s.max, %s), %s)
+              ELSE 1
+            END AS bucket,
+            COUNT(*) AS count
+          FROM v CROSS JOIN s
+          GROUP BY bucket
+        )
+        SELECT
+          s.*,
+          COALESCE((SELECT json_agg(json_build_array(h.bucket, h.count)) FROM h), '[]'::json) AS hist
+        FROM s;
+    """
+    stats = fetch_query_shared(stats_sql, (*base_params, percentiles, buckets, buckets))[0]
+
+    def _item(r):
+        return {
+            "rank": int(r["rank"]),
+            "territory_id": r["territory_id"],
+            "name": r["name"],
+            "reg_cod": r["reg_cod"],
+            "prov_cod": r["prov_cod"],
+            "mun_cod": r["mun_cod"],
+            "value": float(r["value"]),
+            "percentile": float(r["percentile"]),
+        }
+
+    top = [_item(r) for r in rows if r["rn_desc"] <= n]
+    bottom = [_item(r) for r in sorted(rows, key=lambda r: r["rn_asc"]) if r["rn_asc"] <= n]
+
+    count = int(stats["n"])
+    lo = float(stats["min"]) if stats["min"] is not None else None
+    hi = float(stats["max"]) if stats["max"] is not None else None
+
+    histogram = []
+    if count:
+        width = (hi - lo) / buckets if hi > lo else 0.0
+        counts = {int(b): int(c) for b, c in stats["hist"]}
+        for b in range(1, buckets + 1):
+            histogram.append({
+                "bucket": b,
+                "lo": lo + (b - 1) * width,
+                "hi": lo + b * width if width else hi,
+                "count": counts.get(b, 0),
+            })
+
+    pcts = stats["pcts"] or []
+    return {
+        "scenario": scenario_code,
+        "year": year,
+        "level": level,
+        "param_key": param_key,
+        "meta": PARAM_META.get(param_key, {"label": param_key, "unit": None, "group": "Other", "format": "number"}),
+        "count": count,
+        "min": lo,
+        "max": hi,
+        "mean": float(stats["mean"]) if stats["mean"] is not None else None,
+        "top": top,
+        "bottom": bottom,
+        "percentiles": {f"{q:g}": float(v) for q, v in zip(percentiles, pcts) if v is not None},
+        "histogram": histogram,
+    }
+
+
+@scenarios_bp.get("/compare")
+def compare_scenarios():
+    """
+    GET /scenarios/compare?level=comune&a=0&b=4&year=2019&param_key=self_sufficiency_index
+    Per-territory values of scenario a and b, with delta = b - a and
+    delta_rel = (b - a) / |a|, plus aggregate summaries.
+    Both scenarios are read in one scan of the scenario fact table.
+    """
+    level = (request.args.get("level") or "").lower().strip()
+    code_a = (request.args.get("a") or "").strip()
+    code_b = (request.args.get("b") or "").strip()
+    year = request.args.get("year", type=int)
+    param_key = (request.args.get("param_key") or "").strip()
+
+    if level not in ALLOWED_LEVELS:
+        return jsonify({"error": "Invalid level"}), 400
+    if not code_a or not code_b:
+        return jsonify({"error": "Missing scenario a or b"}), 400
+    if not year:
+        return jsonify({"error": "Missing year"}), 400
+    if not param_key:
+        return jsonify({"error": "Missing param_key"}), 400
+
+    cache_key = (level, code_a, code_b, year, param_key)
+    result = _COMPARE_CACHE.get_or_compute(
+        cache_key,
+        lambda: _compute_comparison(level, code_a, code_b, year, param_key),
+    )
+    return jsonify(result)
 
+
+def _compute_comparison(level, code_a, code_b, year, param_key) -> dict:
     name_expr = _name_expr(level)
+    table, value_expr, key_filter, key_params = _param_source(param_key)
 
     sql = f"""
+        WITH ab AS (
+          SELECT
+            t.id AS territory_id,
+            {name_expr} AS name,
+            t.reg_cod,
+            t.prov_cod,
+            t.mun_cod,
+            MAX({value_expr}) FILTER (WHERE s.code = %s) AS value_a,
+            MAX({value_expr}) FILTER (WHERE s.code = %s) AS value_b
+          FROM {table} f
+          JOIN energy_dw.dim_scenario s ON s.id = f.scenario_id
+          JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+          WHERE t.level = %s
+            AND s.code = ANY(%s)
+            AND f.year = %s
+            AND {key_filter}
+          GROUP BY t.id, {name_expr}, t.reg_cod, t.prov_cod, t.mun_cod
+        )
         SELECT
-          t.id AS territory_id,
-          {name_expr} AS name,
-          t.reg_cod,
-          t.prov_cod,
-          t.mun_cod,
-          f.param_value,
-          f.unit,
-          f.param_key
-        FROM energy_dw.fact_scenario_param f
-        JOIN energy_dw.dim_scenario s ON s.id = f.scenario_id
-        JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
-        WHERE t.level = %s
-          AND s.code = %s
-          AND f.year = %s
-          AND f.param_key = %s
-        ORDER BY t.id;
+          ab.*,
+          ab.value_b - ab.value_a AS delta,
+          CASE WHEN ab.value_a <> 0 THEN (ab.value_b - ab.value_a) / ABS(ab.value_a) END AS delta_rel
+        FROM ab
+        ORDER BY ab.territory_id;
     """
-    rows = fetch_query(sql, (level, scenario_code, year, param_key))
+    rows = fetch_query_shared(sql, (code_a, code_b, level, [code_a, code_b], year, *key_params))
 
-    meta = PARAM_META.get(param_key, {"label": param_key, "unit": None, "group": "Other", "format": "number"})
-    out = []
+    def _f(x):
+        return float(x) if x is not None else None
+
+    items = []
     for r in rows:
-        out.append({
+        items.append({
             "territory_id": r["territory_id"],
             "name": r["name"],
             "reg_cod": r["reg_cod"],
             "prov_cod": r["prov_cod"],
             "mun_cod": r["mun_cod"],
-            "param_key": r["param_key"],
-            "value": float(r["param_value"]) if r["param_value"] is not None else None,
-            "unit": r["unit"],
-            "meta": meta,
+            "value_a": _f(r["value_a"]),
+            "value_b": _f(r["value_b"]),
+            "delta": _f(r["delta"]),
+            "delta_rel": _f(r["delta_rel"]),
         })
-    return jsonify(out)
+
+    # aggregates over territories present in both scenarios
+    paired = [it for it in items if it["delta"] is not None]
+    deltas = [it["delta"] for it in paired]
+    total_a = sum(it["value_a"] for it in paired)
+    total_b = sum(it["value_b"] for it in paired)
+    summary = {
+        "territories": len(items),
+        "paired": len(paired),
+        "only_a": sum(1 for it in items if it["value_b"] is None and it["value_a"] is not None),
+        "only_b": sum(1 for it in items if it["value_a"] is None and it["value_b"] is not None),
+        "increased": sum(1 for d in deltas if d > 0),
+        "decreased": sum(1 for d in deltas if d < 0),
+        "unchanged": sum(1 for d in deltas if d == 0),
+        "total_a": total_a,
+        "total_b": total_b,
+        "total_delta": total_b - total_a,
+        "total_delta_rel": ((total_b - total_a) / abs(total_a)) if total_a else None,
+        "mean_delta": (sum(deltas) / len(deltas)) if deltas else None,
+        "min_delta": min(deltas) if deltas else None,
+        "max_delta": max(deltas) if deltas else None,
+    }
+
+    return {
+        "a": code_a,
+        "b": code_b,
+        "year": year,
+        "level": level,
+        "param_key": param_key,
+        "meta": PARAM_META.get(param_key, {"label": param_key, "unit": None, "group": "Other", "format": "number"}),
+        "summary": summary,
+        "items": items,
+    }
 
 
 @scenarios_bp.get("/territory")
+@dataset_version.etagged
 def scenario_params_for_one_territory():
     """
     GET /scenarios/territory?level=province&province_code=1&scenario=4&year=2019
@@ -219,14 +624,59 @@ def scenario_params_for_one_territory():
         return jsonify({"error": f"Missing code for level {level}"}), 400
 
     name_expr = _name_expr(level)
-
-    sql = f"""
-        SELECT
+    params = (level, scenario_code, year, code)
+    territory_cols = f"""
           t.id AS territory_id,
           {name_expr} AS name,
           t.reg_cod,
           t.prov_cod,
-          t.mun_cod,
+          t.mun_cod"""
+
+    rows = []
+    wide_keys = []
+    if _has_wide_table():
+        # one wide row holds every PARAM_META key; their stored units come along from the EAV rows
+        wide_keys = sorted(PARAM_META)
+        wide_cols = "".join(f",\n          f.{k}" for k in wide_keys)
+        sql = f"""
+            SELECT{territory_cols}{wide_cols},
+              u.units
+            FROM energy_dw.fact_scenario_wide f
+            JOIN energy_dw.dim_scenario s ON s.id = f.scenario_id
+            JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+            LEFT JOIN LATERAL (
+              SELECT json_object_agg(p.param_key, p.unit) AS units
+              FROM energy_dw.fact_scenario_param p
+              WHERE p.scenario_id = f.scenario_id
+                AND p.year = f.year
+                AND p.territory_id = f.territory_id
+                AND p.param_key = ANY(%s)
+            ) u ON TRUE
+            WHERE t.level = %s
+              AND s.code = %s
+              AND f.year = %s
+              AND {code_field} = %s;
+        """
+        rows = fetch_query_shared(sql, (wide_keys, *params))
+
+    values = {}
+    if rows:
+        units = rows[0]["units"] or {}
+        for k in wide_keys:
+            v = rows[0][k]
+            if v is None:
+                continue
+            values[k] = {
+                "value": float(v),
+                "unit": units.get(k),
+                "meta": PARAM_META[k],
+            }
+    else:
+        wide_keys = []
+
+    # keys outside the wide table (all of them when there is no wide row) are EAV rows
+    sql = f"""
+        SELECT{territory_cols},
           f.param_key,
           f.param_value,
           f.unit
@@ -237,21 +687,25 @@ def scenario_params_for_one_territory():
           AND s.code = %s
           AND f.year = %s
           AND {code_field} = %s
+          AND f.param_key <> ALL(%s)
         ORDER BY f.param_key;
     """
-    rows = fetch_query(sql, (level, scenario_code, year, code))
-
-    if not rows:
-        return jsonify({"error": "No data found"}), 404
-
-    values = {}
-    for r in rows:
+    eav_rows = fetch_query_shared(sql, (*params, wide_keys))
+    for r in eav_rows:
         k = r["param_key"]
+        if k in PARAM_META and r["param_value"] is None:
+            # the wide table has no NULL PARAM_META values either (see _param_source)
+            continue
         values[k] = {
             "value": float(r["param_value"]) if r["param_value"] is not None else None,
             "unit": r["unit"],
             "meta": PARAM_META.get(k, {"label": k, "unit": None, "group": "Other", "format": "number"}),
         }
+    values = dict(sorted(values.items()))
+    rows = rows or eav_rows
+
+    if not rows:
+        return jsonify({"error": "No data found"}), 404
 
     territory = {
         "territory_id": rows[0]["territory_id"],
@@ -352,26 +806,31 @@ def preview_scenario():
         ORDER BY territory_id, x;
     """
 
-    rows = fetch_query(sql, tuple(params))
+    cube = cube_for(level, time_res)
+    if cube is not None:
+        rows = cube.preview(base_scenario, year, x_expr.removeprefix("tm."), uplift_categories)
+    else:
+        _, rows = fetch_rows_shared(sql, tuple(params))
 
     out = []
     uplift_factor = uplift_pct / 100.0
 
-    for r in rows:
-        c = _safe_float(r["consumption_mwh"])
-        p_total = _safe_float(r["production_total_mwh"])
-        p_uplift_base = _safe_float(r["production_uplift_base_mwh"])
+    # columns of base, in SELECT order
+    for territory_id, name, reg_cod, prov_cod, mun_cod, x, c, p_total, p_uplift_base in rows:
+        c = _safe_float(c)
+        p_total = _safe_float(p_total)
+        p_uplift_base = _safe_float(p_uplift_base)
         p_new = p_total + (p_uplift_base * uplift_factor)
 
         metrics = _calc_indicators(c, p_new)
 
         out.append({
-            "territory_id": r["territory_id"],
-            "name": r["name"],
-            "reg_cod": r["reg_cod"],
-            "prov_cod": r["prov_cod"],
-            "mun_cod": r["mun_cod"],
-            "x": r["x"],
+            "territory_id": territory_id,
+            "name": name,
+            "reg_cod": reg_cod,
+            "prov_cod": prov_cod,
+            "mun_cod": mun_cod,
+            "x": x,
             "base_scenario": base_scenario,
             "uplift_pct": uplift_pct,
             "uplift_categories": uplift_categories,
@@ -381,6 +840,160 @@ def preview_scenario():
     return jsonify(out)
 
 
+def _parse_uplifts(args) -> tuple[list[float] | None, str | None]:
+    """uplift_pct=0,10,25 (or repeated), else uplift_min / uplift_max / uplift_step; default 0..100 by 10."""
+    try:
+        raw = [x for v in args.getlist("uplift_pct") for x in v.split(",") if x.strip()]
+        if raw:
+            uplifts = sorted({float(x) for x in raw})
+        else:
+            lo = float(args.get("uplift_min", 0))
+            hi = float(args.get("uplift_max", 100))
+            step = float(args.get("uplift_step", 10))
+            if step <= 0 or hi < lo:
+                return None, "uplift_step must be > 0 and uplift_max >= uplift_min"
+            count = int(round((hi - lo) / step)) + 1
+            if count > MAX_SWEEP_UPLIFTS:
+                return None, f"At most {MAX_SWEEP_UPLIFTS} uplift values"
+            uplifts = [round(lo + i * step, 6) for i in range(count)]
+    except ValueError:
+        return None, "Invalid uplift_pct"
+    if any(u < 0 for u in uplifts):
+        return None, "uplift_pct must be >= 0"
+    if len(uplifts) > MAX_SWEEP_UPLIFTS:
+        return None, f"At most {MAX_SWEEP_UPLIFTS} uplift values"
+    return uplifts, None
+
+
+@scenarios_bp.get("/sweep")
+def sweep_scenario():
+    """
+    GET /scenarios/sweep?level=province&year=2030&base_scenario=0&uplift_pct=0,10,25,50
+        &uplift_categories=solar&uplift_categories=solar,wind&param_key=self_sufficiency_index
+
+    Sensitivity of the indicators to the uplift: every uplift_pct x
+    uplift_categories combination (each repeated uplift_categories is one
+    comma-separated combination; none = all production) for every territory
+    of the level, in one request. The base aggregates are read once; the
+    grid is evaluated vectorized, large grids on a worker pool
+    (utils/sweep.py). time_resolution=hourly matches consumption and
+    production hour by hour (utils/indicators.py) instead of on annual totals.
+
+    Compact arrays: curves[param_key][combination][territory][uplift],
+    positions as in uplift_pct, combinations and territories.
+    """
+    level = (request.args.get("level") or "").lower().strip()
+    year = request.args.get("year", type=int)
+    base_scenario = (request.args.get("base_scenario") or "0").strip()
+    time_resolution = (request.args.get("time_resolution") or "annual").lower().strip()
+
+    combinations = []
+    for raw in request.args.getlist("uplift_categories"):
+        combo = sorted({c.strip() for c in raw.split(",") if c.strip()})
+        if combo not in combinations:
+            combinations.append(combo)
+    combinations = combinations or [[]]
+    keys = [k.strip() for v in request.args.getlist("param_key") for k in v.split(",") if k.strip()]
+    keys = list(dict.fromkeys(keys)) or DEFAULT_SWEEP_KEYS
+
+    if level not in ALLOWED_LEVELS:
+        return jsonify({"error": "Invalid level"}), 400
+    if not year:
+        return jsonify({"error": "Missing year"}), 400
+    if time_resolution not in {"annual", "hourly"}:
+        return jsonify({"error": "Invalid time_resolution"}), 400
+    if len(combinations) > MAX_SWEEP_COMBINATIONS:
+        return jsonify({"error": f"At most {MAX_SWEEP_COMBINATIONS} uplift_categories combinations"}), 400
+    if any(k not in indicators.INDICATOR_KEYS for k in keys):
+        return jsonify({"error": f"param_key must be one of {', '.join(indicators.INDICATOR_KEYS)}"}), 400
+    uplifts, err = _parse_uplifts(request.args)
+    if err:
+        return jsonify({"error": err}), 400
+
+    cache_key = (level, year, base_scenario, time_resolution, tuple(uplifts),
+                 tuple(tuple(c) for c in combinations), tuple(keys))
+    result = _SWEEP_CACHE.get_or_compute(
+        cache_key,
+        lambda: _compute_sweep(level, year, base_scenario, time_resolution, uplifts, combinations, keys),
+    )
+    return jsonify(result)
+
+
+def _sweep_base(level, year, base_scenario, categories):
+    """
+    Annual totals per territory shaped like one-slot profiles, so
+    indicators.compute() reduces to min(c, p) on totals as in _calc_indicators.
+    """
+    data_source, time_res = _pick_agg_source(level, "annual")
+    category_cols = "".join(
+        ",\n          COALESCE(SUM(CASE WHEN ec.domain = 'production' AND ec.code = %s THEN f.value_mwh END), 0)"
+        for _ in categories
+    )
+    sql = f"""
+        SELECT
+          t.id AS territory_id,
+          COALESCE(SUM(CASE WHEN ec.domain = 'consumption' THEN f.value_mwh END), 0) AS consumption_mwh,
+          COALESCE(SUM(CASE WHEN ec.domain = 'production' THEN f.value_mwh END), 0) AS production_total_mwh{category_cols}
+        FROM energy_dw.fact_energy f
+        JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+        JOIN energy_dw.dim_time tm ON tm.id = f.time_id
+        JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
+        JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
+        WHERE t.level = %s
+          AND f.time_resolution = %s
+          AND tm.year = %s
+          AND sc.code = %s
+          AND f.data_source = %s
+          AND tm.month IS NULL AND tm.hour IS NULL
+        GROUP BY t.id
+        ORDER BY t.id;
+    """
+    _, rows = fetch_rows_shared(sql, (*categories, level, time_res, year, base_scenario, data_source))
+    table = np.array([r[1:] for r in rows], dtype=np.float64).reshape(len(rows), 2 + len(categories), 1, 1, 1)
+    territory_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    by_category = {c: table[:, 2 + i] for i, c in enumerate(categories)}
+    return territory_ids, table[:, 0], table[:, 1], by_category, np.ones((1, 1))
+
+
+def _compute_sweep(level, year, base_scenario, time_resolution, uplifts, combinations, keys) -> dict:
+    categories = sorted({c for combo in combinations for c in combo})
+    if time_resolution == "hourly":
+        profiles = indicators.load_profiles(level, year, base_scenario, categories=categories)
+        territory_ids, consumption, production = profiles.territory_ids, profiles.consumption, profiles.production_total
+        by_category, weights = profiles.by_category, profiles.weights
+    else:
+        territory_ids, consumption, production, by_category, weights = _sweep_base(
+            level, year, base_scenario, categories)
+
+    curves = run_sweep(consumption, production, by_category, weights, combinations, uplifts, keys)
+
+    _, dims = fetch_rows_shared(f"""
+        SELECT t.id, {_name_expr(level)} AS name, t.reg_cod, t.prov_cod, t.mun_cod
+        FROM energy_dw.dim_territory_en t
+        WHERE t.id = ANY(%s);
+    """, ([int(t) for t in territory_ids],))
+    dim = {r[0]: r[1:] for r in dims}
+    ids = territory_ids.tolist()
+    columns = list(zip(*[dim.get(t, (None,) * 4) for t in ids])) or [[]] * 4
+
+    return {
+        "level": level,
+        "year": year,
+        "base_scenario": base_scenario,
+        "time_resolution": time_resolution,
+        "uplift_pct": uplifts,
+        "combinations": combinations,
+        "territories": {
+            "territory_id": ids,
+            "name": list(columns[0]),
+            "reg_cod": list(columns[1]),
+            "prov_cod": list(columns[2]),
+            "mun_cod": list(columns[3]),
+        },
+        "curves": {k: np.round(v, 6).tolist() for k, v in curves.items()},
+    }
+
+
 @scenarios_bp.post("/save")
 def save_scenario():
     """
@@ -396,10 +1009,14 @@ def save_scenario():
       "level": "province",
       "base_scenario": "0",
       "uplift_pct": 10,
-      "uplift_categories": ["solar","wind"]
+      "uplift_categories": ["solar","wind"],
+      "time_resolution": "hourly"
     }
 
     MVP: Only save annually (since fact_scenario_param only has year).
+    time_resolution "annual" (default) derives the indicators from annual
+    totals; "hourly" matches consumption and production hour by hour on the
+    typical-day profiles (utils/indicators.py).
     """
     body = request.get_json(silent=True) or {}
 
@@ -427,6 +1044,9 @@ def save_scenario():
         return jsonify({"error": "year must be int"}), 400
     if uplift_pct < 0:
         return jsonify({"error": "uplift_pct must be >= 0"}), 400
+    time_resolution = str(body.get("time_resolution") or "annual").lower().strip()
+    if time_resolution not in {"annual", "hourly"}:
+        return jsonify({"error": "Invalid time_resolution"}), 400
 
     # generate a DB-friendly scenario code (unique enough)
     # example: u_admin_2019_10p
@@ -450,6 +1070,16 @@ def save_scenario():
     scenario_id_row = fetch_query(insert_s, (code, name_en, name_it or None, description or None, year, source))
     scenario_id = scenario_id_row[0]["id"]
 
+    uplift_factor = uplift_pct / 100.0
+    notes = f"Saved by {username}. Base={base_scenario}, uplift_pct={uplift_pct}, cats={','.join(uplift_categories) or '-'}"
+
+    if time_resolution == "hourly":
+        # 2+3) hourly indicators for every territory of the level at once
+        profiles = indicators.load_profiles(level, year, base_scenario, uplift_categories)
+        metrics = indicators.scenario_indicators(profiles, uplift_pct)
+        fact_rows = indicators.param_rows(scenario_id, year, profiles.territory_ids, metrics, notes + ", hourly")
+        return _store_scenario_params(fact_rows, scenario_id, code, level, year)
+
     # 2) compute annual values using the SAME logic as preview (but annual only)
     level = level
     resolution = "annual"
@@ -493,9 +1123,6 @@ def save_scenario():
     rows = fetch_query(sql, tuple(params))
 
     # 3) unpivot + bulk insert to fact_scenario_param
-    uplift_factor = uplift_pct / 100.0
-    notes = f"Saved by {username}. Base={base_scenario}, uplift_pct={uplift_pct}, cats={','.join(uplift_categories) or '-'}"
-
     fact_rows = []
     for r in rows:
         c = _safe_float(r["consumption_mwh"])
@@ -508,12 +1135,19 @@ def save_scenario():
             unit = "MWh" if k.endswith("_mwh") else "ratio"
             fact_rows.append((scenario_id, int(r["territory_id"]), k, float(v), unit, year, notes))
 
+    return _store_scenario_params(fact_rows, scenario_id, code, level, year)
+
+
+def _store_scenario_params(fact_rows: list[tuple], scenario_id: int, code: str, level: str, year: int):
+    """Bulk insert a saved scenario's rows into fact_scenario_param and answer the save."""
+    # (fact_scenario_wide follows via the triggers in sql/fact_scenario_wide.sql)
     bulk_sql = """
       INSERT INTO energy_dw.fact_scenario_param
         (scenario_id, territory_id, param_key, param_value, unit, year, notes)
       VALUES %s;
     """
     bulk_insert_values(bulk_sql, fact_rows)
+    dataset_version.bump(f"scenario {code} saved")
 
     return jsonify({
         "status": "saved",
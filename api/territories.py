@@ -1,14 +1,17 @@
 # api/territories.py
 
-from flask import Blueprint, jsonify, request
-import json
-from utils.db_utils import fetch_query
+from flask import Blueprint, current_app, jsonify, request
+from utils import dataset_version
+from utils.cache import SWRCache
+from utils.singleflight import fetch_rows_shared
+from utils.fastjson import dumps_bytes
 
 territories_bp = Blueprint("territories", __name__)
 
 ALLOWED_LEVELS = {"comune", "province", "region"}
 
-_CACHE = {}
+# GeoJSON bodies per (level, simplify); geometries change only with a data load
+_CACHE = SWRCache("territories", soft_ttl=3600, hard_ttl=86400, max_entries=64, version=dataset_version.current)
 
 @territories_bp.get("/territories")
 def territories_geo():
@@ -25,10 +28,11 @@ def territories_geo():
         simplify = 0.005 if level == "province" else (0.01 if level == "region" else 0.001)
 
     cache_key = f"territories_{level}_{simplify:.6f}"
-    if cache_key in _CACHE:
-        return jsonify(_CACHE[cache_key])
+    return _geojson_response(_CACHE.get_or_compute(cache_key, lambda: _feature_collection(level, simplify)))
 
-        # 🔹 choose correct name column
+
+def _feature_collection(level: str, simplify: float) -> bytes:
+    # 🔹 choose correct name column
     if level == "comune":
         name_field = "t.municipality_name"
     # elif level == "":
@@ -53,27 +57,29 @@ def territories_geo():
         ORDER BY name;
     """
 
-    rows = fetch_query(sql, (simplify, level))
+    _, rows = fetch_rows_shared(sql, (simplify, level))
 
+    # ST_AsGeoJSON output is spliced in as-is instead of being parsed and
+    # re-encoded; keys are in sorted order, as jsonify would emit them
     features = []
-    for r in rows:
-        geom = json.loads(r["geometry"]) if r.get("geometry") else None
-        if not geom:
+    for tid, name, reg_cod, prov_cod, mun_cod, geometry in rows:
+        if not geometry:
             continue
 
-        features.append({
-            "type": "Feature",
-            "geometry": geom,
-            "properties": {
-                "id": r["id"],
-                "name": r["name"],
-                "reg_cod": r["reg_cod"],
-                "prov_cod": r["prov_cod"],
-                "mun_cod": r["mun_cod"],
-                "level": level,
-            }
-        })
-
-    result = {"type":"FeatureCollection","features":features}
-    _CACHE[cache_key] = result
-    return jsonify(result)
\ No newline at end of file
+        properties = dumps_bytes({
+            "id": tid,
+            "name": name,
+            "reg_cod": reg_cod,
+            "prov_cod": prov_cod,
+            "mun_cod": mun_cod,
+            "level": level,
+        }, sort_keys=True)
+        features.append(
+            b'{"geometry":' + geometry.encode("utf-8") + b',"properties":' + properties + b',"type":"Feature"}'
+        )
+
+    return b'{"features":[' + b",".join(features) + b'],"type":"FeatureCollection"}'
+
+
+def _geojson_response(body: bytes):
+    return current_app.response_class(body, mimetype="application/json")
@@ -7,6 +7,7 @@ from flask_compress import Compress
 from api.territories import territories_bp
 from api.scenarios import scenarios_bp
 from api.energy import energy_bp
+from utils import cube, instrumentation, warmup
 # from api import register_blueprints
 from api.__init__ import register_blueprints
 
@@ -23,6 +24,9 @@ def create_app() -> Flask:
     app = Flask(__name__)
     
     Compress(app)  # ✅ Enable gzip compression for responses
+
+    # ✅ Per-request DB / app / serialize timings (Server-Timing) + /debug/metrics
+    instrumentation.init_app(app)
     
     # ✅ Enable CORS for your frontend origins
     # If you want to restrict to only API routes, see the note below.
@@ -37,10 +41,15 @@ def create_app() -> Flask:
     def health():
         return jsonify({"status": "ok", "message": "Energy backend is running"}), 200
 
+    # ✅ Map the agg_* cube snapshot (utils/cube.py) when CUBE_ENABLED=1
+    if cube.ENGINE is not None:
+        cube.ENGINE.load()
+
     # ✅ Register blueprints
     app.register_blueprint(territories_bp, url_prefix="/map")
     app.register_blueprint(energy_bp, url_prefix="/charts")
     app.register_blueprint(scenarios_bp, url_prefix="/scenarios")
+    app.register_blueprint(warmup.warmup_bp, url_prefix="/debug")
 
     # ✅ If you have extra blueprints in api/__init__.py
     register_blueprints(app)
@@ -50,5 +59,10 @@ def create_app() -> Flask:
 
 app = create_app()
 
+# ✅ Fill the caches before gunicorn forks the workers (see gunicorn.conf.py)
+if warmup.CACHE_WARM:
+    warmup.warm_for_preload(app)
+
 if __name__ == "__main__":
+    warmup.start_refresher(app)
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -6,6 +6,8 @@ class Settings(BaseSettings):
     DB_HOST: str = "localhost"
     DB_PORT: int = 5432
     DB_NAME: str = "energy_data"
+    # required as X-Admin-Token on /debug/metrics; unset = localhost only
+    ADMIN_TOKEN: str | None = None
 
     class Config:
         env_file = ".env"
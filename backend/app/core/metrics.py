@@ -0,0 +1,105 @@
+import hashlib
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+
+# histogram upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_WS_RE = re.compile(r"\s+")
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_NUM_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+# db seconds / query count of the request being served
+_request_db: ContextVar[list | None] = ContextVar("_request_db", default=None)
+
+_lock = threading.Lock()
+_queries: dict[str, dict] = {}
+_requests: dict[str, dict] = {}
+
+
+def fingerprint(sql: str) -> str:
+    norm = _WS_RE.sub(" ", _NUM_RE.sub("?", _STR_RE.sub("?", sql))).strip().rstrip(";")
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:12]
+
+
+def _observe(table: dict, key: str, seconds: float):
+    h = table.get(key)
+    if h is None:
+        h = table[key] = {"counts": [0] * (len(BUCKETS) + 1), "sum": 0.0, "count": 0}
+    h["counts"][bisect_left(BUCKETS, seconds)] += 1
+    h["sum"] += seconds
+    h["count"] += 1
+
+
+def record_query(sql: str, seconds: float):
+    """Called by db.fetch_rows for every statement."""
+    with _lock:
+        _observe(_queries, fingerprint(sql), seconds)
+    acc = _request_db.get()
+    if acc is not None:
+        acc[0] += seconds
+        acc[1] += 1
+
+
+async def timing_middleware(request: Request, call_next):
+    """Server-Timing header (db / app / total) and per-route latency histogram."""
+    acc = [0.0, 0]
+    token = _request_db.set(acc)
+    t0 = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _request_db.reset(token)
+    total = time.perf_counter() - t0
+
+    route = request.scope.get("route")
+    path = getattr(route, "path", "unmatched")
+    if path != "/debug/metrics":
+        with _lock:
+            _observe(_requests, path, total)
+
+    response.headers["Server-Timing"] = (
+        f"db;dur={acc[0] * 1000:.2f}, app;dur={max(total - acc[0], 0.0) * 1000:.2f}, "
+        f'total;dur={total * 1000:.2f}, queries;desc="{acc[1]}"'
+    )
+    return response
+
+
+def _hist_lines(name: str, label: str, table: dict) -> list[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for key, h in sorted(table.items()):
+        total = 0
+        for le, n in zip((*BUCKETS, "+Inf"), h["counts"]):
+            total += n
+            lines.append(f'{name}_bucket{{{label}="{key}",le="{le}"}} {total}')
+        lines.append(f'{name}_sum{{{label}="{key}"}} {h["sum"]!r}')
+        lines.append(f'{name}_count{{{label}="{key}"}} {h["count"]}')
+    return lines
+
+
+router = APIRouter()
+
+
+def _authorized(request: Request) -> bool:
+    """Same rule as the Flask /debug routes: X-Admin-Token when ADMIN_TOKEN is set, else loopback only."""
+    if settings.ADMIN_TOKEN:
+        return request.headers.get("X-Admin-Token") == settings.ADMIN_TOKEN
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1")
+
+
+@router.get("/debug/metrics", response_class=PlainTextResponse)
+def metrics(request: Request):
+    if not _authorized(request):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    with _lock:
+        lines = _hist_lines("legacy_query_duration_seconds", "fingerprint", _queries)
+        lines += _hist_lines("legacy_request_duration_seconds", "route", _requests)
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
@@ -1,6 +1,9 @@
+import time
+
 import psycopg
 from fastapi import HTTPException
 from .core.config import settings 
+from .core.metrics import record_query
 
 DB_DSN = (
     f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}"
@@ -15,6 +18,7 @@ db_client = get_connection()
 def fetch_rows(query: str, params: tuple | None = None):
     try:
   
+        t0 = time.perf_counter()
         with db_client.cursor() as cur:
             if params is not None:
                 cur.execute(query, params)
@@ -23,6 +27,7 @@ def fetch_rows(query: str, params: tuple | None = None):
 
             columns = [desc[0] for desc in cur.description]
             rows = cur.fetchall()
+        record_query(query, time.perf_counter() - t0)
 
         return [dict(zip(columns, row)) for row in rows]
 
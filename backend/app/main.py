@@ -4,6 +4,7 @@ import psycopg
 from psycopg.rows import dict_row
 from fastapi import Query  
 from app.routers import consumption, production
+from app.core import metrics
 
 
 # CORS -backend and Frontend origins-
@@ -20,6 +21,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Server-Timing header + /debug/metrics (Prometheus text)
+app.middleware("http")(metrics.timing_middleware)
+
 # Register routers
 app.include_router(consumption.router)
-app.include_router(production.router)
\ No newline at end of file
+app.include_router(production.router)
+app.include_router(metrics.router)
\ No newline at end of file
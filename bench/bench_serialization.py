@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of the row -> JSON path of the data endpoints, without a database.
+
+Compares, on synthetic result sets shaped like the real queries:
+
+  before  NUMERIC cast to Decimal, rows as dicts (old fetch_query), a second
+          list of dicts with float(...) conversions, Flask's stdlib provider
+  after   NUMERIC cast to float by DEC2FLOAT, row tuples (fetch_rows), one
+          list of dicts, utils.fastjson (orjson when installed)
+
+plus /map/territories: json.loads + jsonify of the geometry vs splicing the
+ST_AsGeoJSON text. Driver decoding is reproduced by running the raw column
+text through the psycopg2 typecasters.
+
+  python bench/bench_serialization.py --comuni 7904 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import psycopg2.extensions
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils.fastjson import FastJSONProvider, dumps_bytes, orjson  # noqa: E402
+
+DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, "DEC2FLOAT",
+    lambda value, cur: float(value) if value is not None else None,
+)
+
+
+def _raw_values(n: int) -> list[tuple]:
+    """(territory_id, name, value text) as the server sends them."""
+    return [(1000 + i, f"Comune {i}", f"{(i * 7919) % 100000 / 3:.6f}") for i in range(n)]
+
+
+def values_before(raw, provider):
+    rows = [(tid, name, psycopg2.extensions.DECIMAL(v, None)) for tid, name, v in raw]
+    cols = ["territory_id", "name", "value_mwh"]
+    dict_rows = [dict(zip(cols, r)) for r in rows]
+    out = []
+    for r in dict_rows:
+        r["value_mwh"] = float(r["value_mwh"]) if r["value_mwh"] is not None else 0.0
+        item = {k: r[k] for k in ("territory_id", "name")}
+        item["value_mwh"] = r["value_mwh"]
+        item.update({"domain": "consumption", "base_group": None, "category_code": None})
+        out.append(item)
+    return provider.dumps(out).encode("utf-8")
+
+
+def values_after(raw, provider):
+    rows = [(tid, name, DEC2FLOAT(v, None)) for tid, name, v in raw]
+    picks = (("territory_id", 0), ("name", 1), ("value_mwh", 2))
+    const = [("domain", "consumption"), ("base_group", None), ("category_code", None)]
+    out = []
+    for r in rows:
+        item = {k: r[i] for k, i in picks}
+        item.update(const)
+        out.append(item)
+    return provider.dump_bytes(out)
+
+
+def _raw_geometries(n: int) -> list[tuple]:
+    ring = ",".join(f"[{7 + i / 97:.9f},{45 + (i % 13) / 31:.9f}]" for i in range(120))
+    geom = f'{{"type":"MultiPolygon","coordinates":[[[{ring}]]]}}'
+    return [(i, f"Comune {i}", 1, i // 100, i, geom) for i in range(n)]
+
+
+def territories_before(rows, provider):
+    features = []
+    for tid, name, reg, prov, mun, geometry in rows:
+        features.append({
+            "type": "Feature",
+            "geometry": json.loads(geometry),
+            "properties": {"id": tid, "name": name, "reg_cod": reg, "prov_cod": prov,
+                           "mun_cod": mun, "level": "comune"},
+        })
+    return provider.dumps({"type": "FeatureCollection", "features": features}).encode("utf-8")
+
+
+def territories_after(rows, provider):
+    features = []
+    for tid, name, reg, prov, mun, geometry in rows:
+        props = dumps_bytes({"id": tid, "name": name, "reg_cod": reg, "prov_cod": prov,
+                             "mun_cod": mun, "level": "comune"}, sort_keys=True)
+        features.append(b'{"geometry":' + geometry.encode("utf-8") + b',"properties":' + props
+                        + b',"type":"Feature"}')
+    return b'{"features":[' + b",".join(features) + b'],"type":"FeatureCollection"}'
+
+
+def _best(fn, *args, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comuni", type=int, default=7904)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    old = DefaultJSONProvider(app)
+    new = FastJSONProvider(app)
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib (orjson not installed)'}")
+
+    cases = [
+        ("charts/values", _raw_values(args.comuni), values_before, values_after),
+        ("map/territories", _raw_geometries(args.comuni), territories_before, territories_after),
+    ]
+    for name, raw, before, after in cases:
+        assert json.loads(before(raw, old)) == json.loads(after(raw, new)), name
+        t_before = _best(before, raw, old, repeat=args.repeat)
+        t_after = _best(after, raw, new, repeat=args.repeat)
+        print(f"{name:<18} {len(raw)} rows  before {t_before * 1000:8.1f} ms  "
+              f"after {t_after * 1000:8.1f} ms  ({t_before / t_after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""
+Synthetic energy_dw star schema generator (used by bench/seed.py).
+
+Everything is derived from one seed, so the same arguments always produce
+the same database:
+
+  dim_territory_en   regions / provinces / comuni as nested Voronoi
+                     partitions of a coarse Italy outline: every comune
+                     polygon lies inside its province, every province
+                     inside its region, and siblings tile their parent
+  dim_time           per year: 1 annual, 12 x 2 monthly and 12 x 2 x 24
+                     hourly (typical day) rows
+  dim_energy_category, dim_scenario
+  fact_energy        hourly comune profiles (raw_hourly), future production
+                     (future_production_producibility) and every
+                     agg_{level}_{resolution} rollup the API reads
+  fact_scenario_param
+                     the indicator keys per territory and scenario,
+                     derived from the annual totals
+
+Values are generated a block of comuni at a time as NumPy arrays
+(comune x category x month x day type x hour) and streamed with binary
+COPY, so memory stays bounded by --block and no Python loop runs per row.
+
+Scale presets (SCALES) are multiples of the national layout: 20 regions,
+107 provinces and ~7.9k comuni at 1x; 10x / 100x multiply the comuni.
+"""
+
+import io
+import os
+import struct
+import time
+
+import numpy as np
+import psycopg2
+import shapely
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SQL_DIR = os.path.join(BENCH_DIR, '..', 'sql')
+
+DEFAULT_DSN = os.environ.get("BENCH_DSN", "dbname=energy_bench")
+
+# (regions, provinces, comuni)
+SCALES = {
+    "small": (4, 20, 800),
+    "1x": (20, 107, 7904),
+    "10x": (20, 107, 79040),
+    "100x": (20, 107, 790400),
+}
+
+# (code, base_group, domain) - codes match the frontend / capture_mocks
+CATEGORIES = [
+    ("cons_domestic", "domestic", "consumption"),
+    ("cons_primary", "primary", "consumption"),
+    ("cons_secondary", "secondary", "consumption"),
+    ("cons_tertiary", "tertiary", "consumption"),
+    ("solar", "solar", "production"),
+    ("wind", "wind", "production"),
+    ("hydroelectric", "hydroelectric", "production"),
+    ("geothermal", "geothermal", "production"),
+    ("biomass", "biomass", "production"),
+]
+N_CAT = len(CATEGORIES)
+CATEGORY_IDS = np.arange(1, N_CAT + 1, dtype=np.int32)
+IS_PRODUCTION = np.array([d == "production" for _, _, d in CATEGORIES])
+
+SEASON_OF_MONTH = {
+    12: "winter", 1: "winter", 2: "winter",
+    3: "spring", 4: "spring", 5: "spring",
+    6: "summer", 7: "summer", 8: "summer",
+    9: "autumn", 10: "autumn", 11: "autumn",
+}
+DAY_TYPES = ("weekday", "weekend")
+# typical days per month used to roll hourly profiles up to monthly totals
+DAYS_PER_MONTH = np.array([22.0, 8.0])
+
+RAW_SOURCE = "raw_hourly"
+FUTURE_SOURCE = "future_production_producibility"
+FUTURE_FACTOR = 1.5
+# share of (comune, production source) pairs with no plant at all
+ABSENT_SOURCE_SHARE = 0.3
+
+# rough mainland outline (lon, lat) the territories partition
+ITALY_OUTLINE = [
+    (7.0, 43.8), (6.6, 45.1), (7.0, 45.9), (8.4, 46.4), (9.3, 46.5), (10.4, 46.6),
+    (12.2, 47.1), (13.7, 46.5), (13.8, 45.6), (12.4, 45.4), (12.3, 44.5), (13.6, 43.5),
+    (14.2, 42.4), (16.2, 41.9), (18.5, 40.2), (17.9, 39.9), (16.6, 40.7), (17.1, 39.0),
+    (16.1, 37.9), (15.6, 38.3), (15.6, 40.1), (14.0, 40.8), (12.6, 41.4), (11.1, 42.4),
+    (10.5, 43.0), (10.2, 43.9), (8.8, 44.4), (7.5, 43.8),
+]
+
+# PARAM_META keys of api/scenarios.py derived here, with their unit
+PARAM_KEYS = [
+    ("consumption_mwh", "MWh"),
+    ("production_mwh", "MWh"),
+    ("self_consumption_mwh", "MWh"),
+    ("over_production_mwh", "MWh"),
+    ("uncovered_demand_mwh", "MWh"),
+    ("self_consumption_index", "ratio"),
+    ("self_sufficiency_index", "ratio"),
+    ("over_production_index", "ratio"),
+]
+
+# repo DDL applied after the load, in order (the wide table backfills itself)
+REPO_SQL = ["scenario_param_indexes.sql", "fact_energy_load.sql", "fact_scenario_wide.sql", "dataset_version.sql"]
+
+FACT_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS ix_fact_energy_source_time ON energy_dw.fact_energy (data_source, time_id);
+CREATE INDEX IF NOT EXISTS ix_fact_energy_territory ON energy_dw.fact_energy (territory_id);
+CREATE INDEX IF NOT EXISTS ix_dim_time_year ON energy_dw.dim_time (year, month, day_type, hour);
+CREATE INDEX IF NOT EXISTS ix_dim_territory_en_codes ON energy_dw.dim_territory_en (level, reg_cod, prov_cod, mun_cod);
+"""
+
+FACT_COLUMNS = ["territory_id", "time_id", "category_id", "scenario_id", "value_mwh",
+                "time_resolution", "data_source"]
+
+
+# --- binary COPY ------------------------------------------------------------
+
+_PG_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_PG_BINARY_TRAILER = struct.pack(">h", -1)
+
+
+def binary_copy_buffer(columns: list[tuple[str, object]]) -> io.BytesIO:
+    """
+    Encode rows for COPY ... (FORMAT binary) without a per-row loop.
+    columns is [(pg_type, values)] with pg_type in int4 / float8 / text;
+    int4 / float8 values are equal-length arrays (or scalars), text values
+    a single str repeated on every row. NULLs are not supported.
+    """
+    n = max((np.size(v) for t, v in columns if t != "text"), default=1)
+    fields = [("n", ">i2")]
+    for i, (pg_type, values) in enumerate(columns):
+        if pg_type == "int4":
+            dtype = ">i4"
+        elif pg_type == "float8":
+            dtype = ">f8"
+        elif pg_type == "text":
+            dtype = f"S{len(values.encode('utf-8'))}"
+        else:
+            raise ValueError(f"Unsupported type {pg_type}")
+        fields += [(f"l{i}", ">i4"), (f"v{i}", dtype)]
+
+    rec = np.empty(n, dtype=fields)
+    rec["n"] = len(columns)
+    for i, (pg_type, values) in enumerate(columns):
+        if pg_type == "text":
+            raw = values.encode("utf-8")
+            rec[f"l{i}"] = len(raw)
+            rec[f"v{i}"] = raw
+        else:
+            rec[f"l{i}"] = 4 if pg_type == "int4" else 8
+            rec[f"v{i}"] = values
+
+    buf = io.BytesIO()
+    buf.write(_PG_BINARY_HEADER)
+    buf.write(rec.tobytes())
+    buf.write(_PG_BINARY_TRAILER)
+    buf.seek(0)
+    return buf
+
+
+def _copy_binary(cur, table: str, names: list[str], columns: list[tuple[str, object]]):
+    cur.copy_expert(f"COPY {table} ({', '.join(names)}) FROM STDIN WITH (FORMAT binary)",
+                    binary_copy_buffer(columns))
+
+
+def _copy_text(cur, table: str, names: list[str], rows):
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(r"\N" if v is None else str(v) for v in row) + "\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(names)}) FROM STDIN", buf)
+
+
+def copy_facts(cur, territory_ids, time_ids, values, scenario_id: int, resolution: str, source: str,
+               keep=None):
+    """
+    COPY one block of fact_energy rows. territory_ids (n,), values
+    (n, N_CAT, *time_shape) and time_ids (time_shape) broadcast to one row
+    per cell; keep (n, N_CAT) drops absent (territory, category) pairs.
+    """
+    time_ids = np.asarray(time_ids)
+    shape = values.shape
+    tid = np.broadcast_to(np.asarray(territory_ids).reshape((-1,) + (1,) * (len(shape) - 1)), shape)
+    cid = np.broadcast_to(CATEGORY_IDS.reshape((1, -1) + (1,) * (len(shape) - 2)), shape)
+    tm = np.broadcast_to(time_ids, shape)
+
+    if keep is not None:
+        mask = np.broadcast_to(keep.reshape(keep.shape + (1,) * (len(shape) - 2)), shape)
+        tid, cid, tm, vals = tid[mask], cid[mask], tm[mask], values[mask]
+    else:
+        tid, cid, tm, vals = tid.ravel(), cid.ravel(), tm.ravel(), values.ravel()
+    if not vals.size:
+        return 0
+
+    _copy_binary(cur, "energy_dw.fact_energy", FACT_COLUMNS, [
+        ("int4", tid), ("int4", tm), ("int4", cid), ("int4", scenario_id),
+        ("float8", vals), ("text", resolution), ("text", source),
+    ])
+    return vals.size
+
+
+# --- territories -------------------------------------------------------------
+
+def plan_hierarchy(rng: np.random.Generator, regions: int, provinces: int, comuni: int):
+    """
+    Uneven but complete split: (region index of each province,
+    comune count of each province), every parent getting at least one child.
+    """
+    if not (regions <= provinces <= comuni):
+        raise ValueError("Need regions <= provinces <= comuni")
+
+    per_region = 1 + rng.multinomial(provinces - regions, rng.dirichlet(np.full(regions, 2.0)))
+    prov_region = np.repeat(np.arange(regions), per_region)
+
+    weights = rng.lognormal(0.0, 0.6, provinces)
+    per_province = 1 + rng.multinomial(comuni - provinces, weights / weights.sum())
+    return prov_region, per_province
+
+
+def partition(rng: np.random.Generator, parent, n: int) -> np.ndarray:
+    """Split polygon `parent` into n Voronoi cells clipped to it (array of MultiPolygons)."""
+    if n == 1:
+        return np.array([_as_multi(parent)], dtype=object)
+
+    xmin, ymin, xmax, ymax = parent.bounds
+    pts = np.empty((0, 2))
+    while len(pts) < n:
+        cand = rng.uniform((xmin, ymin), (xmax, ymax), size=(2 * n, 2))
+        pts = np.vstack([pts, cand[shapely.contains_xy(parent, cand[:, 0], cand[:, 1])]])
+    pts = pts[:n]
+
+    cells = shapely.get_parts(shapely.voronoi_polygons(shapely.multipoints(pts), extend_to=parent))
+    cells = shapely.intersection(cells, parent)
+    if len(cells) != n:
+        raise RuntimeError(f"Voronoi split returned {len(cells)} cells for {n} points")
+    return np.array([_as_multi(c) for c in cells], dtype=object)
+
+
+def _as_multi(geom):
+    if geom.geom_type == "MultiPolygon":
+        return geom
+    parts = [p for p in shapely.get_parts(geom) if p.geom_type == "Polygon"]
+    return shapely.MultiPolygon(parts)
+
+
+def _ewkb(geoms) -> list[str]:
+    return list(shapely.to_wkb(shapely.set_srid(np.asarray(geoms, dtype=object), 4326),
+                               hex=True, include_srid=True))
+
+
+TERRITORY_COLUMNS = ["id", "level", "region_name", "province_name", "municipality_name",
+                     "reg_cod", "prov_cod", "mun_cod", "geom"]
+
+
+# --- time ---------------------------------------------------------------------
+
+def build_times(years: list[int]):
+    """
+    Rows of dim_time plus id arrays per year: annual (scalar), monthly
+    (12, 2) and hourly (12, 2, 24), indexed [month - 1, day type, hour - 1].
+    """
+    rows = []
+    ids = {}
+    next_id = 1
+    for year in years:
+        monthly = np.zeros((12, 2), dtype=np.int32)
+        hourly = np.zeros((12, 2, 24), dtype=np.int32)
+        annual = next_id
+        rows.append((next_id, year, None, None, None, None))
+        next_id += 1
+        for m in range(12):
+            season = SEASON_OF_MONTH[m + 1]
+            for d, day_type in enumerate(DAY_TYPES):
+                monthly[m, d] = next_id
+                rows.append((next_id, year, m + 1, day_type, None, season))
+                next_id += 1
+                for h in range(24):
+                    hourly[m, d, h] = next_id
+                    rows.append((next_id, year, m + 1, day_type, h + 1, season))
+                    next_id += 1
+        ids[year] = {"annual": annual, "monthly": monthly, "hourly": hourly}
+    return rows, ids
+
+
+# --- values -------------------------------------------------------------------
+
+def category_profiles(rng: np.random.Generator) -> np.ndarray:
+    """Unit hourly shapes per category, (N_CAT, 12 months, 2 day types, 24 h)."""
+    h = np.arange(24)
+    m = np.arange(12)[:, None, None]
+    weekend = np.array([0.0, 1.0])[None, :, None]
+
+    daylight = np.clip(np.sin((h - 5) / 14 * np.pi), 0, None)[None, None, :]
+    summer = 1.0 + 0.6 * np.cos((m - 6) / 12 * 2 * np.pi)
+    winter = 1.0 + 0.3 * np.cos(m / 12 * 2 * np.pi)
+    evening = 0.6 + 0.4 * np.exp(-((h - 19) ** 2) / 8)[None, None, :]
+    office = 0.4 + 0.6 * np.exp(-((h - 12) ** 2) / 18)[None, None, :]
+
+    shapes = {
+        "domestic": evening * winter * (1 + 0.2 * weekend),
+        "primary": office * (1 - 0.3 * weekend),
+        "secondary": office * (1 - 0.6 * weekend) * winter,
+        "tertiary": office * (1 - 0.4 * weekend),
+        "solar": daylight * summer,
+        "wind": 0.5 + rng.random((12, 2, 24)),
+        "hydroelectric": winter,
+        "geothermal": 1.0,
+        "biomass": 0.8 + 0.2 * winter,
+    }
+    return np.stack([np.broadcast_to(shapes[g], (12, 2, 24)) for _, g, _ in CATEGORIES])
+
+
+def comune_block(rng: np.random.Generator, profiles: np.ndarray, n: int, growth: float):
+    """(hourly values (n, N_CAT, 12, 2, 24), keep mask (n, N_CAT)) for n comuni."""
+    size = rng.lognormal(0.0, 1.0, n)
+    weight = rng.uniform(0.2, 1.0, (n, N_CAT))
+    keep = ~(IS_PRODUCTION & (rng.random((n, N_CAT)) < ABSENT_SOURCE_SHARE))
+    scale = (size[:, None] * weight * keep * growth)[:, :, None, None, None]
+    values = scale * profiles[None] * rng.uniform(0.9, 1.1, (n, N_CAT, 12, 2, 24))
+    return values, keep
+
+
+def rollup(hourly: np.ndarray):
+    """(monthly (..., 12, 2), annual (..., )) totals of typical-day hourly values."""
+    monthly = hourly.sum(axis=-1) * DAYS_PER_MONTH
+    return monthly, monthly.sum(axis=(-1, -2))
+
+
+# --- generation ---------------------------------------------------------------
+
+def _run_sql_file(cur, path: str):
+    with open(path, encoding="utf-8") as f:
+        cur.execute(f.read())
+
+
+def _copy_levels(cur, ids, hourly, time_ids, scenario_id, level):
+    """hourly / monthly / annual agg_{level}_* rows for parent territories."""
+    monthly, annual = rollup(hourly)
+    keep = annual > 0
+    n = 0
+    n += copy_facts(cur, ids, time_ids["hourly"], hourly, scenario_id, "hourly", f"agg_{level}_hourly", keep)
+    n += copy_facts(cur, ids, time_ids["monthly"], monthly, scenario_id, "monthly", f"agg_{level}_monthly", keep)
+    n += copy_facts(cur, ids, time_ids["annual"], annual, scenario_id, "annual", f"agg_{level}_annual", keep)
+    return n
+
+
+def copy_scenario_params(cur, scenario_ids: list[int], territory_ids, year: int, c, p):
+    """
+    EAV indicator rows for every territory and scenario; scenario k scales
+    production by 1 + 0.25 * k (k = 0 is the baseline).
+    """
+    names = ["scenario_id", "territory_id", "param_key", "param_value", "unit", "year", "notes"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k, scenario_id in enumerate(scenario_ids):
+            pk = p * (1.0 + 0.25 * k)
+            sc = np.minimum(c, pk)
+            op = np.maximum(pk - c, 0.0)
+            metrics = {
+                "consumption_mwh": c,
+                "production_mwh": pk,
+                "self_consumption_mwh": sc,
+                "over_production_mwh": op,
+                "uncovered_demand_mwh": np.maximum(c - pk, 0.0),
+                "self_consumption_index": np.where(pk > 0, sc / pk, 0.0),
+                "self_sufficiency_index": np.where(c > 0, sc / c, 0.0),
+                "over_production_index": np.where(pk > 0, op / pk, 0.0),
+            }
+            for key, unit in PARAM_KEYS:
+                _copy_binary(cur, "energy_dw.fact_scenario_param", names, [
+                    ("int4", scenario_id), ("int4", territory_ids), ("text", key),
+                    ("float8", metrics[key]), ("text", unit), ("int4", year), ("text", "bench datagen"),
+                ])
+
+
+def generate(dsn: str, regions: int, provinces: int, comuni: int, years: list[int],
+             scenarios: int = 4, seed: int = 42, block: int = 200):
+    """Drop and rebuild energy_dw in `dsn` (see module docstring)."""
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    years = sorted(years)
+
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    print("Creating schema")
+    _run_sql_file(cur, os.path.join(BENCH_DIR, "schema.sql"))
+
+    # dimensions
+    time_rows, time_ids = build_times(years)
+    _copy_text(cur, "energy_dw.dim_time", ["id", "year", "month", "day_type", "hour", "season"], time_rows)
+    _copy_text(cur, "energy_dw.dim_energy_category", ["id", "code", "base_group", "domain"],
+               [(i + 1, *c) for i, c in enumerate(CATEGORIES)])
+    scenario_ids = list(range(1, scenarios + 1))
+    _copy_text(cur, "energy_dw.dim_scenario",
+               ["id", "code", "name_en", "horizon_year", "scenario_group", "is_baseline", "source"],
+               [(sid, str(k), f"Scenario {k}", years[-1], "bench", k == 0, "bench")
+                for k, sid in enumerate(scenario_ids)])
+    cur.execute("SELECT setval('energy_dw.dim_scenario_id_seq', %s);", (scenarios,))
+    base_scenario = scenario_ids[0]
+
+    prov_region, per_province = plan_hierarchy(rng, regions, provinces, comuni)
+    mun_mult = 10 ** max(3, len(str(int(per_province.max()))))
+    region_ids = np.arange(1, regions + 1, dtype=np.int32)
+    province_ids = np.arange(regions + 1, regions + provinces + 1, dtype=np.int32)
+
+    print(f"Partitioning {regions} regions / {provinces} provinces / {comuni} comuni")
+    region_geoms = partition(rng, shapely.Polygon(ITALY_OUTLINE), regions)
+    province_geoms = np.empty(provinces, dtype=object)
+    for r in range(regions):
+        idx = np.flatnonzero(prov_region == r)
+        province_geoms[idx] = partition(rng, region_geoms[r], len(idx))
+
+    region_names = [f"Region {r + 1}" for r in range(regions)]
+    province_names = [f"Province {p + 1}" for p in range(provinces)]
+    _copy_text(cur, "energy_dw.dim_territory_en", TERRITORY_COLUMNS, [
+        (int(region_ids[r]), "region", region_names[r], None, None, r + 1, None, None, g)
+        for r, g in enumerate(_ewkb(region_geoms))
+    ] + [
+        (int(province_ids[p]), "province", region_names[prov_region[p]], province_names[p], None,
+         int(prov_region[p]) + 1, p + 1, None, g)
+        for p, g in enumerate(_ewkb(province_geoms))
+    ])
+    conn.commit()
+
+    # facts: comuni block by block, parent sums accumulated in memory
+    profiles = category_profiles(rng)
+    growth = {year: 1.0 + 0.02 * (year - years[0]) for year in years}
+    prov_hourly = {year: np.zeros((provinces, N_CAT, 12, 2, 24)) for year in years}
+    comune_ids_all = np.empty(comuni, dtype=np.int32)
+    comune_annual = {year: np.zeros((comuni, N_CAT)) for year in years}
+
+    next_id = regions + provinces + 1
+    done = 0
+    n_facts = 0
+    for p in range(provinces):
+        count = int(per_province[p])
+        geoms = partition(rng, province_geoms[p], count)
+        ids = np.arange(next_id, next_id + count, dtype=np.int32)
+        next_id += count
+        comune_ids_all[done:done + count] = ids
+        _copy_text(cur, "energy_dw.dim_territory_en", TERRITORY_COLUMNS, [
+            (int(ids[i]), "comune", region_names[prov_region[p]], province_names[p],
+             f"Comune {(p + 1) * mun_mult + i + 1}", int(prov_region[p]) + 1, p + 1,
+             (p + 1) * mun_mult + i + 1, g)
+            for i, g in enumerate(_ewkb(geoms))
+        ])
+
+        for start in range(0, count, block):
+            stop = min(start + block, count)
+            block_ids = ids[start:stop]
+            for year in years:
+                t = time_ids[year]
+                values, keep = comune_block(rng, profiles, stop - start, growth[year])
+                monthly, annual = rollup(values)
+                prod_keep = keep & IS_PRODUCTION
+
+                n_facts += copy_facts(cur, block_ids, t["hourly"], values, base_scenario,
+                                      "hourly", RAW_SOURCE, keep)
+                n_facts += copy_facts(cur, block_ids, t["hourly"], values * FUTURE_FACTOR, base_scenario,
+                                      "hourly", FUTURE_SOURCE, prod_keep)
+                n_facts += copy_facts(cur, block_ids, t["monthly"], monthly, base_scenario,
+                                      "monthly", "agg_comune_monthly", keep)
+                n_facts += copy_facts(cur, block_ids, t["annual"], annual, base_scenario,
+                                      "annual", "agg_comune_annual", keep)
+
+                prov_hourly[year][p] += values.sum(axis=0)
+                comune_annual[year][done + start:done + stop] = annual
+            conn.commit()
+
+        done += count
+        elapsed = time.perf_counter() - started
+        print(f"  {done}/{comuni} comuni, {n_facts} fact rows ({n_facts / elapsed:,.0f} rows/s)")
+
+    # parents and scenario parameters
+    print("Province / region aggregates and scenario parameters")
+    cons = ~IS_PRODUCTION
+    for year in years:
+        t = time_ids[year]
+        reg_hourly = np.zeros((regions, N_CAT, 12, 2, 24))
+        np.add.at(reg_hourly, prov_region, prov_hourly[year])
+        n_facts += _copy_levels(cur, province_ids, prov_hourly[year], t, base_scenario, "province")
+        n_facts += _copy_levels(cur, region_ids, reg_hourly, t, base_scenario, "region")
+
+        annual = np.concatenate([
+            rollup(reg_hourly)[1], rollup(prov_hourly[year])[1], comune_annual[year],
+        ])
+        territory_ids = np.concatenate([region_ids, province_ids, comune_ids_all])
+        copy_scenario_params(cur, scenario_ids, territory_ids, year,
+                             annual[:, cons].sum(axis=1), annual[:, IS_PRODUCTION].sum(axis=1))
+        conn.commit()
+
+    print("Indexes and repo DDL")
+    cur.execute(FACT_INDEXES_SQL)
+    for name in REPO_SQL:
+        _run_sql_file(cur, os.path.join(SQL_DIR, name))
+    conn.commit()
+
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE;")
+    cur.close()
+    conn.close()
+    print(f"Done: {n_facts} fact_energy rows in {time.perf_counter() - started:.1f}s")
+    return n_facts
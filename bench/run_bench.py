@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Latency / throughput benchmark of the Flask API against a seeded database
+(see bench/seed.py).
+
+Each workload replays the requests a frontend hook makes, with parameters
+drawn (deterministically, --seed) from the territories, categories and
+scenarios actually present in the database. Requests run in-process on the
+app's test client, one client per worker thread, and every DB round trip is
+timed at the cursor, so each result reports:
+
+  p50 / p95 / p99 / max latency (ms), throughput (req/s),
+  DB time per request (execute + fetch, ms) and its share of the latency.
+
+Results are written to bench/results/<timestamp>-<label>.json; --compare
+prints per-workload deltas against an earlier result and exits non-zero
+when a p50 or p95 regressed by more than --threshold.
+
+  python bench/run_bench.py --label baseline
+  python bench/run_bench.py --only charts_series_hourly --requests 500 --concurrency 8
+  python bench/run_bench.py --label after --compare bench/results/20260101-120000-baseline.json
+
+--engine duckdb runs the DUCKDB_ENDPOINTS (default: charts_values,
+charts_series) on DuckDB over the Parquet snapshot (utils/columnar.py),
+exporting it from the benchmark database first if it is missing or stale;
+DuckDB time is counted as DB time. To compare the engines:
+
+  python bench/run_bench.py --only charts_values --only charts_series_hourly --cold --label pg
+  python bench/run_bench.py --only charts_values --only charts_series_hourly --cold --label duck \
+      --engine duckdb --compare bench/results/<timestamp>-pg.json
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import psycopg2
+import psycopg2.extensions
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, ROOT)
+
+from datagen import DEFAULT_DSN  # noqa: E402
+
+# per-thread DB time of the request being measured
+_db = threading.local()
+
+
+class _TimedCursor(psycopg2.extensions.cursor):
+    """Cursor that adds execute / fetch wall time to the current thread's counters."""
+
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            _db.seconds = getattr(_db, "seconds", 0.0) + (time.perf_counter() - t0)
+
+    def execute(self, query, vars=None):
+        _db.queries = getattr(_db, "queries", 0) + 1
+        return self._timed(super().execute, query, vars)
+
+    def fetchall(self):
+        return self._timed(super().fetchall)
+
+    def fetchone(self):
+        return self._timed(super().fetchone)
+
+
+def _install_db(dsn: str):
+    """Point utils.db_utils at the benchmark database through the timed cursor."""
+    from utils import db_utils
+
+    def get_connection():
+        return psycopg2.connect(dsn, cursor_factory=_TimedCursor)
+
+    db_utils.get_connection = get_connection
+
+
+def _install_duckdb():
+    """Time DuckDB queries like the cursor times Postgres; export the snapshot if it can't be used."""
+    from utils import columnar
+
+    if columnar.ENGINE is None:
+        sys.exit("--engine duckdb needs the duckdb package (pip install duckdb)")
+    if not columnar.ENGINE.ready():
+        print(f"Exporting the Parquet snapshot to {columnar.ENGINE.path} ...")
+        columnar.build_snapshot(columnar.ENGINE.path)
+        columnar.ENGINE.load()
+        if not columnar.ENGINE.ready():
+            sys.exit("Parquet snapshot unusable (no fact rows?)")
+
+    execute = columnar.DuckEngine.execute
+
+    def timed(self, query, params=None):
+        _db.queries = getattr(_db, "queries", 0) + 1
+        t0 = time.perf_counter()
+        try:
+            return execute(self, query, params)
+        finally:
+            _db.seconds = getattr(_db, "seconds", 0.0) + (time.perf_counter() - t0)
+
+    columnar.DuckEngine.execute = timed
+
+
+def _clear_caches():
+    """Drop the in-process response caches so every request reaches the DB."""
+    from utils.warmup import clear_caches
+
+    clear_caches()
+
+
+def load_context(dsn: str) -> dict:
+    """Parameter pools for the workloads, read from the seeded database."""
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+
+    def col(sql):
+        cur.execute(sql)
+        return [r[0] for r in cur.fetchall()]
+
+    ctx = {
+        "region": col("SELECT reg_cod FROM energy_dw.dim_territory_en WHERE level = 'region' ORDER BY 1;"),
+        "province": col("SELECT prov_cod FROM energy_dw.dim_territory_en WHERE level = 'province' ORDER BY 1;"),
+        "comune": col("SELECT mun_cod FROM energy_dw.dim_territory_en WHERE level = 'comune' ORDER BY 1;"),
+        "years": col("SELECT DISTINCT year FROM energy_dw.dim_time ORDER BY 1;"),
+        "scenarios": col("SELECT code FROM energy_dw.dim_scenario ORDER BY id;"),
+        "cons_categories": col("SELECT code FROM energy_dw.dim_energy_category WHERE domain = 'consumption' ORDER BY 1;"),
+        "prod_groups": col("SELECT DISTINCT lower(base_group) FROM energy_dw.dim_energy_category "
+                           "WHERE domain = 'production' ORDER BY 1;"),
+    }
+    cur.execute("SELECT count(*) FROM energy_dw.fact_energy;")
+    ctx["fact_rows"] = cur.fetchone()[0]
+    cur.close()
+    conn.close()
+    return ctx
+
+
+def _url(path: str, params: dict) -> str:
+    return f"{path}?{urllib.parse.urlencode(params, doseq=True)}"
+
+
+def _pick_territory(rng: random.Random, ctx: dict, levels=("province", "comune")):
+    level = rng.choice(levels)
+    return level, {f"{level}_code": rng.choice(ctx[level])}
+
+
+# --- workloads: (rng, ctx) -> url, mirroring the frontend hooks -----------
+
+def w_map_territories(rng, ctx):
+    # useGeoData: region / province outlines, comuni when zoomed in
+    level = rng.choices(["region", "province", "comune"], weights=[3, 5, 2])[0]
+    return _url("/map/territories", {"level": level})
+
+
+def w_charts_values(rng, ctx):
+    # useGeoData / PlaceInfo: annual choropleth, total or one breakdown
+    level = rng.choice(["region", "province", "comune"])
+    domain = rng.choice(["consumption", "production"])
+    params = {"level": level, "resolution": "annual", "year": ctx["years"][-1],
+              "domain": domain, "scenario": ctx["scenarios"][0]}
+    if rng.random() < 0.5:
+        if domain == "production":
+            params["base_group"] = rng.choice(ctx["prod_groups"])
+        else:
+            params["category_code"] = rng.choice(ctx["cons_categories"])
+    return _url("/charts/values", params)
+
+
+def w_charts_series_monthly(rng, ctx):
+    # useMonthly / useDaily: one territory, total, breakdown or day type
+    level, code = _pick_territory(rng, ctx)
+    domain = rng.choice(["consumption", "production"])
+    params = {"level": level, "resolution": "monthly", "year": ctx["years"][-1],
+              "domain": domain, "scenario": ctx["scenarios"][0], **code}
+    r = rng.random()
+    if r < 0.3:
+        params["day_type"] = rng.choice(["weekday", "weekend"])
+    elif r < 0.7:
+        if domain == "production":
+            params["base_group"] = rng.choice(ctx["prod_groups"])
+        else:
+            params["category_code"] = rng.choice(ctx["cons_categories"])
+    return _url("/charts/series", params)
+
+
+def w_charts_series_hourly(rng, ctx):
+    # useHourlyCalendar: one month x day type at a time
+    level, code = _pick_territory(rng, ctx)
+    params = {"level": level, "resolution": "hourly", "year": ctx["years"][-1],
+              "domain": rng.choice(["consumption", "production"]), "scenario": ctx["scenarios"][0],
+              "month": rng.randint(1, 12), "day_type": rng.choice(["weekday", "weekend"]), **code}
+    return _url("/charts/series", params)
+
+
+SCENARIO_KEYS = ["consumption_mwh", "production_mwh", "self_consumption_index",
+                 "self_sufficiency_index", "over_production_index"]
+
+
+def w_scenarios_values(rng, ctx):
+    return _url("/scenarios/values", {
+        "level": rng.choice(["region", "province", "comune"]),
+        "scenario": rng.choice(ctx["scenarios"]), "year": ctx["years"][-1],
+        "param_key": rng.choice(SCENARIO_KEYS),
+    })
+
+
+def w_scenarios_territory(rng, ctx):
+    # useScenarioTerritory(Batch)
+    level, code = _pick_territory(rng, ctx, ("region", "province", "comune"))
+    return _url("/scenarios/territory", {"level": level, "scenario": rng.choice(ctx["scenarios"]),
+                                         "year": ctx["years"][-1], **code})
+
+
+def w_scenarios_ranking(rng, ctx):
+    return _url("/scenarios/ranking", {
+        "level": rng.choice(["province", "comune"]), "scenario": rng.choice(ctx["scenarios"]),
+        "year": ctx["years"][-1], "param_key": rng.choice(SCENARIO_KEYS), "n": 10,
+    })
+
+
+def w_scenarios_compare(rng, ctx):
+    a, b = rng.sample(ctx["scenarios"], 2) if len(ctx["scenarios"]) > 1 else (ctx["scenarios"][0],) * 2
+    return _url("/scenarios/compare", {
+        "level": rng.choice(["province", "comune"]), "a": a, "b": b,
+        "year": ctx["years"][-1], "param_key": rng.choice(SCENARIO_KEYS),
+    })
+
+
+def w_scenarios_preview(rng, ctx):
+    # BuildScenarioPanel: uplift slider over a few production groups
+    groups = rng.sample(ctx["prod_groups"], rng.randint(0, min(2, len(ctx["prod_groups"]))))
+    params = {"level": rng.choice(["region", "province"]),
+              "resolution": rng.choice(["annual", "monthly", "seasonal"]),
+              "year": ctx["years"][-1], "base_scenario": ctx["scenarios"][0],
+              "uplift_pct": rng.choice([10, 25, 50])}
+    if groups:
+        params["uplift_categories"] = ",".join(groups)
+    return _url("/scenarios/preview", params)
+
+
+WORKLOADS = {
+    "map_territories": w_map_territories,
+    "charts_values": w_charts_values,
+    "charts_series_monthly": w_charts_series_monthly,
+    "charts_series_hourly": w_charts_series_hourly,
+    "scenarios_values": w_scenarios_values,
+    "scenarios_territory": w_scenarios_territory,
+    "scenarios_ranking": w_scenarios_ranking,
+    "scenarios_compare": w_scenarios_compare,
+    "scenarios_preview": w_scenarios_preview,
+}
+
+
+def _stats(samples: list[tuple[float, float, int, int]], wall: float) -> dict:
+    lat = np.array([s[0] for s in samples]) * 1000
+    db = np.array([s[1] for s in samples]) * 1000
+    queries = np.array([s[2] for s in samples])
+    errors = sum(1 for s in samples if s[3] >= 400)
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(lat.max()), 2),
+        "mean_ms": round(float(lat.mean()), 2),
+        "throughput_rps": round(len(samples) / wall, 1),
+        "db_mean_ms": round(float(db.mean()), 2),
+        "db_p95_ms": round(float(np.percentile(db, 95)), 2),
+        "db_share": round(float(db.sum() / lat.sum()), 3) if lat.sum() else 0.0,
+        "queries_per_request": round(float(queries.mean()), 2),
+    }
+
+
+def run_workload(app, name: str, ctx: dict, requests: int, warmup: int, concurrency: int,
+                 seed: int, cold: bool) -> dict:
+    rng = random.Random(f"{seed}:{name}")
+    urls = [WORKLOADS[name](rng, ctx) for _ in range(warmup + requests)]
+    local = threading.local()
+
+    def one(url):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        if cold:
+            _clear_caches()
+        _db.seconds = 0.0
+        _db.queries = 0
+        t0 = time.perf_counter()
+        resp = client.get(url)
+        resp.get_data()  # include body serialization
+        return time.perf_counter() - t0, _db.seconds, _db.queries, resp.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, urls[:warmup]))
+        started = time.perf_counter()
+        samples = list(pool.map(one, urls[warmup:]))
+        wall = time.perf_counter() - started
+
+    return _stats(samples, wall)
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """Print deltas vs baseline; True if any p50/p95 regressed beyond threshold."""
+    regressed = False
+    print(f"\n{'workload':<24}{'p50 ms':>18}{'p95 ms':>18}{'req/s':>16}")
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        deltas = {k: (cur[k] - base[k]) / base[k] if base[k] else 0.0
+                  for k in ("p50_ms", "p95_ms", "throughput_rps")}
+        cells = [f"{cur[k]:>8.1f} ({d:+6.1%})" for k, d in deltas.items()]
+        worse = deltas["p50_ms"] > threshold or deltas["p95_ms"] > threshold
+        regressed = regressed or worse
+        print(f"{name:<24}{cells[0]:>18}{cells[1]:>18}{cells[2]:>16}{'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=DEFAULT_DSN)
+    parser.add_argument("--only", choices=sorted(WORKLOADS), action="append", help="workload(s) to run")
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per workload")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cold", action="store_true", help="clear in-process caches before every request")
+    parser.add_argument("--engine", choices=["postgres", "duckdb"], default="postgres",
+                        help="engine for the DUCKDB_ENDPOINTS (default: postgres for everything)")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--compare", help="earlier result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold (default 10%%)")
+    args = parser.parse_args()
+
+    # read by utils/columnar.py at import
+    if args.engine == "duckdb":
+        os.environ.setdefault("DUCKDB_ENDPOINTS", "charts_values,charts_series")
+    else:
+        os.environ["DUCKDB_ENDPOINTS"] = ""
+    _install_db(args.dsn)
+    from app import app
+
+    if args.engine == "duckdb":
+        _install_duckdb()
+
+    ctx = load_context(args.dsn)
+    print(f"Dataset: {len(ctx['region'])} regions, {len(ctx['province'])} provinces, "
+          f"{len(ctx['comune'])} comuni, {ctx['fact_rows']} fact rows")
+
+    results = {}
+    for name in args.only or WORKLOADS:
+        res = run_workload(app, name, ctx, args.requests, args.warmup, args.concurrency, args.seed, args.cold)
+        results[name] = res
+        print(f"{name:<24} p50 {res['p50_ms']:>8.1f}  p95 {res['p95_ms']:>8.1f}  p99 {res['p99_ms']:>8.1f} ms  "
+              f"{res['throughput_rps']:>7.1f} req/s  db {res['db_mean_ms']:>7.1f} ms ({res['db_share']:.0%})"
+              f"{'  errors: ' + str(res['errors']) if res['errors'] else ''}")
+
+    now = dt.datetime.now()
+    out = {
+        "label": args.label,
+        "timestamp": now.isoformat(timespec="seconds"),
+        "git": _git_rev(),
+        "dataset": {k: (len(v) if isinstance(v, list) else v) for k, v in ctx.items()},
+        "args": {k: getattr(args, k) for k in ("requests", "warmup", "concurrency", "seed", "cold", "engine")},
+        "results": results,
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{now:%Y%m%d-%H%M%S}-{args.label}.json")
+    with open(path, "w") as f:
+        json.dump(out, f, indent=2)
+    print(f"Saved {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(out, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+-- bench/schema.sql
+--
+-- Minimal energy_dw star schema for the benchmark database: only the tables
+-- and columns the Flask API reads. bench/datagen.py runs this, loads the
+-- synthetic data, then applies the repo's own sql/*.sql (indexes, wide
+-- scenario table, fact_energy natural key), so benchmarks see the same
+-- physical design as production.
+--
+-- Drops and recreates the schema: never point it at a real energy_dw.
+
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+DROP SCHEMA IF EXISTS energy_dw CASCADE;
+CREATE SCHEMA energy_dw;
+
+CREATE TABLE energy_dw.dim_territory_en (
+  id                integer PRIMARY KEY,
+  level             text NOT NULL,           -- region | province | comune
+  region_name       text,
+  province_name     text,
+  municipality_name text,
+  reg_cod           integer,
+  prov_cod          integer,
+  mun_cod           integer,
+  geom              geometry(MultiPolygon, 4326)
+);
+
+CREATE TABLE energy_dw.dim_time (
+  id        integer PRIMARY KEY,
+  year      integer NOT NULL,
+  month     integer,                         -- NULL on annual rows
+  day_type  text,                            -- weekday | weekend, NULL on annual rows
+  hour      integer,                         -- 1..24, NULL on annual / monthly rows
+  season    text
+);
+
+CREATE TABLE energy_dw.dim_energy_category (
+  id          integer PRIMARY KEY,
+  code        text NOT NULL,
+  base_group  text,
+  domain      text NOT NULL                  -- consumption | production
+);
+
+CREATE TABLE energy_dw.dim_scenario (
+  id              serial PRIMARY KEY,
+  code            text NOT NULL,
+  name_en         text,
+  name_it         text,
+  description     text,
+  horizon_year    integer,
+  scenario_group  text,
+  is_baseline     boolean DEFAULT false,
+  source          text
+);
+
+CREATE TABLE energy_dw.fact_energy (
+  territory_id     integer NOT NULL,
+  time_id          integer NOT NULL,
+  category_id      integer NOT NULL,
+  scenario_id      integer NOT NULL,
+  value_mwh        double precision,
+  time_resolution  text NOT NULL,            -- hourly | monthly | annual
+  data_source      text NOT NULL             -- raw source name or agg_{level}_{resolution}
+);
+
+CREATE TABLE energy_dw.fact_scenario_param (
+  id            bigserial PRIMARY KEY,
+  scenario_id   integer NOT NULL,
+  territory_id  integer NOT NULL,
+  param_key     text NOT NULL,
+  param_value   double precision,
+  unit          text,
+  year          integer,
+  notes         text
+);
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Seed a local PostgreSQL/PostGIS database with a synthetic energy_dw star
+schema for the benchmarks (bench/run_bench.py). Generation lives in
+bench/datagen.py; this is its command line.
+
+  createdb energy_bench
+  python bench/seed.py --scale small
+  python bench/seed.py --scale 1x --years 2019 2030 --dsn "dbname=energy_bench"
+  python bench/seed.py --regions 2 --provinces 4 --comuni 50   # custom layout
+
+--scale picks regions / provinces / comuni from datagen.SCALES (1x is the
+national layout, 10x / 100x multiply the comuni); --regions, --provinces
+and --comuni override single counts.
+
+The schema is dropped and recreated (bench/schema.sql): use a scratch database.
+"""
+
+import argparse
+
+from datagen import DEFAULT_DSN, SCALES, generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", default=DEFAULT_DSN, help="libpq DSN (default: $BENCH_DSN or dbname=energy_bench)")
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--regions", type=int)
+    parser.add_argument("--provinces", type=int, help="total provinces")
+    parser.add_argument("--comuni", type=int, help="total comuni")
+    parser.add_argument("--years", type=int, nargs="+", default=[2019])
+    parser.add_argument("--scenarios", type=int, default=4, help="scenario codes 0..N-1 (0 = baseline)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--block", type=int, default=200, help="comuni generated and copied per batch")
+    args = parser.parse_args()
+
+    regions, provinces, comuni = SCALES[args.scale]
+    generate(
+        args.dsn,
+        regions=args.regions or regions,
+        provinces=args.provinces or provinces,
+        comuni=args.comuni or comuni,
+        years=args.years,
+        scenarios=args.scenarios,
+        seed=args.seed,
+        block=args.block,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,10 @@
 // src/api/mockAdapter.ts
 
-// 1. Load all mocks eagerly
-const mocks = import.meta.glob("/src/data/mocks/*.json", { eager: true });
+import { getMock } from "./mockBundle";
 
-// Helper to find a mock file
-function findMockData(filename: string): any {
-  // Try exact match
-  const key = `/src/data/mocks/${filename}`;
-  if (mocks[key]) {
-    return (mocks[key] as any).default;
-  }
-  return null;
+// Helper to find a mock by its bundle key (e.g. "map_region")
+function findMockData(key: string): Promise<any> {
+  return getMock(key);
 }
 
 function parseParams(path: string, explicitParams?: Record<string, any>): Record<string, any> {
@@ -32,7 +26,7 @@ export async function getMockData(path: string, explicitParams?: Record<string,
   // 1. Map Territories (GeoJSON)
   if (path.includes("/map/territories")) {
     const level = params.level || "province";
-    return findMockData(`map_${level}.json`);
+    return findMockData(`map_${level}`);
   }
 
   // 2. Map Values (Annual)
@@ -52,7 +46,7 @@ export async function getMockData(path: string, explicitParams?: Record<string,
         suffix = `_${params.category_code}`;
     }
 
-    return findMockData(`values_${level}_${domain}${suffix}.json`);
+    return findMockData(`values_${level}_${domain}${suffix}`);
   }
 
   // 3. Charts Series
@@ -74,8 +68,8 @@ export async function getMockData(path: string, explicitParams?: Record<string,
       else if (params.base_group) suffix = `_${params.base_group}`;
       else if (params.day_type) suffix = `_${params.day_type}`;
 
-      const filename = `series_${level}_${code}_${domain}_monthly${suffix}.json`;
-      const data = findMockData(filename);
+      const filename = `series_${level}_${code}_${domain}_monthly${suffix}`;
+      const data = await findMockData(filename);
       if (data) return data;
     }
 
@@ -83,15 +77,15 @@ export async function getMockData(path: string, explicitParams?: Record<string,
     if (resolution === "hourly") {
       const month = params.month;
       const dayType = params.day_type;
-      const filename = `series_${level}_${code}_${domain}_hourly_${month}_${dayType}.json`;
+      const filename = `series_${level}_${code}_${domain}_hourly_${month}_${dayType}`;
       
-      let data = findMockData(filename);
+      let data = await findMockData(filename);
       
       // FALLBACK for Agliè/Airasca hourly data (missing in backend) -> Use Torino Scaled
       if (!data && (code == 1001 || code == 1002) && level === "comune") {
         // Find cached Torino data
-        const fallbackFilename = `series_province_1_${domain}_hourly_${month}_${dayType}.json`;
-        const fallbackData = findMockData(fallbackFilename);
+        const fallbackFilename = `series_province_1_${domain}_hourly_${month}_${dayType}`;
+        const fallbackData = await findMockData(fallbackFilename);
         
         if (fallbackData && Array.isArray(fallbackData)) {
           // Scale down by factor of ~500 for municipality
@@ -0,0 +1,64 @@
+// src/api/mockBundle.ts
+//
+// Demo mocks are packed into public/mocks/bundle.jsonl (one JSON document per
+// line) plus public/mocks/index.json ({ key: [offset, length] }), built by
+// scripts/mock_bundle.py. Both are fetched once on first use; entries are
+// decoded lazily by slicing the shared buffer and cached after parsing.
+
+type BundleIndex = {
+  version: number;
+  entries: Record<string, [number, number]>;
+};
+
+type Bundle = {
+  index: BundleIndex;
+  bytes: Uint8Array;
+};
+
+const BASE = `${import.meta.env.BASE_URL}mocks/`;
+const decoder = new TextDecoder();
+const parsed = new Map<string, any>();
+let bundlePromise: Promise<Bundle | null> | null = null;
+
+async function loadBundle(): Promise<Bundle | null> {
+  try {
+    const [indexRes, bundleRes] = await Promise.all([
+      fetch(`${BASE}index.json`),
+      fetch(`${BASE}bundle.jsonl`),
+    ]);
+    if (!indexRes.ok || !bundleRes.ok) {
+      console.error("[MockBundle] Failed to fetch bundle", indexRes.status, bundleRes.status);
+      return null;
+    }
+    const index: BundleIndex = await indexRes.json();
+    const bytes = new Uint8Array(await bundleRes.arrayBuffer());
+    return { index, bytes };
+  } catch (err) {
+    console.error("[MockBundle] Error loading bundle", err);
+    return null;
+  }
+}
+
+function getBundle(): Promise<Bundle | null> {
+  if (!bundlePromise) {
+    bundlePromise = loadBundle().then((bundle) => {
+      // allow a retry on the next call if the fetch failed
+      if (!bundle) bundlePromise = null;
+      return bundle;
+    });
+  }
+  return bundlePromise;
+}
+
+export async function getMock(key: string): Promise<any | null> {
+  if (parsed.has(key)) return parsed.get(key);
+
+  const bundle = await getBundle();
+  const entry = bundle?.index.entries[key];
+  if (!bundle || !entry) return null;
+
+  const [offset, length] = entry;
+  const data = JSON.parse(decoder.decode(bundle.bytes.subarray(offset, offset + length)));
+  parsed.set(key, data);
+  return data;
+}
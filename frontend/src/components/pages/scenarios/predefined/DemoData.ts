@@ -1,6 +1,6 @@
 // Map of known data files for the demo
-// We use dynamic imports to avoid bundling everything if not needed, 
-// though for a small demo eager import is also fine.
+// Mocks are read from the packed bundle in public/mocks (see api/mockBundle.ts).
+import { getMock } from "../../../../api/mockBundle";
 
 /*
   Territories:
@@ -42,15 +42,13 @@ async function loadJson(path: string) {
   if (CACHE[path]) return CACHE[path];
   
   try {
-    const modules = import.meta.glob('../../../../data/mocks/*.json');
-    const relativePath = `../../../../data/mocks/${path}`;
-    
-    if (modules[relativePath]) {
-        const mod: any = await modules[relativePath]();
-        CACHE[path] = mod.default || mod;
-        return CACHE[path];
+    const key = path.replace(/\.json$/, "");
+    const data = await getMock(key);
+    if (data) {
+        CACHE[path] = data;
+        return data;
     } else {
-        console.warn("DemoData: File not found", relativePath, "from filename", path);
+        console.warn("DemoData: Mock not found", key, "from filename", path);
         return null;
     }
   } catch (err) {
@@ -0,0 +1,23 @@
+# gunicorn.conf.py
+#
+#   CACHE_WARM=1 gunicorn app:app
+#
+# preload_app imports app.py once in the master: with CACHE_WARM=1 the caches
+# are filled there (utils/warmup.py) and every worker starts with them,
+# shared copy-on-write. Threads don't survive fork, so each worker starts its
+# own refresher.
+
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "4"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = True
+timeout = 120
+
+
+def post_fork(server, worker):
+    from app import app
+    from utils import warmup
+
+    warmup.start_refresher(app)
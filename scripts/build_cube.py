@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Snapshot the agg_* data sources of energy_dw.fact_energy into the in-memory
+cube (utils/cube.py) that /charts/values, /charts/series and
+/scenarios/preview answer from when CUBE_ENABLED=1.
+
+  python scripts/build_cube.py
+  python scripts/build_cube.py --out /srv/energy/cube_snapshot --only province_hourly region_hourly
+
+Run it after every load: the snapshot records the dataset version it was
+built at, and the API falls back to SQL while the version has moved on.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.cube import CUBE_SNAPSHOT, SOURCES, build_snapshot  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=CUBE_SNAPSHOT, help="snapshot directory (default: $CUBE_SNAPSHOT)")
+    parser.add_argument("--only", nargs="+", metavar="LEVEL_RESOLUTION",
+                        choices=[f"{lv}_{res}" for lv, res in SOURCES], help="subset of the agg_* sources")
+    args = parser.parse_args()
+
+    sources = None
+    if args.only:
+        sources = {(lv, res): src for (lv, res), src in SOURCES.items() if f"{lv}_{res}" in args.only}
+    manifest = build_snapshot(args.out, sources)
+    print(f"Snapshot at dataset version {manifest['dataset_version']}: {len(manifest['cubes'])} cubes in {args.out}")
+
+
+if __name__ == '__main__':
+    main()
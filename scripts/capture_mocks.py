@@ -1,12 +1,35 @@
-import os
+#!/usr/bin/env python3
+"""
+Capture API responses into the mock bundle for the offline frontend demo
+(see scripts/mock_bundle.py).
+
+Requests run in-process against the Flask app's test client (no server, no
+network) on a thread pool. The bundle is only rewritten when some entry's
+content changed, and every captured mock is listed with its request and
+SHA-256 in a single manifest (frontend/src/data/mocks.manifest.json).
+
+  python scripts/capture_mocks.py                  # everything
+  python scripts/capture_mocks.py --only values    # map | values | series
+  python scripts/capture_mocks.py --workers 16 --force
+"""
+
+import argparse
+import hashlib
 import json
-import urllib.request
+import os
+import sys
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-BASE_URL = "http://localhost:5000"
-OUTPUT_DIR = Path("frontend/src/data/mocks")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from mock_bundle import MockBundleWriter, dumps_compact  # noqa: E402
+
+MANIFEST_PATH = ROOT / "frontend" / "src" / "data" / "mocks.manifest.json"
 
 # Configuration
 YEAR = 2019
@@ -20,137 +43,142 @@ DETAILED_CASES = [
     {"level": "comune", "code": 1002, "name": "Airasca"},
 ]
 
-# Map Levels to capture (geometry + annual values)
+# Map Levels to capture (geometry)
 MAP_LEVELS = ["region", "province"]
 
-def fetch_json(url):
-    print(f"Fetching: {url}")
-    try:
-        with urllib.request.urlopen(url) as response:
-            if response.status == 200:
-                return json.loads(response.read().decode())
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-    return None
-
-def save_json(filename, data):
-    path = OUTPUT_DIR / filename
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
-    print(f"Saved: {path}")
+# Choropleth values: every level, total + breakdowns
+VALUE_LEVELS = ["region", "province", "comune"]
+PROD_GROUPS = ["solar", "wind", "hydroelectric", "geothermal", "biomass"]
+CONS_CATEGORIES = ["cons_domestic", "cons_primary", "cons_secondary", "cons_tertiary"]
 
-def main():
-    # 1. Capture Map Geometry
-    for level in MAP_LEVELS:
-        url = f"{BASE_URL}/map/territories?level={level}"
-        data = fetch_json(url)
-        if data:
-            save_json(f"map_{level}.json", data)
-
-    # 2. Capture Map Values (Annual 2019)
-    # We need annual values for the choropleth map for ALL regions/provinces.
-    for level in MAP_LEVELS:
-        # Consumption
-        url = f"{BASE_URL}/energy/values?level={level}&resolution=annual&year={YEAR}&domain=consumption&scenario={SCENARIO}"
-        data = fetch_json(url)
-        if data:
-            save_json(f"values_{level}_consumption.json", data)
-        
-        # Production
-        url = f"{BASE_URL}/energy/values?level={level}&resolution=annual&year={YEAR}&domain=production&scenario={SCENARIO}"
-        data = fetch_json(url)
-        if data:
-            save_json(f"values_{level}_production.json", data)
-
-    # 3. Capture Detailed Charts for Specific Cases
+
+def _url(path: str, params: dict) -> str:
+    return f"{path}?{urllib.parse.urlencode(params)}"
+
+
+def map_jobs():
+    return [(f"map_{level}", _url("/map/territories", {"level": level})) for level in MAP_LEVELS]
+
+
+def value_jobs():
+    jobs = []
+    for level in VALUE_LEVELS:
+        for domain in ["consumption", "production"]:
+            base = {"level": level, "resolution": "annual", "year": YEAR, "domain": domain, "scenario": SCENARIO}
+            jobs.append((f"values_{level}_{domain}", _url("/charts/values", base)))
+
+            # Production breaks down by base_group, consumption by category_code
+            if domain == "production":
+                for grp in PROD_GROUPS:
+                    jobs.append((f"values_{level}_{domain}_{grp}", _url("/charts/values", {**base, "base_group": grp})))
+            else:
+                for cat in CONS_CATEGORIES:
+                    jobs.append((f"values_{level}_{domain}_{cat}", _url("/charts/values", {**base, "category_code": cat})))
+    return jobs
+
+
+def series_jobs():
+    """The exact /charts/series fetches the useMonthly/useDaily/useHourlyCalendar hooks make."""
+    jobs = []
     for case in DETAILED_CASES:
         level = case["level"]
         code = case["code"]
-        name = case["name"]
-        
-        # Helper to build params
-        def get_params(domain="consumption"):
-            p = {
-                "level": level,
-                "year": YEAR,
-                "domain": domain,
-                "scenario": SCENARIO,
-            }
-            if level == "province":
-                p["province_code"] = code
-            elif level == "comune":
-                p["comune_code"] = code
-            elif level == "region":
-                p["region_code"] = code
-            return p
-
-        # 3a. Monthly Series (Consumption & Production breakdown)
-        # We need multiple series requests to rebuild `useMonthlyData` structure.
-        # But `useMonthlyData` makes separate calls. We should capture each one.
-        # Structure: mocks/series_{level}_{code}_{domain}_{resolution}_{optional_cat}.json
-        
-        domains = ["consumption", "production"]
-        
-        # We will store a dictionary of "url_suffix" -> "response" to easier mocking
-        # OR just save distinct files. Let's save distinct files and handle mapping in client.ts.
-        # Actually, simpler: client.ts logic is complex. 
-        # Better strategy: Save a single index file or consistent naming convention.
-        
-        # Let's perform the exact fetches `useMonthlyData` does.
-        # Total Cons/Prod
-        for d in domains:
-            qs = urllib.parse.urlencode({**get_params(d), "resolution": "monthly"})
-            url = f"{BASE_URL}/charts/series?{qs}"
-            data = fetch_json(url)
-            if data:
-                save_json(f"series_{level}_{code}_{d}_monthly.json", data)
-
-        # Consumption Categories
-        cons_cats = ["cons_domestic", "cons_primary", "cons_secondary", "cons_tertiary"]
-        for cat in cons_cats:
-            qs = urllib.parse.urlencode({**get_params("consumption"), "resolution": "monthly", "category_code": cat})
-            url = f"{BASE_URL}/charts/series?{qs}"
-            data = fetch_json(url)
-            if data:
-                save_json(f"series_{level}_{code}_consumption_monthly_{cat}.json", data)
-
-        # Production Sources (base_group)
-        prod_groups = ["solar", "wind", "hydroelectric", "geothermal", "biomass"]
-        for grp in prod_groups:
-            qs = urllib.parse.urlencode({**get_params("production"), "resolution": "monthly", "base_group": grp})
-            url = f"{BASE_URL}/charts/series?{qs}"
-            data = fetch_json(url)
-            if data:
-                save_json(f"series_{level}_{code}_production_monthly_{grp}.json", data)
-
-        # 3b. Daily Series (Weekday/Weekend)
-        # Used by `useDailyData`. Fetch consumption & production? Hook defaults to consumption but supports prod.
-        # Let's fetch consumption for now.
+
+        def get_params(domain, **extra):
+            return {"level": level, "year": YEAR, "domain": domain, "scenario": SCENARIO,
+                    f"{level}_code": code, **extra}
+
+        # Monthly totals
+        for d in ["consumption", "production"]:
+            jobs.append((f"series_{level}_{code}_{d}_monthly",
+                         _url("/charts/series", get_params(d, resolution="monthly"))))
+
+        # Monthly consumption categories / production sources
+        for cat in CONS_CATEGORIES:
+            jobs.append((f"series_{level}_{code}_consumption_monthly_{cat}",
+                         _url("/charts/series", get_params("consumption", resolution="monthly", category_code=cat))))
+        for grp in PROD_GROUPS:
+            jobs.append((f"series_{level}_{code}_production_monthly_{grp}",
+                         _url("/charts/series", get_params("production", resolution="monthly", base_group=grp))))
+
+        # Daily (weekday/weekend) and hourly calendar (12 months x 2 day types)
         for day_type in ["weekday", "weekend"]:
-            qs = urllib.parse.urlencode({**get_params("consumption"), "resolution": "monthly", "day_type": day_type})
-            url = f"{BASE_URL}/charts/series?{qs}"
-            data = fetch_json(url)
-            if data:
-                 save_json(f"series_{level}_{code}_consumption_monthly_{day_type}.json", data)
-
-        # 3c. Hourly Series (Weekday/Weekend, for each month)
-        # Used by `useHourlyCalendarData`. This makes 12 * 2 = 24 requests!
-        # Only fetch for "consumption" currently used.
-        # We will save them as `series_{level}_{code}_consumption_hourly_{month}_{day_type}.json`
-        for month in range(1, 13):
-             for day_type in ["weekday", "weekend"]:
-                p = get_params("consumption")
-                p["resolution"] = "hourly"
-                p["month"] = month
-                p["day_type"] = day_type
-                qs = urllib.parse.urlencode(p)
-                url = f"{BASE_URL}/charts/series?{qs}"
-                data = fetch_json(url)
-                if data:
-                    save_json(f"series_{level}_{code}_consumption_hourly_{month}_{day_type}.json", data)
-
-
-    print("Done capturing data.")
+            jobs.append((f"series_{level}_{code}_consumption_monthly_{day_type}",
+                         _url("/charts/series", get_params("consumption", resolution="monthly", day_type=day_type))))
+            for month in range(1, 13):
+                jobs.append((f"series_{level}_{code}_consumption_hourly_{month}_{day_type}",
+                             _url("/charts/series", get_params("consumption", resolution="hourly", month=month, day_type=day_type))))
+    return jobs
+
+
+JOB_GROUPS = {"map": map_jobs, "values": value_jobs, "series": series_jobs}
+
+
+def load_manifest() -> dict:
+    if MANIFEST_PATH.exists():
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    return {}
+
+
+def capture(jobs, workers: int = 8, force: bool = False):
+    from app import app
+
+    bundle = MockBundleWriter()
+    manifest = load_manifest()
+    lock = threading.Lock()
+    local = threading.local()
+    stats = {"written": 0, "unchanged": 0, "failed": 0}
+
+    def run(job):
+        key, url = job
+        # one test client per worker thread
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+
+        resp = client.get(url)
+        if resp.status_code != 200:
+            print(f"Error {resp.status_code} for {url}")
+            with lock:
+                stats["failed"] += 1
+            return
+
+        body = dumps_compact(resp.get_json())
+        digest = hashlib.sha256(body).hexdigest()
+
+        with lock:
+            changed = bundle.put_raw(key, body)
+            stats["written" if changed else "unchanged"] += 1
+            manifest[key] = {"url": url, "sha256": digest, "bytes": len(body)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run, jobs))
+
+    if force:
+        bundle.changed = max(bundle.changed, 1)
+    bundle.close()
+
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+
+    print(f"{len(jobs)} requests in {time.perf_counter() - started:.1f}s: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=sorted(JOB_GROUPS), action="append", help="job group(s) to capture")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--force", action="store_true", help="rewrite the bundle even if unchanged")
+    args = parser.parse_args()
+
+    jobs = []
+    for group in args.only or JOB_GROUPS:
+        jobs += JOB_GROUPS[group]()
+    capture(jobs, workers=args.workers, force=args.force)
+
 
 if __name__ == "__main__":
     main()
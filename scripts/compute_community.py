@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Community self-consumption (CSC): group territories into energy communities,
+net the members' hourly surplus and uncovered demand per typical-day hour
+(utils/community.py), and write community_self_consumption_mwh /
+community_self_consumption_total_mwh to energy_dw.fact_scenario_param.
+
+A grouping is "province" / "region" (every member of one parent forms a
+community) or a CSV of (code, community) rows for user-defined clusters.
+Several groupings are evaluated side by side in worker processes; the one
+named by --persist (default: the first) is written.
+
+  python scripts/compute_community.py --scenario 0 --year 2019
+  python scripts/compute_community.py --scenario 0 --year 2019 --grouping province --grouping region \\
+      --grouping clusters_a.csv --grouping clusters_b.csv --persist clusters_a.csv --workers 4
+  python scripts/compute_community.py --scenario 0 --year 2030 --uplift-pct 25 --dry-run
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import community, indicators  # noqa: E402
+from utils.db_utils import fetch_rows  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="0", help="scenario code the hourly profiles are read from")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--level", choices=sorted(community.PARENT_GROUPINGS), default="comune",
+                        help="level of the community members")
+    parser.add_argument("--grouping", action="append",
+                        help="province, region or a CSV of (code, community) rows (default: province)")
+    parser.add_argument("--persist", help="grouping whose CSC is written (default: the first)")
+    parser.add_argument("--uplift-pct", type=float, default=0.0)
+    parser.add_argument("--uplift-categories", default="", help="comma-separated category codes (default: all production)")
+    parser.add_argument("--target", help="scenario code the CSC is written to (default: --scenario)")
+    parser.add_argument("--workers", type=int, default=community.COMMUNITY_WORKERS)
+    parser.add_argument("--dry-run", action="store_true", help="compare the groupings, write nothing")
+    args = parser.parse_args()
+
+    groupings = args.grouping or [next(iter(community.PARENT_GROUPINGS[args.level]))]
+    persist = args.persist or groupings[0]
+    if persist not in groupings:
+        sys.exit(f"--persist {persist!r} is not one of the groupings")
+    for g in groupings:
+        if g not in community.PARENT_GROUPINGS[args.level] and not os.path.isfile(g):
+            sys.exit(f"Unknown grouping {g!r} for level {args.level} (no such file either)")
+
+    target = args.target or args.scenario
+    _, rows = fetch_rows("SELECT id FROM energy_dw.dim_scenario WHERE code = %s;", (target,))
+    if not rows:
+        sys.exit(f"Unknown scenario {target!r}")
+    scenario_id = rows[0][0]
+    uplift_categories = [c.strip() for c in args.uplift_categories.split(",") if c.strip()]
+
+    t0 = time.perf_counter()
+    profiles = indicators.load_profiles(args.level, args.year, args.scenario, uplift_categories)
+    if not profiles.territory_ids.size:
+        sys.exit(f"No hourly rows for scenario {args.scenario} in {args.year}")
+    inputs = community.CommunityInputs(profiles, args.uplift_pct)
+    labels = {
+        g: (community.parent_labels(profiles.territory_ids, g, args.level)
+            if g in community.PARENT_GROUPINGS[args.level]
+            else community.cluster_labels(profiles.territory_ids, g, args.level))
+        for g in groupings
+    }
+    t1 = time.perf_counter()
+    results = community.evaluate_groupings(inputs, labels, args.workers)
+    t2 = time.perf_counter()
+    print(f"{profiles.territory_ids.size} territories: load {t1 - t0:.1f}s, "
+          f"{len(groupings)} groupings in {t2 - t1:.2f}s")
+
+    for g, res in results.items():
+        s = res["summary"]
+        print(f"{g:<24} {s['communities']:>6} communities  CSC {s['community_self_consumption_mwh']:>14,.0f} MWh  "
+              f"SC {s['self_consumption_mwh']:>14,.0f} MWh  SSI {s['self_sufficiency_index']:.3f}"
+              f"{'  (written)' if g == persist and not args.dry_run else ''}")
+
+    if not args.dry_run:
+        notes = (f"CSC grouping={os.path.basename(persist)}. Base={args.scenario}, uplift_pct={args.uplift_pct}, "
+                 f"cats={','.join(uplift_categories) or '-'}")
+        written = indicators.persist(scenario_id, args.year, profiles.territory_ids, results[persist]["metrics"],
+                                     notes, reason=f"compute_community {target} {args.year} {persist}",
+                                     keys=community.CSC_KEYS)
+        print(f"{written:,} rows written in {time.perf_counter() - t2:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
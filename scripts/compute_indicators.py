@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compute the scenario indicators (SC / OP / UD, SCI / SSI / OPI) hour by hour
+from the typical-day profiles of every territory (utils/indicators.py) and
+write them to energy_dw.fact_scenario_param, replacing that scenario / year's
+indicator rows of the level(s).
+
+  python scripts/compute_indicators.py --scenario 0 --year 2019
+  python scripts/compute_indicators.py --scenario 0 --year 2030 --level comune \\
+      --uplift-pct 25 --uplift-categories solar,wind --target u_admin_2030_25p
+  python scripts/compute_indicators.py --scenario 0 --year 2019 --dry-run
+
+The profiles are read from --scenario; the rows are written to --target
+(default: the same scenario).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import indicators  # noqa: E402
+from utils.db_utils import fetch_rows  # noqa: E402
+
+LEVELS = ["region", "province", "comune"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", default="0", help="scenario code the hourly profiles are read from")
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--level", choices=LEVELS, action="append", help="level(s) to compute (default: all)")
+    parser.add_argument("--uplift-pct", type=float, default=0.0)
+    parser.add_argument("--uplift-categories", default="", help="comma-separated category codes (default: all production)")
+    parser.add_argument("--target", help="scenario code the indicators are written to (default: --scenario)")
+    parser.add_argument("--dry-run", action="store_true", help="compute and print totals, write nothing")
+    args = parser.parse_args()
+
+    uplift_categories = [c.strip() for c in args.uplift_categories.split(",") if c.strip()]
+    target = args.target or args.scenario
+    _, rows = fetch_rows("SELECT id FROM energy_dw.dim_scenario WHERE code = %s;", (target,))
+    if not rows:
+        sys.exit(f"Unknown scenario {target!r}")
+    scenario_id = rows[0][0]
+    notes = (f"Hourly indicators. Base={args.scenario}, uplift_pct={args.uplift_pct}, "
+             f"cats={','.join(uplift_categories) or '-'}")
+
+    for level in args.level or LEVELS:
+        t0 = time.perf_counter()
+        profiles = indicators.load_profiles(level, args.year, args.scenario, uplift_categories)
+        t1 = time.perf_counter()
+        metrics = indicators.scenario_indicators(profiles, args.uplift_pct)
+        t2 = time.perf_counter()
+        n = profiles.territory_ids.size
+        if not n:
+            print(f"{level}: no hourly rows for scenario {args.scenario} in {args.year}, skipped")
+            continue
+
+        written = 0
+        if not args.dry_run:
+            written = indicators.persist(scenario_id, args.year, profiles.territory_ids, metrics, notes,
+                                         reason=f"compute_indicators {target} {args.year} {level}")
+        t3 = time.perf_counter()
+
+        c, sc = metrics["consumption_mwh"].sum(), metrics["self_consumption_mwh"].sum()
+        ssi = float(np.median(metrics["self_sufficiency_index"]))
+        print(f"{level}: {n} territories, SC {sc:,.0f} of {c:,.0f} MWh consumed, median SSI {ssi:.3f}; "
+              f"load {t1 - t0:.1f}s, compute {t2 - t1:.2f}s, write {t3 - t2:.1f}s ({written:,} rows)")
+
+
+if __name__ == '__main__':
+    main()
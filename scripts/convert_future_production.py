@@ -1,13 +1,18 @@
 #!/usr/bin/env python3
 """
-Convert raw future production CSVs into mock JSON files for the frontend demo.
+Convert raw future production CSVs into mock bundle entries for the frontend demo
+(see scripts/mock_bundle.py).
 
-Monthly CSV -> per-municipality/source monthly JSON files  
-Hourly CSV  -> per-municipality/source/month/daytype hourly JSON files
+Monthly CSV -> per-municipality/source monthly entries
+Hourly CSV  -> per-municipality/source/month/daytype hourly entries
 
-Output naming convention (matches existing mocks):
-  Monthly: future_comune_{code}_{source}_monthly.json
-  Hourly:  future_comune_{code}_{source}_hourly_{monthNum}_{daytype}.json
+The hourly CSV is streamed: rows of one (source, municipality, month, daytype)
+profile are expected to be contiguous, as the exports are, and each profile is
+written as soon as its run ends, so memory does not grow with the file size.
+
+Bundle keys:
+  Monthly: future_comune_{code}_{source}_monthly
+  Hourly:  future_comune_{code}_{source}_hourly_{monthNum}_{daytype}
 
 Where {source} is one of:
   solar_c1_total, solar_c1_residential, solar_c1_agriculture, solar_c1_industrial, solar_c1_services
@@ -16,10 +21,12 @@ Where {source} is one of:
 """
 
 import csv
-import json
+import math
 import os
+from array import array
+
+from mock_bundle import MockBundleWriter
 
-MOCKS_DIR = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'src', 'data', 'mocks')
 RAW_DIR = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'src', 'data', 'raw_future_production')
 
 MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
@@ -49,8 +56,61 @@ MUN_CODE = {
     "Torino": 1272,
 }
 
-def convert_monthly():
-    """Convert monthly CSV to individual JSON files."""
+HOURS = 24
+
+
+class UnsortedInputError(ValueError):
+    pass
+
+
+def iter_hourly_profiles(csv_path, key_of):
+    """
+    Stream an hourly CSV (Energy_Source, Municipality, Month, Day_Type, Hour, Value)
+    and yield (key, values) once per contiguous run of rows with the same
+    key_of(row), where values is a 24-slot float array indexed by hour - 1
+    (NaN for hours absent from the run). Rows for which key_of returns None
+    are skipped.
+
+    Only the current profile is held in memory. A key that shows up again
+    after its run ended raises UnsortedInputError; sort the file on the key
+    columns first (e.g. `sort -t, -k1,4 -s`, keeping the header on top).
+    """
+    done = set()
+    key = None
+    values = None
+
+    with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        col = {name: i for i, name in enumerate(header)}
+        i_hour, i_val = col['Hour'], col['Value']
+
+        for line_no, row in enumerate(reader, start=2):
+            row_key = key_of(row, col)
+            if row_key is None:
+                continue
+
+            if row_key != key:
+                if key is not None:
+                    yield key, values
+                    done.add(key)
+                if row_key in done:
+                    raise UnsortedInputError(
+                        f"{csv_path}:{line_no}: rows for {row_key} are not contiguous"
+                    )
+                key = row_key
+                values = array('d', [math.nan]) * HOURS
+
+            hour = int(row[i_hour].strip())
+            if 1 <= hour <= HOURS:
+                values[hour - 1] = float(row[i_val].strip() or '0')
+
+    if key is not None:
+        yield key, values
+
+
+def convert_monthly(bundle: MockBundleWriter):
+    """Convert monthly CSV to per-municipality/source bundle entries."""
     csv_path = os.path.join(RAW_DIR, 'ALL_monthly_producibility_EN.csv')
     count = 0
     with open(csv_path, 'r', encoding='utf-8') as f:
@@ -74,69 +134,44 @@ def convert_monthly():
                     "value_mwh": round(float(val) / 1e6, 4)  # Convert Wh to MWh
                 })
             
-            filename = f"future_comune_{pro_com}_{source_key}_monthly.json"
-            filepath = os.path.join(MOCKS_DIR, filename)
-            with open(filepath, 'w') as out:
-                json.dump(monthly_values, out, indent=2)
+            bundle.put(f"future_comune_{pro_com}_{source_key}_monthly", monthly_values)
             count += 1
     
-    print(f"Created {count} monthly JSON files")
+    print(f"Created {count} monthly entries")
 
 
-def convert_hourly():
-    """Convert hourly CSV to individual JSON files."""
+def _hourly_key(row, col):
+    source_key = SOURCE_MAP.get(row[col['Energy_Source']].strip())
+    if not source_key:
+        return None
+    mun_code = MUN_CODE.get(row[col['Municipality']].strip())
+    if not mun_code:
+        return None
+    month_num = MONTH_TO_NUM.get(row[col['Month']].strip())
+    if not month_num:
+        return None
+    day_type = row[col['Day_Type']].strip().lower()  # "weekday" or "weekend"
+    return (source_key, mun_code, month_num, day_type)
+
+
+def convert_hourly(bundle: MockBundleWriter):
+    """Convert hourly CSV to per-municipality/source/month/daytype bundle entries."""
     csv_path = os.path.join(RAW_DIR, 'ALL_hourly_producibility_EN.csv')
-    
-    # Group: (source_key, mun_code, month_num, daytype) -> list of {hour, value}
-    groups = {}
-    
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            source_raw = row['Energy_Source'].strip()
-            mun_name = row['Municipality'].strip()
-            month_name = row['Month'].strip()
-            day_type = row['Day_Type'].strip().lower()  # "weekday" or "weekend"
-            hour = int(row['Hour'].strip())
-            value = float(row['Value'].strip() or '0')
-            
-            source_key = SOURCE_MAP.get(source_raw)
-            if not source_key:
-                continue
-            
-            mun_code = MUN_CODE.get(mun_name)
-            if not mun_code:
-                continue
-            
-            month_num = MONTH_TO_NUM.get(month_name)
-            if not month_num:
-                continue
-            
-            key = (source_key, mun_code, month_num, day_type)
-            if key not in groups:
-                groups[key] = []
-            
-            groups[key].append({
-                "x": hour,
-                "value_mwh": round(value / 1e6, 6)  # Convert Wh to MWh
-            })
-    
+
     count = 0
-    for (source_key, mun_code, month_num, day_type), entries in groups.items():
-        # Sort by hour
-        entries.sort(key=lambda e: e['x'])
-        
-        filename = f"future_comune_{mun_code}_{source_key}_hourly_{month_num}_{day_type}.json"
-        filepath = os.path.join(MOCKS_DIR, filename)
-        with open(filepath, 'w') as out:
-            json.dump(entries, out, indent=2)
+    for (source_key, mun_code, month_num, day_type), values in iter_hourly_profiles(csv_path, _hourly_key):
+        entries = [
+            {"x": h + 1, "value_mwh": round(v / 1e6, 6)}  # Convert Wh to MWh
+            for h, v in enumerate(values)
+            if not math.isnan(v)
+        ]
+        bundle.put(f"future_comune_{mun_code}_{source_key}_hourly_{month_num}_{day_type}", entries)
         count += 1
-    
-    print(f"Created {count} hourly JSON files")
 
+    print(f"Created {count} hourly entries")
 
 if __name__ == '__main__':
-    os.makedirs(MOCKS_DIR, exist_ok=True)
-    convert_monthly()
-    convert_hourly()
+    with MockBundleWriter() as bundle:
+        convert_monthly(bundle)
+        convert_hourly(bundle)
     print("Done!")
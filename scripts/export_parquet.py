@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Export energy_dw to the Parquet snapshot (fact_energy partitioned by
+data_source / year, plus the dimensions) that utils/columnar.py queries with
+DuckDB for the endpoints listed in DUCKDB_ENDPOINTS. Needs duckdb
+(pip install duckdb).
+
+  python scripts/export_parquet.py
+  python scripts/export_parquet.py --out /srv/energy/parquet_snapshot
+
+Run it after every load: the snapshot records the dataset version it was
+exported at, and the API falls back to Postgres while the version has moved on.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.columnar import DUCKDB_SNAPSHOT, build_snapshot  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=DUCKDB_SNAPSHOT, help="snapshot directory (default: $DUCKDB_SNAPSHOT)")
+    args = parser.parse_args()
+
+    manifest = build_snapshot(args.out)
+    rows = sum(p["rows"] for p in manifest["partitions"])
+    print(f"Snapshot at dataset version {manifest['dataset_version']}: "
+          f"{len(manifest['partitions'])} partitions, {rows:,} fact rows in {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,11 @@
-import csv
-import json
+import math
 import os
+from array import array
 
-CSV_PATH = '/home/appmng/my-webapp/frontend/src/data/raw_actual_production/ALL_hourly_production.csv'
-MOCKS_DIR = '/home/appmng/my-webapp/frontend/src/data/mocks'
+from convert_future_production import HOURS, iter_hourly_profiles
+from mock_bundle import MockBundleWriter
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'src', 'data', 'raw_actual_production', 'ALL_hourly_production.csv')
 
 MUN_MAP = {
     'Agliè': [1001],
@@ -24,62 +26,44 @@ SOURCE_MAP = {
     'Wind': 'wind'
 }
 
-def generate_mocks():
-    data = {}
-    
-    with open(CSV_PATH, mode='r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            mun = row['Municipality']
-            if mun not in MUN_MAP:
-                continue
-            
-            codes = MUN_MAP[mun]
-            month = MONTH_MAP[row['Month']]
-            source = SOURCE_MAP[row['Energy_Source']]
-            hour = int(row['Hour'])
-            value = float(row['Value'])
-            
-            for code in codes:
-                key = (code, source, month)
-                if key not in data:
-                    data[key] = [0.0] * 24
-                
-                # Hour in CSV is 1-24, map to 0-23
-                data[key][hour - 1] = value
+def _key(row, col):
+    mun = row[col['Municipality']]
+    if mun not in MUN_MAP:
+        return None
+    return (mun, SOURCE_MAP[row[col['Energy_Source']]], MONTH_MAP[row[col['Month']]])
 
-    # Generate individual source files
-    for (code, source, month), values in data.items():
-        # Decide if it's comune or province based on code
-        level = "province" if code < 1000 else "comune"
-        filename = f"series_{level}_{code}_production_hourly_{source}_{month}_weekday.json"
-        filepath = os.path.join(MOCKS_DIR, filename)
-        
-        json_data = [{"value_mwh": val, "x": i + 1} for i, val in enumerate(values)]
-        
-        with open(filepath, 'w', encoding='utf-8') as out_f:
-            json.dump(json_data, out_f, indent=2)
-            
-    # Generate "total" production files
+
+def _series(values):
+    return [{"value_mwh": val, "x": i + 1} for i, val in enumerate(values)]
+
+
+def generate_mocks(bundle: MockBundleWriter):
+    # (code, month) -> 24 hourly sums over sources; the only state kept
+    # across profiles, bounded by the number of output series
     total_data = {}
-    for (code, source, month), values in data.items():
-        total_key = (code, month)
-        if total_key not in total_data:
-            total_data[total_key] = [0.0] * 24
-        
-        for i, val in enumerate(values):
-            total_data[total_key][i] += val
-            
+
+    # Profiles are streamed per (municipality, source, month) run, see
+    # iter_hourly_profiles; missing hours count as 0
+    for (mun, source, month), profile in iter_hourly_profiles(CSV_PATH, _key):
+        values = [0.0 if math.isnan(v) else v for v in profile]
+
+        for code in MUN_MAP[mun]:
+            # Decide if it's comune or province based on code
+            level = "province" if code < 1000 else "comune"
+            bundle.put(f"series_{level}_{code}_production_hourly_{source}_{month}_weekday", _series(values))
+
+            totals = total_data.get((code, month))
+            if totals is None:
+                totals = total_data[(code, month)] = array('d', [0.0]) * HOURS
+            for i, val in enumerate(values):
+                totals[i] += val
+
+    # "total" production series
     for (code, month), values in total_data.items():
         level = "province" if code < 1000 else "comune"
-        filename = f"series_{level}_{code}_production_hourly_total_{month}_weekday.json"
-        filepath = os.path.join(MOCKS_DIR, filename)
-        
-        json_data = [{"value_mwh": val, "x": i + 1} for i, val in enumerate(values)]
-        
-        with open(filepath, 'w', encoding='utf-8') as out_f:
-            json.dump(json_data, out_f, indent=2)
+        bundle.put(f"series_{level}_{code}_production_hourly_total_{month}_weekday", _series(values))
 
 if __name__ == "__main__":
-    generate_mocks()
+    with MockBundleWriter() as bundle:
+        generate_mocks(bundle)
     print("Mocks generated successfully.")
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Bulk-load the raw hourly production / producibility CSVs into energy_dw.fact_energy.
+
+  python scripts/load_fact_energy.py producibility --year 2030
+  python scripts/load_fact_energy.py production --year 2019 --csv path/to/ALL_hourly_production.csv
+
+The CSV (Energy_Source, Municipality, Month, Day_Type, Hour, Value) is streamed
+for ALL municipalities: names are mapped to dim_territory_en ids, sources to
+dim_energy_category ids and (year, month, day_type, hour) to dim_time ids.
+Rows are COPY'd in batches into a temp staging table and upserted on the
+natural key from sql/fact_energy_load.sql, one transaction per batch. When
+the load is done the dataset version is bumped (sql/dataset_version.sql).
+
+After each committed batch the number of consumed CSV rows is written to
+<csv>.progress.json; re-running the same command resumes from there
+(--restart ignores it).
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.dataset_version import bump_version  # noqa: E402
+from utils.db_utils import get_connection  # noqa: E402
+from convert_future_production import RAW_DIR as FUTURE_RAW_DIR, SOURCE_MAP as FUTURE_SOURCE_MAP, MONTH_TO_NUM  # noqa: E402
+from generate_production_mocks import SOURCE_MAP as ACTUAL_SOURCE_MAP  # noqa: E402
+
+ACTUAL_RAW_DIR = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'src', 'data', 'raw_actual_production')
+
+# kind -> where the CSV lives and how its rows land in fact_energy
+KINDS = {
+    "production": {
+        "csv": os.path.join(ACTUAL_RAW_DIR, 'ALL_hourly_production.csv'),
+        "source_map": ACTUAL_SOURCE_MAP,
+        "data_source": "raw_hourly_production",
+        "scale": 1.0,
+    },
+    "producibility": {
+        "csv": os.path.join(FUTURE_RAW_DIR, 'ALL_hourly_producibility_EN.csv'),
+        "source_map": FUTURE_SOURCE_MAP,
+        # must match the future_production_% filter in api/energy.py
+        "data_source": "future_production_producibility",
+        "scale": 1e-6,  # Wh -> MWh
+    },
+}
+
+STAGE_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS stage_fact_energy (
+      territory_id integer,
+      time_id integer,
+      category_id integer,
+      scenario_id integer,
+      value_mwh double precision,
+      time_resolution text,
+      data_source text
+    ) ON COMMIT DELETE ROWS;
+"""
+
+UPSERT_SQL = """
+    INSERT INTO energy_dw.fact_energy
+      (territory_id, time_id, category_id, scenario_id, value_mwh, time_resolution, data_source)
+    SELECT DISTINCT ON (territory_id, time_id, category_id, scenario_id, time_resolution, data_source)
+      territory_id, time_id, category_id, scenario_id, value_mwh, time_resolution, data_source
+    FROM stage_fact_energy
+    ON CONFLICT (territory_id, time_id, category_id, scenario_id, time_resolution, data_source)
+    DO UPDATE SET value_mwh = EXCLUDED.value_mwh;
+"""
+
+
+def _norm(name: str) -> str:
+    return " ".join(name.strip().lower().split())
+
+
+def load_lookups(cur, year: int, scenario_code: str):
+    """Dimension ids needed to resolve CSV rows, fetched once."""
+    cur.execute("""
+        SELECT id, municipality_name
+        FROM energy_dw.dim_territory_en
+        WHERE level = 'comune' AND municipality_name IS NOT NULL;
+    """)
+    territories = {}
+    ambiguous = set()
+    for tid, name in cur.fetchall():
+        key = _norm(name)
+        if key in territories:
+            ambiguous.add(key)
+        territories[key] = tid
+    for key in ambiguous:
+        # homonymous comuni cannot be resolved from the name alone
+        del territories[key]
+
+    cur.execute("""
+        SELECT id, code, base_group
+        FROM energy_dw.dim_energy_category
+        WHERE domain = 'production';
+    """)
+    categories = {}
+    by_group = {}
+    for cid, code, base_group in cur.fetchall():
+        if code:
+            categories[code.lower()] = cid
+        if base_group:
+            by_group.setdefault(base_group.lower(), []).append(cid)
+    for group, ids in by_group.items():
+        if len(ids) == 1:
+            categories.setdefault(group, ids[0])
+
+    cur.execute("""
+        SELECT id, month, day_type, hour
+        FROM energy_dw.dim_time
+        WHERE year = %s AND hour IS NOT NULL;
+    """, (year,))
+    times = {(m, (dt or "").lower(), h): tid for tid, m, dt, h in cur.fetchall()}
+
+    cur.execute("SELECT id FROM energy_dw.dim_scenario WHERE code = %s;", (scenario_code,))
+    row = cur.fetchone()
+    if not row:
+        raise SystemExit(f"Unknown scenario code {scenario_code!r}")
+
+    return territories, categories, times, row[0], len(ambiguous)
+
+
+def _read_progress(path: str, csv_path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("csv") != os.path.abspath(csv_path) or state.get("size") != os.path.getsize(csv_path):
+        print("Progress file is for a different input, starting over")
+        return 0
+    return int(state.get("rows_done", 0))
+
+
+def _write_progress(path: str, csv_path: str, rows_done: int):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"csv": os.path.abspath(csv_path), "size": os.path.getsize(csv_path), "rows_done": rows_done}, f)
+    os.replace(tmp, path)
+
+
+def _flush(conn, cur, buf: io.StringIO):
+    buf.seek(0)
+    cur.copy_expert(
+        "COPY stage_fact_energy "
+        "(territory_id, time_id, category_id, scenario_id, value_mwh, time_resolution, data_source) "
+        "FROM STDIN",
+        buf,
+    )
+    cur.execute(UPSERT_SQL)
+    conn.commit()  # ON COMMIT DELETE ROWS empties the staging table
+
+
+def load(kind: str, csv_path: str, year: int, scenario_code: str, batch_size: int, restart: bool):
+    cfg = KINDS[kind]
+    source_map = {k: v.lower() for k, v in cfg["source_map"].items()}
+    progress_path = csv_path + ".progress.json"
+    skip = 0 if restart else _read_progress(progress_path, csv_path)
+
+    conn = get_connection()
+    cur = conn.cursor()
+    territories, categories, times, scenario_id, n_ambiguous = load_lookups(cur, year, scenario_code)
+    cur.execute(STAGE_DDL)
+    conn.commit()
+    if n_ambiguous:
+        print(f"WARNING: {n_ambiguous} homonymous comune names will be skipped")
+
+    skipped = {"territory": 0, "category": 0, "time": 0, "value": 0}
+    rows_done = 0
+    loaded = 0
+    started = time.perf_counter()
+    buf = io.StringIO()
+    in_batch = 0
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        col = {name: i for i, name in enumerate(header)}
+        i_src, i_mun, i_month = col['Energy_Source'], col['Municipality'], col['Month']
+        i_dt, i_hour, i_val = col['Day_Type'], col['Hour'], col['Value']
+
+        if skip:
+            print(f"Resuming after {skip} rows")
+        for row in reader:
+            rows_done += 1
+            if rows_done <= skip:
+                continue
+
+            tid = territories.get(_norm(row[i_mun]))
+            if tid is None:
+                skipped["territory"] += 1
+                continue
+            cid = categories.get(source_map.get(row[i_src].strip(), ""))
+            if cid is None:
+                skipped["category"] += 1
+                continue
+            try:
+                hour = int(row[i_hour])
+            except ValueError:  # blank / malformed Hour cell
+                skipped["time"] += 1
+                continue
+            time_id = times.get((MONTH_TO_NUM.get(row[i_month].strip()), row[i_dt].strip().lower(), hour))
+            if time_id is None:
+                skipped["time"] += 1
+                continue
+
+            try:
+                value = float(row[i_val] or 0) * cfg["scale"]
+            except ValueError:  # malformed Value cell ("n/a", "1,5", " ")
+                skipped["value"] += 1
+                continue
+            buf.write(f"{tid}\t{time_id}\t{cid}\t{scenario_id}\t{value!r}\thourly\t{cfg['data_source']}\n")
+            in_batch += 1
+
+            if in_batch >= batch_size:
+                _flush(conn, cur, buf)
+                loaded += in_batch
+                _write_progress(progress_path, csv_path, rows_done)
+                elapsed = time.perf_counter() - started
+                print(f"{loaded} rows loaded ({loaded / elapsed:,.0f} rows/s)")
+                buf = io.StringIO()
+                in_batch = 0
+
+    if in_batch:
+        _flush(conn, cur, buf)
+        loaded += in_batch
+
+    # one bump per load: API caches and ETags move to the new data
+    version = bump_version(cur, f"load_fact_energy {kind} {year}")
+    conn.commit()
+    if version:
+        print(f"Dataset version {version}")
+
+    cur.close()
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Done: {loaded} rows loaded in {elapsed:.1f}s ({loaded / max(elapsed, 1e-9):,.0f} rows/s)")
+    print(f"Skipped: {skipped}")
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("--year", type=int, required=True, help="dim_time year the profiles belong to")
+    parser.add_argument("--csv", help="input CSV (default: the repo's raw CSV for this kind)")
+    parser.add_argument("--scenario", default="0", help="dim_scenario code (default: 0)")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument("--restart", action="store_true", help="ignore saved progress")
+    args = parser.parse_args()
+
+    load(args.kind, args.csv or KINDS[args.kind]["csv"], args.year, args.scenario, args.batch_size, args.restart)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Packed mock bundle for the offline demo.
+
+All mock responses live in two files under frontend/public/mocks/:
+
+  bundle.jsonl  one compact JSON document per line, sorted by key
+  index.json    {"version": 1, "entries": {key: [byte_offset, byte_length]}}
+
+The key is the mock name the frontend adapter resolves a request to
+(e.g. "values_region_consumption", "series_comune_1001_consumption_hourly_1_weekday").
+Readers memory-map bundle.jsonl and slice entries by offset, so serving a
+mock is a dict lookup plus a copy of its bytes; the frontend does the same
+on a single fetched ArrayBuffer (src/api/mockBundle.ts).
+
+  python scripts/mock_bundle.py pack frontend/src/data/mocks   # JSON files -> bundle
+  python scripts/mock_bundle.py list
+  python scripts/mock_bundle.py get values_region_consumption
+  python scripts/mock_bundle.py serve --port 5001              # GET /mocks/<key>
+"""
+
+import argparse
+import json
+import mmap
+import os
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUNDLE_DIR = ROOT / "frontend" / "public" / "mocks"
+BUNDLE_FILE = "bundle.jsonl"
+INDEX_FILE = "index.json"
+VERSION = 1
+
+
+def dumps_compact(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class MockBundleReader:
+    """Memory-mapped, read-only access to a bundle by key."""
+
+    def __init__(self, bundle_dir: Path = BUNDLE_DIR):
+        bundle_dir = Path(bundle_dir)
+        with open(bundle_dir / INDEX_FILE) as f:
+            index = json.load(f)
+        if index.get("version") != VERSION:
+            raise ValueError(f"Unsupported mock bundle version {index.get('version')}")
+        self.entries = index["entries"]
+
+        self._file = open(bundle_dir / BUNDLE_FILE, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __contains__(self, key) -> bool:
+        return key in self.entries
+
+    def keys(self):
+        return self.entries.keys()
+
+    def get_raw(self, key: str) -> bytes | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        offset, length = entry
+        return self._map[offset:offset + length]
+
+    def get(self, key: str):
+        raw = self.get_raw(key)
+        return json.loads(raw) if raw is not None else None
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+
+class MockBundleWriter:
+    """
+    Update a bundle in place: existing entries are kept (as raw bytes, never
+    re-parsed), put() adds or replaces keys, close() rewrites both files
+    atomically if anything changed.
+
+        with MockBundleWriter() as bundle:
+            bundle.put("values_region_consumption", data)
+    """
+
+    def __init__(self, bundle_dir: Path = BUNDLE_DIR):
+        self.bundle_dir = Path(bundle_dir)
+        self._entries: dict[str, bytes] = {}
+        self.changed = 0
+
+        if (self.bundle_dir / INDEX_FILE).exists():
+            reader = MockBundleReader(self.bundle_dir)
+            try:
+                self._entries = {k: bytes(reader.get_raw(k)) for k in reader.keys()}
+            finally:
+                reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+    def get_raw(self, key: str) -> bytes | None:
+        return self._entries.get(key)
+
+    def put(self, key: str, obj) -> bool:
+        return self.put_raw(key, dumps_compact(obj))
+
+    def put_raw(self, key: str, raw: bytes) -> bool:
+        """Returns True if the entry is new or its content changed."""
+        if b"\n" in raw:
+            raise ValueError("bundle entries must be single-line JSON")
+        if self._entries.get(key) == raw:
+            return False
+        self._entries[key] = raw
+        self.changed += 1
+        return True
+
+    def close(self):
+        if not self.changed:
+            return
+        self.bundle_dir.mkdir(parents=True, exist_ok=True)
+
+        entries = {}
+        offset = 0
+        tmp_bundle = self.bundle_dir / (BUNDLE_FILE + ".tmp")
+        with open(tmp_bundle, "wb") as f:
+            for key in sorted(self._entries):
+                raw = self._entries[key]
+                f.write(raw)
+                f.write(b"\n")
+                entries[key] = [offset, len(raw)]
+                offset += len(raw) + 1
+
+        tmp_index = self.bundle_dir / (INDEX_FILE + ".tmp")
+        with open(tmp_index, "w") as f:
+            json.dump({"version": VERSION, "entries": entries}, f, separators=(",", ":"))
+
+        os.replace(tmp_bundle, self.bundle_dir / BUNDLE_FILE)
+        os.replace(tmp_index, self.bundle_dir / INDEX_FILE)
+        print(f"Mock bundle: {len(entries)} entries, {offset / 1e6:.1f} MB ({self.changed} changed)")
+        self.changed = 0
+
+
+def pack_dir(src_dir: Path, bundle_dir: Path = BUNDLE_DIR):
+    """Pack every *.json file of src_dir (key = file stem) into the bundle."""
+    with MockBundleWriter(bundle_dir) as bundle:
+        for path in sorted(Path(src_dir).glob("*.json")):
+            with open(path, encoding="utf-8") as f:
+                bundle.put(path.stem, json.load(f))
+
+
+def serve(port: int, bundle_dir: Path = BUNDLE_DIR):
+    from flask import Flask, Response, jsonify
+
+    reader = MockBundleReader(bundle_dir)
+    app = Flask(__name__)
+
+    @app.get("/mocks/<key>")
+    def get_mock(key: str):
+        raw = reader.get_raw(key)
+        if raw is None:
+            return jsonify({"error": "Mock not found"}), 404
+        return Response(raw, mimetype="application/json")
+
+    app.run(host="0.0.0.0", port=port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bundle-dir", type=Path, default=BUNDLE_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_pack = sub.add_parser("pack")
+    p_pack.add_argument("src_dir", type=Path)
+    sub.add_parser("list")
+    p_get = sub.add_parser("get")
+    p_get.add_argument("key")
+    p_serve = sub.add_parser("serve")
+    p_serve.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+
+    if args.cmd == "pack":
+        pack_dir(args.src_dir, args.bundle_dir)
+    elif args.cmd == "list":
+        reader = MockBundleReader(args.bundle_dir)
+        for key in sorted(reader.keys()):
+            print(key, reader.entries[key][1])
+    elif args.cmd == "get":
+        raw = MockBundleReader(args.bundle_dir).get_raw(args.key)
+        if raw is None:
+            raise SystemExit(f"No mock {args.key!r}")
+        print(raw.decode("utf-8"))
+    elif args.cmd == "serve":
+        serve(args.port, args.bundle_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+-- sql/dataset_version.sql
+--
+-- Single-row version stamp of the energy_dw data. Loaders and scenario saves
+-- call bump_dataset_version() after committing new rows; the API puts the
+-- version in its cache keys and ETags (utils/dataset_version.py), and every
+-- API process LISTENs on energy_dw_dataset_version for the new value.
+-- Run once:  psql -d energy_dw -f sql/dataset_version.sql
+
+CREATE TABLE IF NOT EXISTS energy_dw.dataset_version (
+  id          smallint PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+  version     bigint NOT NULL DEFAULT 1,
+  updated_at  timestamptz NOT NULL DEFAULT now(),
+  reason      text
+);
+
+INSERT INTO energy_dw.dataset_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+-- increments the version and notifies listeners; the NOTIFY is delivered
+-- when the calling transaction commits
+CREATE OR REPLACE FUNCTION energy_dw.bump_dataset_version(p_reason text DEFAULT NULL)
+RETURNS bigint LANGUAGE plpgsql AS $$
+DECLARE
+  v bigint;
+BEGIN
+  UPDATE energy_dw.dataset_version
+  SET version = version + 1, updated_at = now(), reason = p_reason
+  WHERE id = 1
+  RETURNING version INTO v;
+
+  PERFORM pg_notify('energy_dw_dataset_version', v::text);
+  RETURN v;
+END;
+$$;
@@ -0,0 +1,7 @@
+-- sql/fact_energy_load.sql
+--
+-- Natural key used by scripts/load_fact_energy.py to upsert into fact_energy.
+-- Run once:  psql -d energy_dw -f sql/fact_energy_load.sql
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_fact_energy_natural_key
+  ON energy_dw.fact_energy (territory_id, time_id, category_id, scenario_id, time_resolution, data_source);
@@ -0,0 +1,169 @@
+-- sql/fact_scenario_wide.sql
+--
+-- Wide companion of energy_dw.fact_scenario_param: one row per
+-- (scenario, year, territory), one column per PARAM_META key in api/scenarios.py.
+-- The scenario read endpoints use it instead of reassembling the EAV rows.
+--
+-- Kept in sync by statement-level triggers on fact_scenario_param, so every
+-- writer (save_scenario, bulk loaders, manual fixes) updates it.
+-- Run once:  psql -d energy_dw -f sql/fact_scenario_wide.sql
+-- Adding a PARAM_META key means adding a column here and to the pivot below.
+
+CREATE TABLE IF NOT EXISTS energy_dw.fact_scenario_wide (
+  scenario_id                             integer NOT NULL,
+  year                                    integer NOT NULL,
+  territory_id                            integer NOT NULL,
+  consumption_mwh                         double precision,
+  production_mwh                          double precision,
+  self_consumption_mwh                    double precision,
+  over_production_mwh                     double precision,
+  uncovered_demand_mwh                    double precision,
+  community_self_consumption_mwh          double precision,
+  community_self_consumption_total_mwh    double precision,
+  self_consumption_index                  double precision,
+  self_sufficiency_index                  double precision,
+  over_production_index                   double precision,
+  PRIMARY KEY (scenario_id, year, territory_id)
+);
+
+-- recompute the wide rows of the given keys from the EAV table
+CREATE OR REPLACE FUNCTION energy_dw.sync_fact_scenario_wide(
+  p_scenario_ids integer[],
+  p_years integer[],
+  p_territory_ids integer[]
+) RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+  DELETE FROM energy_dw.fact_scenario_wide w
+  USING unnest(p_scenario_ids, p_years, p_territory_ids) AS k(scenario_id, year, territory_id)
+  WHERE w.scenario_id = k.scenario_id
+    AND w.year = k.year
+    AND w.territory_id = k.territory_id;
+
+  INSERT INTO energy_dw.fact_scenario_wide (
+    scenario_id,
+    year,
+    territory_id,
+    consumption_mwh,
+    production_mwh,
+    self_consumption_mwh,
+    over_production_mwh,
+    uncovered_demand_mwh,
+    community_self_consumption_mwh,
+    community_self_consumption_total_mwh,
+    self_consumption_index,
+    self_sufficiency_index,
+    over_production_index
+  )
+  SELECT
+      p.scenario_id,
+      p.year,
+      p.territory_id,
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'consumption_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'production_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'self_consumption_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'over_production_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'uncovered_demand_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'community_self_consumption_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'community_self_consumption_total_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'self_consumption_index'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'self_sufficiency_index'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'over_production_index')
+  FROM energy_dw.fact_scenario_param p
+  JOIN unnest(p_scenario_ids, p_years, p_territory_ids) AS k(scenario_id, year, territory_id)
+    ON p.scenario_id = k.scenario_id
+   AND p.year = k.year
+   AND p.territory_id = k.territory_id
+  GROUP BY p.scenario_id, p.year, p.territory_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION energy_dw.trg_fact_scenario_wide_ins() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  PERFORM energy_dw.sync_fact_scenario_wide(array_agg(scenario_id), array_agg(year), array_agg(territory_id))
+  FROM (SELECT DISTINCT scenario_id, year, territory_id FROM new_rows WHERE year IS NOT NULL) k;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION energy_dw.trg_fact_scenario_wide_upd() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  PERFORM energy_dw.sync_fact_scenario_wide(array_agg(scenario_id), array_agg(year), array_agg(territory_id))
+  FROM (
+    SELECT scenario_id, year, territory_id FROM old_rows WHERE year IS NOT NULL
+    UNION
+    SELECT scenario_id, year, territory_id FROM new_rows WHERE year IS NOT NULL
+  ) k;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION energy_dw.trg_fact_scenario_wide_del() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  PERFORM energy_dw.sync_fact_scenario_wide(array_agg(scenario_id), array_agg(year), array_agg(territory_id))
+  FROM (SELECT DISTINCT scenario_id, year, territory_id FROM old_rows WHERE year IS NOT NULL) k;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS fact_scenario_wide_ins ON energy_dw.fact_scenario_param;
+CREATE TRIGGER fact_scenario_wide_ins
+  AFTER INSERT ON energy_dw.fact_scenario_param
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION energy_dw.trg_fact_scenario_wide_ins();
+
+DROP TRIGGER IF EXISTS fact_scenario_wide_upd ON energy_dw.fact_scenario_param;
+CREATE TRIGGER fact_scenario_wide_upd
+  AFTER UPDATE ON energy_dw.fact_scenario_param
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION energy_dw.trg_fact_scenario_wide_upd();
+
+DROP TRIGGER IF EXISTS fact_scenario_wide_del ON energy_dw.fact_scenario_param;
+CREATE TRIGGER fact_scenario_wide_del
+  AFTER DELETE ON energy_dw.fact_scenario_param
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION energy_dw.trg_fact_scenario_wide_del();
+
+-- one-off backfill of existing scenarios
+INSERT INTO energy_dw.fact_scenario_wide (
+    scenario_id,
+    year,
+    territory_id,
+    consumption_mwh,
+    production_mwh,
+    self_consumption_mwh,
+    over_production_mwh,
+    uncovered_demand_mwh,
+    community_self_consumption_mwh,
+    community_self_consumption_total_mwh,
+    self_consumption_index,
+    self_sufficiency_index,
+    over_production_index
+)
+SELECT
+      p.scenario_id,
+      p.year,
+      p.territory_id,
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'consumption_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'production_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'self_consumption_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'over_production_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'uncovered_demand_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'community_self_consumption_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'community_self_consumption_total_mwh'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'self_consumption_index'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'self_sufficiency_index'),
+      MAX(p.param_value) FILTER (WHERE p.param_key = 'over_production_index')
+FROM energy_dw.fact_scenario_param p
+WHERE p.year IS NOT NULL
+GROUP BY p.scenario_id, p.year, p.territory_id
+ON CONFLICT (scenario_id, year, territory_id) DO UPDATE SET
+    consumption_mwh = EXCLUDED.consumption_mwh,
+    production_mwh = EXCLUDED.production_mwh,
+    self_consumption_mwh = EXCLUDED.self_consumption_mwh,
+    over_production_mwh = EXCLUDED.over_production_mwh,
+    uncovered_demand_mwh = EXCLUDED.uncovered_demand_mwh,
+    community_self_consumption_mwh = EXCLUDED.community_self_consumption_mwh,
+    community_self_consumption_total_mwh = EXCLUDED.community_self_consumption_total_mwh,
+    self_consumption_index = EXCLUDED.self_consumption_index,
+    self_sufficiency_index = EXCLUDED.self_sufficiency_index,
+    over_production_index = EXCLUDED.over_production_index;
@@ -0,0 +1,16 @@
+-- sql/scenario_param_indexes.sql
+--
+-- Indexes backing the scenario read endpoints (/scenarios/values, /scenarios/ranking).
+-- Run once against energy_dw:  psql -d energy_dw -f sql/scenario_param_indexes.sql
+
+-- (scenario, year, param_key) filter + value ordering for ranking / top-N
+CREATE INDEX IF NOT EXISTS ix_fact_scenario_param_scn_year_key_value
+  ON energy_dw.fact_scenario_param (scenario_id, year, param_key, param_value DESC)
+  INCLUDE (territory_id);
+
+-- per-territory lookup (/scenarios/territory)
+CREATE INDEX IF NOT EXISTS ix_fact_scenario_param_scn_year_territory
+  ON energy_dw.fact_scenario_param (scenario_id, year, territory_id);
+
+CREATE INDEX IF NOT EXISTS ix_dim_territory_en_level_id
+  ON energy_dw.dim_territory_en (level, id);
@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# utils.db_utils imports DB_CONFIG from the deployment's config.py; these tests never connect
+try:
+    import config  # noqa: F401
+except ImportError:
+    sys.modules["config"] = types.SimpleNamespace(DB_CONFIG={})
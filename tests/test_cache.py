@@ -0,0 +1,181 @@
+# tests/test_cache.py
+
+import threading
+import time
+import types
+
+import pytest
+
+from utils import cache as cache_mod
+from utils.cache import CACHES, SWRCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for utils.cache; advance with clock.now += seconds."""
+    fake = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache_mod, "time", types.SimpleNamespace(monotonic=lambda: fake.now))
+    return fake
+
+
+@pytest.fixture
+def swr():
+    cache = SWRCache("test", soft_ttl=10, hard_ttl=100)
+    yield cache
+    CACHES.pop("test", None)
+
+
+def _settle(cache: SWRCache):
+    for _ in range(500):
+        if not cache._refreshing:
+            return
+        time.sleep(0.01)
+    raise AssertionError("refresh never finished")
+
+
+def test_fresh_hit(clock, swr):
+    assert swr.get_or_compute("k", lambda: 1) == 1
+    clock.now += 5
+    assert swr.get_or_compute("k", lambda: 2) == 1
+    assert (swr.stats["miss"], swr.stats["hit"]) == (1, 1)
+
+
+def test_stale_is_served_then_refreshed_in_background(clock, swr):
+    swr.get_or_compute("k", lambda: 1)
+    clock.now += 50
+    assert swr.get_or_compute("k", lambda: 2) == 1
+    _settle(swr)
+    assert swr.stats["refresh_ok"] == 1
+    assert swr.get("k") == 2
+
+
+def test_failed_refresh_keeps_stale_entry(clock, swr):
+    swr.get_or_compute("k", lambda: 1)
+    clock.now += 50
+
+    def fail():
+        raise RuntimeError("db down")
+
+    assert swr.get_or_compute("k", fail) == 1
+    _settle(swr)
+    assert swr.stats["refresh_error"] == 1
+    assert swr.get("k") == 1
+
+
+def test_past_hard_ttl_recomputes_in_caller(clock, swr):
+    swr.get_or_compute("k", lambda: 1)
+    clock.now += 100
+    assert swr.get_or_compute("k", lambda: 2) == 2
+    assert swr.stats["miss"] == 2
+
+
+def test_clear_during_refresh_drops_its_result(clock, swr):
+    swr.get_or_compute("k", lambda: 1)
+    clock.now += 50
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return 2
+
+    swr.get_or_compute("k", slow)
+    started.wait(5)
+    swr.clear()
+    release.set()
+    _settle(swr)
+    assert swr.get("k") is None
+
+
+def test_version_is_part_of_the_key(clock):
+    version = [1]
+    cache = SWRCache("test_versioned", version=lambda: version[0])
+    try:
+        cache.get_or_compute("k", lambda: "v1")
+        version[0] = 2
+        assert cache.get_or_compute("k", lambda: "v2") == "v2"
+        version[0] = 1
+        assert cache.get("k") == "v1"
+    finally:
+        CACHES.pop("test_versioned", None)
+
+
+def test_concurrent_misses_compute_once(swr):
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "v"
+
+    threads = [threading.Thread(target=lambda: results.append(swr.get_or_compute("k", compute))) for _ in range(4)]
+    results = []
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert results == ["v"] * 4
+
+
+def test_failed_compute_never_overlaps_a_retry(swr):
+    running, overlaps, calls = [0], [], []
+    release = threading.Event()
+    lock = threading.Lock()
+
+    def compute():
+        with lock:
+            running[0] += 1
+            overlaps.append(running[0])
+            calls.append(1)
+            first = len(calls) == 1
+        try:
+            if first:
+                release.wait(5)
+                raise RuntimeError("db down")
+            time.sleep(0.02)
+            return "v"
+        finally:
+            with lock:
+                running[0] -= 1
+
+    results = []
+
+    def call():
+        try:
+            results.append(swr.get_or_compute("k", compute))
+        except RuntimeError:
+            results.append("error")
+
+    first = threading.Thread(target=call)
+    first.start()
+    time.sleep(0.05)
+    waiters = [threading.Thread(target=call) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    # callers arriving while the waiters retry must queue on the same lock
+    late = [threading.Thread(target=call) for _ in range(3)]
+    for t in late:
+        t.start()
+    for t in [first, *waiters, *late]:
+        t.join()
+
+    assert max(overlaps) == 1
+    assert calls == [1, 1]
+    assert sorted(results) == ["error"] + ["v"] * 6
+    assert swr._key_locks == {}
+
+
+def test_max_entries_evicts_oldest(clock):
+    cache = SWRCache("test_small", max_entries=2)
+    try:
+        for k in "abc":
+            cache.set(k, k)
+        assert [cache.get(k) for k in "abc"] == [None, "b", "c"]
+    finally:
+        CACHES.pop("test_small", None)
@@ -0,0 +1,37 @@
+# tests/test_classify.py
+
+import numpy as np
+from werkzeug.datastructures import MultiDict
+
+from utils.classify import compute_breaks, jenks_breaks, parse_breaks_args
+
+
+def test_parse_breaks_args():
+    assert parse_breaks_args(MultiDict()) == (None, None)
+    assert parse_breaks_args(MultiDict({"breaks": "jenks"})) == ({"classes": 5, "methods": ("jenks",)}, None)
+    assert parse_breaks_args(MultiDict({"classes": "1"}))[1] == "classes must be between 2 and 12"
+    assert parse_breaks_args(MultiDict({"classes": "3", "breaks": "kmeans"}))[1] == "Invalid breaks: kmeans"
+
+
+def test_empty_and_missing_values():
+    assert compute_breaks([None, float("nan")], 4) == {
+        "classes": 4, "count": 0, "quantile": [], "equal_interval": [], "jenks": [],
+    }
+    out = compute_breaks([3.0, None, 1.0, float("inf"), 2.0], 2, methods=("equal_interval",))
+    assert out == {"classes": 2, "count": 3, "equal_interval": [1.0, 2.0, 3.0]}
+
+
+def test_quantile_edges():
+    values = np.arange(101, dtype=float)[::-1]
+    assert compute_breaks(values, 4, methods=("quantile",))["quantile"] == [0.0, 25.0, 50.0, 75.0, 100.0]
+
+
+def test_jenks_separates_clusters():
+    values = np.sort(np.array([1, 1, 2, 10, 11, 12, 50, 51], dtype=float))
+    assert jenks_breaks(values, 3) == [1.0, 2.0, 12.0, 51.0]
+
+
+def test_jenks_with_fewer_distinct_values_than_classes():
+    assert jenks_breaks(np.array([5.0, 5.0, 5.0]), 4) == [5.0, 5.0]
+    edges = jenks_breaks(np.array([1.0, 1.0, 9.0]), 5)
+    assert edges == [1.0, 1.0, 9.0]
@@ -0,0 +1,80 @@
+# tests/test_community.py
+
+import numpy as np
+
+from utils.community import CommunityInputs, community_self_consumption, evaluate_groupings
+from utils.indicators import HourlyProfiles
+
+
+def _brute_force(surplus, deficit, slot_weights, labels):
+    """Per-territory CSC netting each community slot by slot with loops."""
+    csc = np.zeros(len(labels))
+    for g in set(labels.tolist()):
+        members = np.flatnonzero(labels == g)
+        for s in range(surplus.shape[1]):
+            shared = min(surplus[members, s].sum(), deficit[members, s].sum())
+            need = deficit[members, s].sum()
+            for i in members:
+                if need > 0:
+                    csc[i] += deficit[i, s] * shared / need * slot_weights[s]
+    return csc
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(3)
+    n, slots = 12, 30
+    balance = rng.normal(size=(n, slots))
+    surplus, deficit = np.maximum(balance, 0), np.maximum(-balance, 0)
+    slot_weights = rng.integers(1, 5, slots).astype(float)
+    labels = np.array([0, 2, 2, 1, 0, 3, 2, 1, 1, 0, 3, 2])
+
+    res = community_self_consumption(surplus, deficit, slot_weights, labels)
+    assert np.allclose(res["csc_mwh"], _brute_force(surplus, deficit, slot_weights, labels))
+    assert res["community_members"].tolist() == [3, 3, 4, 2]
+    # what the members receive is what their community shares
+    for g in range(4):
+        assert np.isclose(res["csc_mwh"][labels == g].sum(), res["community_csc_mwh"][g])
+    assert np.all(res["community_csc_mwh"] <= np.minimum(res["community_surplus_mwh"],
+                                                         res["community_deficit_mwh"]) + 1e-9)
+
+
+def test_communities_of_one_share_nothing():
+    surplus = np.array([[1.0, 0.0], [0.0, 2.0]])
+    deficit = np.array([[0.0, 1.0], [2.0, 0.0]])
+    res = community_self_consumption(surplus, deficit, np.ones(2), np.array([0, 1]))
+    assert res["csc_mwh"].tolist() == [0.0, 0.0]
+
+
+def test_limited_surplus_is_split_by_deficit():
+    # one producer with 3 MWh spare, two members short of 2 and 4 MWh
+    surplus = np.array([[3.0], [0.0], [0.0]])
+    deficit = np.array([[0.0], [2.0], [4.0]])
+    res = community_self_consumption(surplus, deficit, np.array([10.0]), np.array([5, 5, 5]))
+    assert res["csc_mwh"].tolist() == [0.0, 10.0, 20.0]
+    assert res["community_csc_mwh"].tolist() == [30.0]
+
+
+def _profiles(n=6):
+    rng = np.random.default_rng(11)
+    return HourlyProfiles(np.arange(100, 100 + n), rng.random((n, 12, 2, 24)), rng.random((n, 12, 2, 24)),
+                          np.zeros((n, 12, 2, 24)), 2019)
+
+
+def test_evaluate_summary():
+    inputs = CommunityInputs(_profiles())
+    res = inputs.evaluate(np.zeros(6, dtype=np.int64))
+    sc = inputs.indicators["self_consumption_mwh"]
+    assert np.allclose(res["metrics"]["community_self_consumption_total_mwh"], sc + res["csc_mwh"])
+    assert res["summary"]["communities"] == 1
+    ssi = (sc.sum() + res["csc_mwh"].sum()) / inputs.indicators["consumption_mwh"].sum()
+    assert np.isclose(res["summary"]["self_sufficiency_index"], ssi)
+
+
+def test_parallel_groupings_match_sequential():
+    inputs = CommunityInputs(_profiles())
+    groupings = {"all": np.zeros(6, dtype=np.int64), "pairs": np.array([0, 0, 1, 1, 2, 2])}
+    sequential = evaluate_groupings(inputs, groupings, workers=1)
+    parallel = evaluate_groupings(inputs, groupings, workers=2)
+    for name in groupings:
+        assert np.allclose(sequential[name]["csc_mwh"], parallel[name]["csc_mwh"])
+        assert sequential[name]["summary"] == parallel[name]["summary"]
@@ -0,0 +1,103 @@
+# tests/test_cube.py
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import Cube, _axis
+from utils.filters import month_to_season
+
+SCENARIOS = ["0", "1"]
+CATEGORIES = [[10, "consumption", "Residential", "res"], [20, "production", "Solar", "pv"],
+              [21, "production", "Wind", "wind"]]
+TERRITORIES = [[100 + i, f"T{i}", 1, 10 + i % 2, 1000 + i] for i in range(6)]
+
+
+def _facts(seed=0) -> pd.DataFrame:
+    """Monthly fact rows (year, month, day_type) over a random subset of cells; territory 105 has none."""
+    rng = np.random.default_rng(seed)
+    times = [(t, y, m, d) for t, (y, m, d) in enumerate(
+        (y, m, d) for y in (2019, 2020) for m in range(1, 13) for d in ("weekday", "weekend"))]
+    rows = [
+        (s, t, c[0], n[0], y, m, d, c[1], c[2].lower(), c[3], round(float(rng.random() * 100), 3))
+        for s in range(len(SCENARIOS)) for t, y, m, d in times for c in CATEGORIES for n in TERRITORIES[:5]
+        if rng.random() < 0.7
+    ]
+    return pd.DataFrame(rows, columns=["scenario", "time_id", "category_id", "territory_id", "year", "month",
+                                       "day_type", "domain", "base_group", "code", "value_mwh"])
+
+
+def _cube(facts: pd.DataFrame) -> Cube:
+    """Cube laid out as utils.cube._build_one writes it, with every territory on the axis."""
+    time_ids, t_pos = _axis(facts["time_id"])
+    category_ids, c_pos = _axis(facts["category_id"])
+    territory_ids = np.array([t[0] for t in TERRITORIES])
+    n_pos = np.searchsorted(territory_ids, facts["territory_id"])
+    shape = (len(SCENARIOS), len(time_ids), len(category_ids), len(territory_ids))
+    values = np.zeros(shape, dtype=np.float32)
+    present = np.zeros(shape, dtype=bool)
+    idx = (facts["scenario"].to_numpy(), t_pos, c_pos, n_pos)
+    values[idx] = facts["value_mwh"].to_numpy(dtype=np.float32)
+    present[idx] = True
+
+    times = facts.drop_duplicates("time_id").set_index("time_id").sort_index()
+    meta = {
+        "scenarios": SCENARIOS,
+        "times": [[i, r.year, r.month, r.day_type, None, month_to_season[r.month]] for i, r in times.iterrows()],
+        "categories": [c for c in CATEGORIES if c[0] in set(category_ids.tolist())],
+        "territories": TERRITORIES,
+    }
+    return Cube("province", "monthly", meta, values, present)
+
+
+def _reference(facts, scenario, years, domain, months, day_types, base_group=""):
+    """GROUP BY territory_id over the filtered rows, as the /charts/values SQL does."""
+    f = facts[(facts["scenario"] == SCENARIOS.index(scenario)) & facts["year"].isin(years)
+              & (facts["domain"] == domain)]
+    if months is not None:
+        f = f[f["month"].isin(months)]
+    if day_types:
+        f = f[f["day_type"].isin(day_types)]
+    if base_group:
+        f = f[f["base_group"] == base_group.lower()]
+    return f.groupby("territory_id")["value_mwh"].sum()
+
+
+def test_values_by_territory_matches_group_by():
+    facts = _facts()
+    cube = _cube(facts)
+    for scenario, years, domain, months, day_types, base_group in [
+        ("0", [2019], "production", None, [], ""),
+        ("1", [2019, 2020], "consumption", [1, 2, 12], ["weekend"], ""),
+        ("0", [2020], "production", [6], ["weekday", "weekend"], "solar"),
+    ]:
+        cols, rows = cube.values_by_territory(scenario, years, domain, base_group, "", months, day_types, [],
+                                              ["name"])
+        assert cols == ["territory_id", "name", "value_mwh"]
+        expected = _reference(facts, scenario, years, domain, months, day_types, base_group)
+        assert [r[0] for r in rows] == expected.index.tolist()
+        assert np.allclose([r[2] for r in rows], expected.to_numpy(), rtol=1e-5)
+        assert all(r[1] == f"T{r[0] - 100}" for r in rows)
+
+
+def test_value_order_and_empty_filters():
+    facts = _facts(1)
+    cube = _cube(facts)
+    _, rows = cube.values_by_territory("0", [2019], "production", "", "", None, [], [], [],
+                                       order_by="value", order="desc")
+    values = [r[1] for r in rows]
+    assert values == sorted(values, reverse=True)
+
+    # months=[] is "no month matches", an unknown scenario has no rows
+    assert cube.values_by_territory("0", [2019], "production", "", "", [], [], [], [])[1] == []
+    assert cube.values_by_territory("9", [2019], "production", "", "", None, [], [], [])[1] == []
+
+
+def test_series_per_month():
+    facts = _facts(2)
+    cube = _cube(facts)
+    rows = cube.series("0", [2019], "consumption", "", "", None, ["weekday"], [], "prov_cod", "11", [])
+    f = facts[(facts["scenario"] == 0) & (facts["year"] == 2019) & (facts["domain"] == "consumption")
+              & (facts["day_type"] == "weekday") & facts["territory_id"].isin([101, 103])]
+    expected = f.groupby("month")["value_mwh"].sum()
+    assert [r[0] for r in rows] == expected.index.tolist()
+    assert np.allclose([r[1] for r in rows], expected.to_numpy(), rtol=1e-5)
@@ -0,0 +1,26 @@
+# tests/test_energy.py
+
+import pytest
+from flask import Flask
+
+from api.energy import energy_bp
+from utils import dataset_version
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # the ETag wrapper reads the dataset version; no database here
+    monkeypatch.setattr(dataset_version, "current", lambda: 1)
+    app = Flask(__name__)
+    app.register_blueprint(energy_bp, url_prefix="/charts")
+    return app.test_client()
+
+
+@pytest.mark.parametrize("url", [
+    "/charts/values?level=region&resolution=monthly&domain=consumption&year=2019&hour=5",
+    "/charts/series?level=region&resolution=annual&domain=consumption&year=2019&hour=5&region_code=1",
+])
+def test_hour_filter_needs_hourly_resolution(client, url):
+    r = client.get(url)
+    assert r.status_code == 400
+    assert r.get_json() == {"error": "hour filters require resolution=hourly"}
@@ -0,0 +1,41 @@
+# tests/test_filters.py
+
+import pandas as pd
+
+from utils.filters import apply_filters, build_calendar, filter_months, filters_to_sql
+
+
+def test_filter_months():
+    assert filter_months([], []) is None
+    assert filter_months([3, 1], None) == [1, 3]
+    assert filter_months([], ["winter"]) == [1, 2, 12]
+    assert filter_months([1, 6], ["winter", "autumn"]) == [1]
+    assert filter_months([6], ["winter"]) == []
+
+
+def test_filters_to_sql():
+    where, params = filters_to_sql({
+        "years": [2019], "months": [7, 12], "seasons": ["summer"], "day_types": ["weekend"], "hours": [18],
+    }, time_alias="d")
+    assert where == "d.year = ANY(%s) AND d.month = ANY(%s) AND d.hour = ANY(%s) AND d.day_type = ANY(%s)"
+    assert params == [[2019], [7], [18], ["weekend"]]
+    assert filters_to_sql({}) == ("TRUE", [])
+    assert filters_to_sql({"years": [2019], "months": [1], "seasons": ["summer"]}) == ("FALSE", [])
+
+
+def test_apply_filters_matches_row_by_row():
+    df = pd.DataFrame({
+        "date": pd.date_range("2019-01-01", periods=24 * 400, freq="h").astype(str).tolist() + ["not a date"],
+    })
+    df["v"] = range(len(df))
+    filters = {"years": [2019], "months": [], "hours": [8, 20], "day_types": ["weekend"], "seasons": ["winter"]}
+
+    out = apply_filters(df, filters, build_calendar(df))
+
+    dates = pd.to_datetime(df["date"], errors="coerce")
+    keep = [
+        pd.notna(d) and d.year == 2019 and d.hour in (8, 20) and d.weekday() >= 5 and d.month in (12, 1, 2)
+        for d in dates
+    ]
+    assert out["v"].tolist() == df["v"][keep].tolist()
+    assert "season" not in df.columns  # the input frame is left alone
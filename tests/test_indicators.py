@@ -0,0 +1,91 @@
+# tests/test_indicators.py
+
+import numpy as np
+
+from utils.indicators import INDICATOR_KEYS, HourlyProfiles, compute, day_weights, param_rows
+
+
+def _brute_force(c, p, weights):
+    """Indicators of one territory with explicit loops over the typical days."""
+    tot_c = tot_p = tot_sc = 0.0
+    for m in range(12):
+        for d in range(2):
+            for h in range(24):
+                w = weights[m, d]
+                tot_c += c[m, d, h] * w
+                tot_p += p[m, d, h] * w
+                tot_sc += min(c[m, d, h], p[m, d, h]) * w
+    return {
+        "consumption_mwh": tot_c,
+        "production_mwh": tot_p,
+        "self_consumption_mwh": tot_sc,
+        "over_production_mwh": tot_p - tot_sc,
+        "uncovered_demand_mwh": tot_c - tot_sc,
+        "self_consumption_index": tot_sc / tot_p if tot_p else 0.0,
+        "self_sufficiency_index": tot_sc / tot_c if tot_c else 0.0,
+        "over_production_index": (tot_p - tot_sc) / tot_p if tot_p else 0.0,
+    }
+
+
+def test_day_weights_count_calendar_days():
+    w = day_weights(2024)
+    assert w.sum() == 366
+    assert w[0].tolist() == [23, 8]  # January 2024
+    assert w[1].tolist() == [21, 8]  # February 2024 (leap year)
+    assert day_weights(2023).sum() == 365
+
+
+def test_compute_matches_brute_force():
+    rng = np.random.default_rng(7)
+    c = rng.random((3, 12, 2, 24))
+    p = rng.random((3, 12, 2, 24)) * 2
+    p[2] = 0.0  # no production at all
+    weights = day_weights(2019)
+
+    metrics = compute(c, p, weights)
+    assert list(metrics) == INDICATOR_KEYS
+    for i in range(3):
+        expected = _brute_force(c[i], p[i], weights)
+        for k in INDICATOR_KEYS:
+            assert np.isclose(metrics[k][i], expected[k]), (i, k)
+    assert metrics["self_consumption_index"][2] == 0.0
+
+
+def test_surplus_does_not_cover_another_hour():
+    c = np.zeros((1, 12, 2, 24))
+    p = np.zeros((1, 12, 2, 24))
+    p[..., 12] = 1.0  # midday production
+    c[..., 20] = 1.0  # evening demand
+    metrics = compute(c, p, np.ones((12, 2)))
+    assert metrics["self_consumption_mwh"][0] == 0.0
+    assert metrics["over_production_mwh"][0] == metrics["production_mwh"][0] == 24.0
+    assert metrics["uncovered_demand_mwh"][0] == 24.0
+
+
+def test_by_month_sums_to_annual():
+    rng = np.random.default_rng(1)
+    c, p = rng.random((2, 4, 12, 2, 24))
+    weights = day_weights(2021)
+    annual = compute(c, p, weights)
+    monthly = compute(c, p, weights, by_month=True)
+    assert monthly["consumption_mwh"].shape == (4, 12)
+    for k in ("consumption_mwh", "production_mwh", "self_consumption_mwh"):
+        assert np.allclose(monthly[k].sum(axis=-1), annual[k])
+
+
+def test_uplift_applies_to_uplift_production_only():
+    ones = np.ones((1, 12, 2, 24))
+    profiles = HourlyProfiles(np.array([5]), ones, ones * 3, ones, 2019)
+    assert profiles.production() is profiles.production_total
+    assert np.allclose(profiles.production(50), 3.5)
+
+
+def test_param_rows_units():
+    metrics = {"consumption_mwh": np.array([1.5, 2.0]), "self_sufficiency_index": np.array([0.25, 0.5])}
+    rows = param_rows(4, 2019, np.array([10, 11]), metrics, "n", keys=list(metrics))
+    assert rows == [
+        (4, 10, "consumption_mwh", 1.5, "MWh", 2019, "n"),
+        (4, 11, "consumption_mwh", 2.0, "MWh", 2019, "n"),
+        (4, 10, "self_sufficiency_index", 0.25, "ratio", 2019, "n"),
+        (4, 11, "self_sufficiency_index", 0.5, "ratio", 2019, "n"),
+    ]
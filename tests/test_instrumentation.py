@@ -0,0 +1,58 @@
+# tests/test_instrumentation.py
+
+from flask import Flask
+
+from utils import instrumentation
+from utils.instrumentation import BUCKETS, Histogram, fingerprint, normalize_sql
+
+
+def test_normalize_sql_strips_literals_and_whitespace():
+    sql = """
+        SELECT t.id, 'it''s' AS label
+        FROM energy_dw.fact_energy f
+        WHERE tm.year = 2019 AND f.value_mwh > 1.5
+          AND f.data_source = 'agg_region_hourly';
+    """
+    assert normalize_sql(sql) == (
+        "SELECT t.id, ? AS label FROM energy_dw.fact_energy f "
+        "WHERE tm.year = ? AND f.value_mwh > ? AND f.data_source = ?"
+    )
+
+
+def test_normalize_sql_keeps_identifiers_and_placeholders():
+    sql = "SELECT col1, t2.x FROM agg_2019 WHERE a = %s LIMIT %s"
+    assert normalize_sql(sql) == sql
+
+
+def test_fingerprint_is_stable_per_statement_shape():
+    fp_a, norm = fingerprint("SELECT * FROM t WHERE id = 1")
+    fp_b, _ = fingerprint("SELECT *  FROM t\n WHERE id = 42;")
+    fp_c, _ = fingerprint("SELECT * FROM t WHERE code = 'x'")
+    assert fp_a == fp_b != fp_c
+    assert len(fp_a) == 12
+    assert norm == "SELECT * FROM t WHERE id = ?"
+
+
+def test_histogram_buckets():
+    h = Histogram()
+    for seconds in (0.0005, 0.001, 0.003, 99.0):
+        h.observe(seconds)
+    assert h.count == 4
+    assert h.counts[0] == 2  # le 0.001 is inclusive
+    assert h.counts[BUCKETS.index(0.005)] == 1
+    assert h.counts[-1] == 1  # +Inf
+
+
+def test_metrics_route_requires_admin_access(monkeypatch):
+    from utils import slow_queries
+
+    app = Flask(__name__)
+    instrumentation.init_app(app)
+    client = app.test_client()
+
+    assert client.get("/debug/metrics").status_code == 200
+    assert client.get("/debug/metrics", environ_base={"REMOTE_ADDR": "10.0.0.8"}).status_code == 403
+
+    monkeypatch.setattr(slow_queries, "ADMIN_TOKEN", "secret")
+    assert client.get("/debug/metrics?format=json").status_code == 403
+    assert client.get("/debug/metrics?format=json", headers={"X-Admin-Token": "secret"}).status_code == 200
@@ -0,0 +1,105 @@
+# tests/test_load_fact_energy.py
+
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import load_fact_energy  # noqa: E402
+
+
+class _Cursor:
+    def __init__(self, loaded: list, fail_after: int | None):
+        self.loaded = loaded
+        self.fail_after = fail_after
+
+    def execute(self, sql, params=None):
+        pass
+
+    def copy_expert(self, sql, buf):
+        if self.fail_after is not None and len(self.loaded) >= self.fail_after:
+            raise RuntimeError("connection lost")
+        self.loaded.append(buf.getvalue().splitlines())
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, cur):
+        self.cur = cur
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def run_load(monkeypatch, tmp_path):
+    rows = [
+        ["Solar", "Roma", "Jan", "Weekday", "1", "1.5"],
+        ["Solar", "Roma", "Jan", "Weekday", "", "2.0"],  # blank Hour
+        ["Solar", "Milano", "Jan", "Weekend", "2", "3.0"],
+        ["Solar", "Nowhere", "Jan", "Weekday", "1", "4.0"],  # unknown comune
+        ["Solar", "Roma", "Feb", "Weekday", "x", "5.0"],  # malformed Hour
+        ["Solar", "Roma", "Jan", "Weekend", "1", "n/a"],  # malformed Value
+        ["Solar", "Roma", "Jan", "Weekend", "1", "1,5"],
+        ["Solar", "Roma", "Jan", "Weekend", "1", " "],
+        ["Solar", "Roma", "Jan", "Weekend", "1", "6.0"],
+        ["Solar", "Milano", "Jan", "Weekday", "2", "7.0"],
+    ]
+    path = tmp_path / "hourly.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Energy_Source", "Municipality", "Month", "Day_Type", "Hour", "Value"])
+        writer.writerows(rows)
+
+    times = {(1, "weekday", 1): 11, (1, "weekend", 2): 12, (1, "weekend", 1): 13, (1, "weekday", 2): 14}
+    monkeypatch.setattr(load_fact_energy, "load_lookups", lambda cur, year, scenario: (
+        {"roma": 1, "milano": 2}, {"photovoltaic": 7}, times, 3, 0))
+    monkeypatch.setitem(load_fact_energy.KINDS["production"], "source_map", {"Solar": "photovoltaic"})
+    monkeypatch.setattr(load_fact_energy, "bump_version", lambda cur, reason: 1)
+
+    def run(loaded, fail_after=None, restart=False):
+        monkeypatch.setattr(load_fact_energy, "get_connection", lambda: _Conn(_Cursor(loaded, fail_after)))
+        load_fact_energy.load("production", str(path), 2019, "0", batch_size=2, restart=restart)
+
+    return run, path
+
+
+def _values(batches):
+    return [float(line.split("\t")[4]) for batch in batches for line in batch]
+
+
+def test_bad_rows_are_skipped(run_load, capsys):
+    run, path = run_load
+    loaded = []
+    run(loaded)
+    assert _values(loaded) == [1.5, 3.0, 6.0, 7.0]
+    assert "Skipped: {'territory': 1, 'category': 0, 'time': 2, 'value': 3}" in capsys.readouterr().out
+    assert not os.path.exists(str(path) + ".progress.json")
+
+
+def test_resume_after_failed_batch(run_load):
+    run, path = run_load
+    first = []
+    with pytest.raises(RuntimeError):
+        run(first, fail_after=1)
+    assert _values(first) == [1.5, 3.0]
+
+    second = []
+    run(second)
+    # the committed batch is not loaded again
+    assert _values(second) == [6.0, 7.0]
+
+    again = []
+    run(again, restart=True)
+    assert _values(again) == [1.5, 3.0, 6.0, 7.0]
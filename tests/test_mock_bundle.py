@@ -0,0 +1,82 @@
+# tests/test_mock_bundle.py
+
+import json
+
+import pytest
+
+from scripts.mock_bundle import BUNDLE_FILE, INDEX_FILE, MockBundleReader, MockBundleWriter, pack_dir
+
+
+def test_round_trip(tmp_path):
+    docs = {
+        "values_region_consumption": [{"territory_id": 1, "value_mwh": 12.5}],
+        "series_comune_1001": {"name": "Città", "points": [1, 2, 3]},
+        "empty": {},
+    }
+    with MockBundleWriter(tmp_path) as bundle:
+        for key, doc in docs.items():
+            assert bundle.put(key, doc)
+
+    reader = MockBundleReader(tmp_path)
+    try:
+        assert sorted(reader.keys()) == sorted(docs)
+        for key, doc in docs.items():
+            assert reader.get(key) == doc
+        assert "missing" not in reader
+        assert reader.get("missing") is None
+    finally:
+        reader.close()
+
+
+def test_offsets_slice_the_bundle_lines(tmp_path):
+    with MockBundleWriter(tmp_path) as bundle:
+        bundle.put("b", {"x": "ü" * 10})
+        bundle.put("a", [1, 2])
+
+    data = (tmp_path / BUNDLE_FILE).read_bytes()
+    index = json.loads((tmp_path / INDEX_FILE).read_text())
+    # entries are written sorted by key, one line each; lengths are bytes, not characters
+    assert data.split(b"\n")[:-1] == [data[o:o + n] for o, n in index["entries"].values()]
+    assert list(index["entries"]) == ["a", "b"]
+    for key, (offset, length) in index["entries"].items():
+        assert data[offset + length:offset + length + 1] == b"\n"
+
+
+def test_update_keeps_entries_and_skips_unchanged(tmp_path):
+    with MockBundleWriter(tmp_path) as bundle:
+        bundle.put("a", {"v": 1})
+        bundle.put("b", {"v": 2})
+    mtime = (tmp_path / BUNDLE_FILE).stat().st_mtime_ns
+
+    with MockBundleWriter(tmp_path) as bundle:
+        assert not bundle.put("a", {"v": 1})
+        assert bundle.changed == 0
+    assert (tmp_path / BUNDLE_FILE).stat().st_mtime_ns == mtime
+
+    with MockBundleWriter(tmp_path) as bundle:
+        assert bundle.put("b", {"v": 3})
+        bundle.put("c", None)
+
+    reader = MockBundleReader(tmp_path)
+    try:
+        assert {k: reader.get(k) for k in reader.keys()} == {"a": {"v": 1}, "b": {"v": 3}, "c": None}
+    finally:
+        reader.close()
+
+
+def test_rejects_multiline_entries(tmp_path):
+    with pytest.raises(ValueError):
+        MockBundleWriter(tmp_path).put_raw("a", b'{\n"v": 1}')
+
+
+def test_pack_dir(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "values_x.json").write_text(json.dumps({"items": [1]}), encoding="utf-8")
+    pack_dir(src, tmp_path / "bundle")
+
+    reader = MockBundleReader(tmp_path / "bundle")
+    try:
+        assert reader.get("values_x") == {"items": [1]}
+    finally:
+        reader.close()
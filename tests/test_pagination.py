@@ -0,0 +1,63 @@
+# tests/test_pagination.py
+
+from werkzeug.datastructures import MultiDict
+
+from utils.pagination import page_clauses, page_response, parse_page_args
+
+FIELDS = ["territory_id", "name", "value_mwh"]
+
+
+def _page(**args):
+    page, err = parse_page_args(MultiDict(args), FIELDS)
+    assert err is None
+    return page
+
+
+def test_defaults_are_unpaged_territory_order():
+    page = _page()
+    assert page["fields"] is None
+    assert (page["order_by"], page["order"], page["limit"], page["after"]) == ("territory_id", "asc", None, None)
+
+
+def test_fields_always_include_territory_id():
+    assert _page(fields="name")["fields"] == ["territory_id", "name"]
+
+
+def test_value_order_defaults_to_desc():
+    assert _page(order_by="value")["order"] == "desc"
+
+
+def test_invalid_args():
+    for args, message in [
+        ({"fields": "name,bogus"}, "Invalid fields: bogus"),
+        ({"order_by": "name"}, "Invalid order_by"),
+        ({"order": "up"}, "Invalid order"),
+        ({"limit": "0"}, "limit must be between"),
+        ({"order_by": "value", "after": "3"}, "after_value is required"),
+    ]:
+        page, err = parse_page_args(MultiDict(args), FIELDS)
+        assert page is None
+        assert err.startswith(message)
+
+
+def test_keyset_on_value_breaks_ties_by_territory():
+    page = _page(order_by="value", limit="2", after="7", after_value="1.5")
+    where, tail, params = page_clauses(page, "value_mwh")
+    assert where == "value_mwh IS NOT NULL AND (value_mwh, territory_id) < (%s, %s)"
+    assert tail == "ORDER BY value_mwh DESC, territory_id DESC LIMIT %s"
+    assert params == [1.5, 7, 2]
+
+
+def test_keyset_on_territory():
+    where, tail, params = page_clauses(_page(after="10", limit="5"), "value_mwh")
+    assert (where, tail, params) == ("territory_id > %s", "ORDER BY territory_id ASC LIMIT %s", [10, 5])
+
+
+def test_next_cursor_only_on_full_pages():
+    page = _page(order_by="value", limit="2")
+    items = [{"territory_id": 3}, {"territory_id": 1}]
+    last = {"territory_id": 1, "value_mwh": 0.5}
+    assert page_response(items, page, "value_mwh", last)["next"] == {"after": 1, "after_value": 0.5}
+    assert page_response(items[:1], page, "value_mwh", last)["next"] is None
+    # unpaged requests keep the plain list
+    assert page_response(items, _page(), "value_mwh", last) == items
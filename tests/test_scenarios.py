@@ -0,0 +1,21 @@
+# tests/test_scenarios.py
+
+import pytest
+
+from api import scenarios
+
+
+@pytest.mark.parametrize("wide", [True, False])
+def test_param_source_drops_null_values_on_both_tables(monkeypatch, wide):
+    monkeypatch.setattr(scenarios, "_has_wide_table", lambda: wide)
+    table, value_expr, key_filter, key_params = scenarios._param_source("self_sufficiency_index")
+    assert table == ("energy_dw.fact_scenario_wide" if wide else "energy_dw.fact_scenario_param")
+    assert key_filter.endswith(f"{value_expr} IS NOT NULL")
+
+
+def test_param_source_reads_other_keys_from_eav(monkeypatch):
+    monkeypatch.setattr(scenarios, "_has_wide_table", lambda: True)
+    assert scenarios._param_source("custom_key") == (
+        "energy_dw.fact_scenario_param", "f.param_value",
+        "f.param_key = %s AND f.param_value IS NOT NULL", ["custom_key"],
+    )
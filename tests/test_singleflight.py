@@ -0,0 +1,93 @@
+# tests/test_singleflight.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.cache import TTLCache
+from utils.singleflight import SingleFlight, fetch_rows_cached, fetch_rows_shared
+
+
+def _blocking(release: threading.Event, calls: list, result=None, error=None):
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return result
+    return fn
+
+
+def _wait_for_waiters(flight: SingleFlight, key, n: int):
+    for _ in range(500):
+        with flight._lock:
+            if flight._calls[key].waiters >= n:
+                return
+        time.sleep(0.01)
+    raise AssertionError("callers never joined the flight")
+
+
+def test_concurrent_calls_run_once():
+    flight = SingleFlight()
+    release, calls = threading.Event(), []
+    fn = _blocking(release, calls, result=[1, 2])
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "k", fn)
+        while not calls:
+            time.sleep(0.01)
+        followers = [pool.submit(flight.do, "k", fn) for _ in range(3)]
+        _wait_for_waiters(flight, "k", 3)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert calls == [1]
+    assert results == [([1, 2], False)] + [([1, 2], True)] * 3
+    assert flight.in_flight() == 0
+
+
+def test_error_reaches_every_waiter_and_is_not_kept():
+    flight = SingleFlight()
+    release, calls = threading.Event(), []
+    fn = _blocking(release, calls, error=RuntimeError("boom"))
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "k", fn)
+        while not calls:
+            time.sleep(0.01)
+        follower = pool.submit(flight.do, "k", fn)
+        _wait_for_waiters(flight, "k", 1)
+        release.set()
+        for f in (leader, follower):
+            with pytest.raises(RuntimeError, match="boom"):
+                f.result()
+
+    # the next call runs again
+    assert flight.do("k", lambda: 3) == (3, False)
+
+
+def test_fetch_rows_shared_uses_given_fetch_and_list_params():
+    seen = []
+
+    def fetch(query, params):
+        seen.append((query, params))
+        return ["a"], [(1,)]
+
+    assert fetch_rows_shared("SELECT a FROM t WHERE id = ANY(%s)", ([1, 2],), fetch) == (["a"], [(1,)])
+    assert seen == [("SELECT a FROM t WHERE id = ANY(%s)", ([1, 2],))]
+
+
+def test_fetch_rows_cached_keys_on_query_and_params():
+    cache = TTLCache(60)
+    calls = []
+
+    def fetch(query, params):
+        calls.append(params)
+        return ["n"], [(len(calls),)]
+
+    assert fetch_rows_cached(cache, "SELECT n", ([1, 2],), fetch)[1] == [(1,)]
+    assert fetch_rows_cached(cache, "SELECT n", ([1, 2],), fetch)[1] == [(1,)]
+    assert fetch_rows_cached(cache, "SELECT n", ([2, 1],), fetch)[1] == [(2,)]
+    assert len(calls) == 2
@@ -0,0 +1,63 @@
+# tests/test_slow_queries.py
+
+import os
+import threading
+
+import pytest
+
+from utils.slow_queries import SlowQuerySampler, _is_read_only
+
+
+def _sampler(explain):
+    sampler = SlowQuerySampler(threshold_ms=100, per_minute=10, cooldown_s=300)
+    sampler._explain = explain
+    return sampler
+
+
+def test_only_slow_reads_are_captured():
+    explained = []
+    sampler = _sampler(lambda entry, query, params: (explained.append(query), setattr(sampler, "_busy", False)))
+    sampler.maybe_capture("SELECT a FROM t", None, None, 0.05)
+    sampler.maybe_capture("UPDATE t SET a = 1", None, None, 5.0)
+    sampler.maybe_capture("WITH x AS (SELECT 1) SELECT * FROM x", (1,), b"rendered", 0.5)
+    sampler._executor.shutdown(wait=True)
+    assert explained == ["WITH x AS (SELECT 1) SELECT * FROM x"]
+    assert sampler.snapshot()[0]["sql"] == "rendered"
+    assert not _is_read_only("SELECT 1; DROP TABLE t")
+
+
+def test_same_fingerprint_is_throttled():
+    sampler = _sampler(lambda entry, query, params: setattr(sampler, "_busy", False))
+    sampler.maybe_capture("SELECT a FROM t WHERE id = 1", None, None, 1.0)
+    sampler._executor.shutdown(wait=True)
+    sampler.maybe_capture("SELECT a FROM t WHERE id = 2", None, None, 1.0)
+    assert (sampler.stats["captured"], sampler.stats["throttled"]) == (1, 1)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_child_gets_its_own_explain_thread():
+    release = threading.Event()
+
+    def explain(entry, query, params):
+        release.wait(5)
+        sampler._busy = False
+
+    sampler = _sampler(explain)
+    # parent: an EXPLAIN in flight at fork time
+    sampler.maybe_capture("SELECT a FROM t", None, None, 1.0)
+
+    pid = os.fork()
+    if pid == 0:
+        ran = threading.Event()
+
+        def child_explain(entry, query, params):
+            ran.set()
+            sampler._busy = False
+
+        sampler._explain = child_explain
+        sampler.maybe_capture("SELECT b FROM u", None, None, 1.0)
+        os._exit(0 if ran.wait(5) else 1)
+
+    _, status = os.waitpid(pid, 0)
+    release.set()
+    assert os.waitstatus_to_exitcode(status) == 0
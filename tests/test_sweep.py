@@ -0,0 +1,59 @@
+# tests/test_sweep.py
+
+import sys
+
+import numpy as np
+
+from utils import sweep
+from utils.indicators import compute
+
+KEYS = ["self_sufficiency_index", "over_production_mwh"]
+
+
+def _inputs(n=5):
+    rng = np.random.default_rng(5)
+    consumption = rng.random((n, 12, 2, 24))
+    solar, wind = rng.random((2, n, 12, 2, 24))
+    return consumption, solar + wind, {"solar": solar, "wind": wind}, np.ones((12, 2))
+
+
+def test_grid_matches_pointwise_compute():
+    consumption, production, by_category, weights = _inputs()
+    combinations, uplifts = [[], ["solar"], ["solar", "wind"]], [0.0, 25.0, 100.0]
+
+    curves = sweep.run_sweep(consumption, production, by_category, weights, combinations, uplifts, KEYS)
+    assert curves[KEYS[0]].shape == (3, 5, 3)
+
+    for ci, combo in enumerate(combinations):
+        base = sum(by_category[c] for c in combo) if combo else production
+        for ui, u in enumerate(uplifts):
+            expected = compute(consumption, production + base * u / 100.0, weights)
+            for k in KEYS:
+                assert np.allclose(curves[k][ci, :, ui], expected[k])
+
+
+def test_pool_matches_in_process(monkeypatch, tmp_path):
+    consumption, production, by_category, weights = _inputs()
+    args = (consumption, production, by_category, weights, [["wind"], []], [0.0, 50.0], KEYS)
+    in_process = sweep.run_sweep(*args)
+
+    if getattr(sys.modules["config"], "__file__", None) is None:
+        # spawned workers import utils.db_utils too: give them the conftest's empty DB_CONFIG
+        (tmp_path / "config.py").write_text("DB_CONFIG = {}\n")
+        monkeypatch.syspath_prepend(str(tmp_path))
+    shm = tmp_path / "shm"
+    shm.mkdir()
+    monkeypatch.setattr(sweep, "SWEEP_WORKERS", 2)
+    monkeypatch.setattr(sweep, "SWEEP_POOL_MIN_CELLS", 0)
+    monkeypatch.setattr(sweep, "SWEEP_TMPDIR", str(shm))
+    monkeypatch.setattr(sweep, "_pool", None)
+    try:
+        pooled = sweep.run_sweep(*args)
+    finally:
+        if sweep._pool is not None:
+            sweep._pool.shutdown()
+
+    for k in KEYS:
+        assert np.allclose(pooled[k], in_process[k])
+    # the memory-mapped base arrays are removed afterwards
+    assert list(shm.iterdir()) == []
@@ -0,0 +1,198 @@
+# utils/cache.py
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with a per-entry TTL.
+    Oldest entries are evicted first once max_entries is reached.
+    """
+
+    def __init__(self, ttl_seconds: float = 600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.max_entries:
+                # dicts keep insertion order -> first key is the oldest
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# background refreshes for every SWRCache of the process
+CACHE_REFRESH_WORKERS = int(os.environ.get("CACHE_REFRESH_WORKERS", "4"))
+
+# name -> cache, for /debug/metrics and utils.warmup.clear_caches()
+CACHES: dict[str, "SWRCache"] = {}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _refresh_pool() -> ThreadPoolExecutor:
+    """Shared refresh pool, created lazily once per process (threads don't survive a fork)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+            _pool_pid = os.getpid()
+        return _pool
+
+
+class SWRCache:
+    """
+    Stale-while-revalidate cache, same interface as TTLCache.
+
+    An entry younger than soft_ttl is served as is. Between soft_ttl and
+    hard_ttl it is still served right away, and one background refresh per
+    key recomputes it on the shared pool. Past hard_ttl (or on a miss) the
+    caller computes it; concurrent callers for the same key wait for that one
+    computation instead of starting their own.
+
+    compute callables run outside the request on refresh, so they must not
+    read flask.request / g.
+
+    version, when given, is called on every lookup and its result becomes
+    part of the key (utils.dataset_version.current): entries of an older
+    dataset are never served, they just age out.
+    """
+
+    def __init__(self, name: str, soft_ttl: float = 600, hard_ttl: float = 3600, max_entries: int = 1024,
+                 version=None):
+        self.name = name
+        self.version = version
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.max_entries = max_entries
+        self.stats = {"hit": 0, "stale": 0, "miss": 0, "refresh_ok": 0, "refresh_error": 0}
+        self._data: dict = {}  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+        self._key_locks: dict = {}  # key -> [Lock held while computing it, callers using it]
+        self._refreshing: set = set()
+        self._generation = 0
+        CACHES[name] = self
+
+    def _lookup(self, key, now: float):
+        """(value, state) with state in hit / stale / miss; caller holds _lock."""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING, "miss"
+        stored_at, value = entry
+        age = now - stored_at
+        if age >= self.hard_ttl:
+            del self._data[key]
+            return _MISSING, "miss"
+        return value, ("hit" if age < self.soft_ttl else "stale")
+
+    def _key(self, key):
+        return key if self.version is None else (self.version(), key)
+
+    def get(self, key, default=None):
+        key = self._key(key)
+        with self._lock:
+            value, _ = self._lookup(key, time.monotonic())
+        return default if value is _MISSING else value
+
+    def set(self, key, value):
+        key = self._key(key)
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        if key not in self._data and len(self._data) >= self.max_entries:
+            # dicts keep insertion order -> first key is the oldest
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic(), value)
+
+    def get_or_compute(self, key, compute):
+        key = self._key(key)
+        with self._lock:
+            value, state = self._lookup(key, time.monotonic())
+            self.stats[state] += 1
+            if state == "stale" and key not in self._refreshing:
+                self._refreshing.add(key)
+                _refresh_pool().submit(self._refresh, key, compute, self._generation)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = [threading.Lock(), 0]
+            key_lock[1] += 1
+        try:
+            with key_lock[0]:
+                with self._lock:
+                    value, _ = self._lookup(key, time.monotonic())
+                    generation = self._generation
+                if value is _MISSING:
+                    value = compute()
+                    with self._lock:
+                        if generation == self._generation:
+                            self._store(key, value)
+        finally:
+            # dropped by the last caller only: a waiter on this lock and a newcomer never compute side by side
+            with self._lock:
+                key_lock[1] -= 1
+                if not key_lock[1]:
+                    self._key_locks.pop(key, None)
+        return value
+
+    def _refresh(self, key, compute, generation: int):
+        try:
+            value = compute()
+        except Exception:
+            # keep serving the stale entry until hard_ttl
+            with self._lock:
+                self.stats["refresh_error"] += 1
+        else:
+            with self._lock:
+                # a clear() while refreshing means the value may predate new data
+                if generation == self._generation:
+                    self._store(key, value)
+                self.stats["refresh_ok"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def __len__(self):
+        return len(self._data)
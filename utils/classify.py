@@ -0,0 +1,112 @@
+# utils/classify.py
+
+from __future__ import annotations
+
+import numpy as np
+
+from utils import dataset_version
+from utils.cache import SWRCache
+
+BREAK_METHODS = ("quantile", "equal_interval", "jenks")
+MIN_CLASSES = 2
+MAX_CLASSES = 12
+
+# class breaks per normalized values query (same filters, no paging/projection)
+BREAKS_CACHE = SWRCache("breaks", soft_ttl=600, hard_ttl=3600, version=dataset_version.current)
+
+
+def parse_breaks_args(args):
+    """
+    classes=5                           -> number of classes (enables breaks)
+    breaks=quantile,equal_interval,jenks -> methods (default: all)
+
+    Returns (spec, error). spec is None when no breaks were requested.
+    """
+    classes = args.get("classes", type=int)
+    methods_raw = (args.get("breaks") or "").strip()
+    if classes is None and not methods_raw:
+        return None, None
+
+    classes = classes or 5
+    if not (MIN_CLASSES <= classes <= MAX_CLASSES):
+        return None, f"classes must be between {MIN_CLASSES} and {MAX_CLASSES}"
+
+    methods = [m.strip().lower() for m in methods_raw.split(",") if m.strip()] or list(BREAK_METHODS)
+    unknown = [m for m in methods if m not in BREAK_METHODS]
+    if unknown:
+        return None, f"Invalid breaks: {', '.join(unknown)}"
+
+    return {"classes": classes, "methods": tuple(methods)}, None
+
+
+def quantile_breaks(sorted_vals: np.ndarray, k: int) -> list[float]:
+    return np.quantile(sorted_vals, np.linspace(0.0, 1.0, k + 1)).tolist()
+
+
+def equal_interval_breaks(sorted_vals: np.ndarray, k: int) -> list[float]:
+    return np.linspace(sorted_vals[0], sorted_vals[-1], k + 1).tolist()
+
+
+def jenks_breaks(sorted_vals: np.ndarray, k: int, max_iter: int = 100) -> list[float]:
+    """
+    Natural breaks by minimizing within-class squared deviation (the Jenks
+    objective) with quantile-seeded 1-D k-means over the sorted values.
+
+    On sorted data every class is a contiguous slice, so class means come from
+    prefix sums and reassignment is a searchsorted of the centre midpoints:
+    each iteration is O(k log n) and the whole thing is dominated by the sort.
+    """
+    n = sorted_vals.size
+    k = min(k, np.unique(sorted_vals).size)
+    if k < 2:
+        return [float(sorted_vals[0]), float(sorted_vals[-1])]
+
+    csum = np.concatenate(([0.0], np.cumsum(sorted_vals, dtype=np.float64)))
+
+    qs = np.quantile(sorted_vals, np.linspace(0.0, 1.0, k + 1))
+    centers = (qs[:-1] + qs[1:]) / 2.0
+    bounds = None  # class i is sorted_vals[bounds[i]:bounds[i + 1]]
+
+    for _ in range(max_iter):
+        mids = (centers[:-1] + centers[1:]) / 2.0
+        new_bounds = np.searchsorted(sorted_vals, mids, side="right")
+        new_bounds = np.concatenate(([0], np.maximum.accumulate(new_bounds), [n]))
+        if bounds is not None and np.array_equal(new_bounds, bounds):
+            break
+        bounds = new_bounds
+
+        sizes = np.diff(bounds)
+        filled = sizes > 0
+        # an empty class keeps its previous centre
+        centers[filled] = (csum[bounds[1:]] - csum[bounds[:-1]])[filled] / sizes[filled]
+
+    # upper edge of each class = its largest member (Jenks convention)
+    uppers = [float(sorted_vals[b - 1]) for b in bounds[1:-1] if 0 < b < n]
+    return [float(sorted_vals[0]), *sorted(set(uppers)), float(sorted_vals[-1])]
+
+
+def compute_breaks(values, classes: int, methods=BREAK_METHODS) -> dict:
+    """Class breaks (k + 1 edges, min..max) for each requested method."""
+    arr = np.asarray([v for v in values if v is not None], dtype=np.float64)
+    arr = arr[np.isfinite(arr)]
+    if arr.size == 0:
+        return {"classes": classes, "count": 0, **{m: [] for m in methods}}
+
+    arr.sort()
+    out = {"classes": classes, "count": int(arr.size)}
+    for m in methods:
+        if m == "quantile":
+            out[m] = quantile_breaks(arr, classes)
+        elif m == "equal_interval":
+            out[m] = equal_interval_breaks(arr, classes)
+        elif m == "jenks":
+            out[m] = jenks_breaks(arr, classes)
+    return out
+
+
+def with_breaks(resp, breaks: dict):
+    """Attach breaks to a values response (plain list or paged envelope)."""
+    if isinstance(resp, list):
+        resp = {"items": resp}
+    resp["breaks"] = breaks
+    return resp
@@ -0,0 +1,290 @@
+# utils/columnar.py
+
+from __future__ import annotations
+
+import datetime as dt
+import functools
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from utils import dataset_version, db_utils
+from utils.instrumentation import record_query
+
+try:
+    import duckdb
+except ImportError:  # optional: without it every endpoint stays on Postgres
+    duckdb = None
+
+log = logging.getLogger(__name__)
+
+# endpoints whose queries run on DuckDB over the Parquet snapshot, e.g. "charts_values,charts_series"
+DUCKDB_ENDPOINTS = {s for s in os.environ.get("DUCKDB_ENDPOINTS", "").split(",") if s}
+DUCKDB_SNAPSHOT = os.environ.get(
+    "DUCKDB_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "parquet_snapshot")
+)
+# DuckDB worker threads per process (0 = DuckDB's default, one per core)
+DUCKDB_THREADS = int(os.environ.get("DUCKDB_THREADS", "0"))
+DUCKDB_MEMORY_LIMIT = os.environ.get("DUCKDB_MEMORY_LIMIT", "")
+# how often a stale / missing snapshot is looked for again on disk
+DUCKDB_RECHECK_S = float(os.environ.get("DUCKDB_RECHECK_S", "10"))
+
+FORMAT = 1
+
+# small dimensions, copied whole (geometry columns are left out)
+DIMENSIONS = ["dim_territory_en", "dim_time", "dim_energy_category", "dim_scenario"]
+
+# information_schema data_type -> DuckDB type, so CSV parsing never guesses (codes stay text)
+_TYPES = {
+    "smallint": "SMALLINT",
+    "integer": "INTEGER",
+    "bigint": "BIGINT",
+    "numeric": "DOUBLE",
+    "real": "DOUBLE",
+    "double precision": "DOUBLE",
+    "boolean": "BOOLEAN",
+    "date": "DATE",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMPTZ",
+}
+
+
+def _columns(cur, table: str) -> dict[str, str]:
+    """Column -> DuckDB type of an energy_dw table, without PostGIS columns."""
+    cur.execute("""
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'energy_dw'
+          AND table_name = %s
+          AND udt_name NOT IN ('geometry', 'geography')
+        ORDER BY ordinal_position;
+    """, (table,))
+    return {name: _TYPES.get(data_type, "VARCHAR") for name, data_type in cur.fetchall()}
+
+
+def _export(cur, con, sql: str, params: tuple, columns: dict[str, str], out: str, order_by: str = "") -> int:
+    """
+    COPY sql to a temporary CSV file, then have DuckDB rewrite it as one
+    Parquet file. Returns the row count (0 = nothing written).
+    """
+    with tempfile.NamedTemporaryFile("w+", suffix=".csv", encoding="utf-8") as tmp:
+        cur.copy_expert(f"COPY ({cur.mogrify(sql, params).decode('utf-8')}) TO STDOUT WITH (FORMAT csv)", tmp)
+        tmp.flush()
+        if not tmp.tell():
+            return 0
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        types = ", ".join(f"'{name}': '{typ}'" for name, typ in columns.items())
+        order = f" ORDER BY {order_by}" if order_by else ""
+        con.execute(f"""
+            COPY (SELECT * FROM read_csv('{tmp.name}', header = false, columns = {{{types}}}){order})
+            TO '{out}' (FORMAT parquet, COMPRESSION zstd);
+        """)
+        return con.execute(f"SELECT count(*) FROM read_parquet('{out}');").fetchone()[0]
+
+
+def build_snapshot(path: str = DUCKDB_SNAPSHOT, log=print) -> dict:
+    """
+    Export energy_dw to Parquet for the DuckDB backend: each dimension as
+    <table>.parquet, fact_energy partitioned hive-style as
+    fact_energy/data_source=<source>/year=<year>/data.parquet (rows sorted by
+    time and territory, so row-group statistics prune), and manifest.json
+    with the dataset version. The directory is swapped in whole.
+    """
+    if duckdb is None:
+        raise RuntimeError("duckdb is not installed (pip install duckdb)")
+
+    path = os.path.abspath(path)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    con = duckdb.connect()
+    conn = db_utils.get_connection()
+    conn.set_session(readonly=True)
+    cur = conn.cursor()
+    try:
+        # read the version first: data committed after it only makes the snapshot newer
+        version = dataset_version.read_version()
+        manifest = {
+            "format": FORMAT,
+            "dataset_version": version,
+            "built_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+            "dimensions": {},
+            "partitions": [],
+        }
+        for table in DIMENSIONS:
+            columns = _columns(cur, table)
+            cols = ", ".join(columns)
+            rows = _export(cur, con, f"SELECT {cols} FROM energy_dw.{table}", (), columns,
+                           os.path.join(tmp, f"{table}.parquet"))
+            manifest["dimensions"][table] = rows
+            log(f"{table}: {rows:,} rows")
+
+        # data_source / year come from the directory names
+        columns = {c: t for c, t in _columns(cur, "fact_energy").items() if c != "data_source"}
+        cols = ", ".join(f"f.{c}" for c in columns)
+        cur.execute("SELECT DISTINCT data_source FROM energy_dw.fact_energy ORDER BY 1;")
+        data_sources = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT DISTINCT year FROM energy_dw.dim_time ORDER BY 1;")
+        years = [r[0] for r in cur.fetchall()]
+
+        for data_source in data_sources:
+            for year in years:
+                started = time.perf_counter()
+                part = os.path.join("fact_energy", f"data_source={urllib.parse.quote(data_source, safe='')}",
+                                    f"year={year}", "data.parquet")
+                rows = _export(cur, con, f"""
+                    SELECT {cols}
+                    FROM energy_dw.fact_energy f
+                    JOIN energy_dw.dim_time tm ON tm.id = f.time_id
+                    WHERE f.data_source = %s
+                      AND tm.year = %s
+                """, (data_source, year), columns, os.path.join(tmp, part), order_by="time_id, territory_id")
+                if not rows:
+                    continue
+                manifest["partitions"].append({"data_source": data_source, "year": year, "file": part,
+                                               "rows": rows})
+                log(f"{data_source}/{year}: {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    finally:
+        cur.close()
+        conn.rollback()
+        conn.close()
+        con.close()
+
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+_PLACEHOLDER = re.compile(r"%([s%])")
+
+
+@functools.lru_cache(maxsize=256)
+def to_duckdb(query: str) -> str:
+    """psycopg2 paramstyle -> DuckDB: %s becomes ?, %% becomes %. ANY(%s) takes a list in both."""
+    return _PLACEHOLDER.sub(lambda m: "?" if m.group(1) == "s" else "%", query)
+
+
+class DuckEngine:
+    """
+    One in-memory DuckDB database per process over the Parquet snapshot:
+    dimensions loaded as tables, energy_dw.fact_energy a view over the
+    partition files, so the endpoints' SQL runs unchanged. DuckDB handles
+    don't survive a fork, so the database is opened lazily in each worker;
+    every thread queries through its own cursor. Like the cube, the snapshot
+    is only used while its dataset version is the current one.
+    """
+
+    def __init__(self, path: str = DUCKDB_SNAPSHOT):
+        self.path = path
+        self.version = None
+        self.stats = {"queries": 0, "fallbacks": 0}
+        self._con = None
+        self._pid = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def load(self) -> bool:
+        manifest_path = os.path.join(self.path, "manifest.json")
+        try:
+            mtime = os.stat(manifest_path).st_mtime
+            if mtime == self._mtime and self._pid == os.getpid():
+                return self._con is not None
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+        if manifest.get("format") != FORMAT or not manifest["partitions"]:
+            return False
+
+        con = duckdb.connect()
+        if DUCKDB_THREADS:
+            con.execute(f"SET threads = {DUCKDB_THREADS};")
+        if DUCKDB_MEMORY_LIMIT:
+            con.execute(f"SET memory_limit = '{DUCKDB_MEMORY_LIMIT}';")
+        con.execute("CREATE SCHEMA energy_dw;")
+        for table in manifest["dimensions"]:
+            con.execute(f"""
+                CREATE TABLE energy_dw.{table} AS
+                SELECT * FROM read_parquet('{os.path.join(self.path, table + ".parquet")}');
+            """)
+        files = [os.path.join(self.path, p["file"]) for p in manifest["partitions"]]
+        con.execute(f"""
+            CREATE VIEW energy_dw.fact_energy AS
+            SELECT * FROM read_parquet({files!r}, hive_partitioning = true, hive_types = {{'year': INTEGER}});
+        """)
+        # the previous database is left to the garbage collector: other threads may still be reading it
+        with self._lock:
+            self._con = con
+            self.version = manifest["dataset_version"]
+            self._mtime = mtime
+            self._pid = os.getpid()
+        return True
+
+    def ready(self) -> bool:
+        """True when queries can run on the snapshot; (re)opens it as needed."""
+        if self._pid != os.getpid():
+            # inherited from the master: never touch its handle
+            self._con, self._mtime, self._pid = None, None, os.getpid()
+            self._checked = 0.0
+        if self._con is None or self.version != dataset_version.current():
+            now = time.monotonic()
+            if now - self._checked >= DUCKDB_RECHECK_S:
+                self._checked = now
+                self.load()
+            if self._con is None or self.version != dataset_version.current():
+                return False
+        return True
+
+    def _cursor(self):
+        local = self._local
+        if getattr(local, "con", None) is not self._con:
+            local.con = self._con
+            local.cur = self._con.cursor()
+        return local.cur
+
+    def execute(self, query: str, params: tuple | None = None) -> tuple[list[str], list[tuple]]:
+        cur = self._cursor()
+        cur.execute(to_duckdb(query), list(params or ()))
+        rows = cur.fetchall()
+        return [d[0] for d in cur.description], rows
+
+
+ENGINE = DuckEngine() if duckdb is not None and DUCKDB_ENDPOINTS else None
+if DUCKDB_ENDPOINTS and duckdb is None:
+    log.warning("DUCKDB_ENDPOINTS is set but duckdb is not installed: %s stay on Postgres",
+                ", ".join(sorted(DUCKDB_ENDPOINTS)))
+
+
+def fetch_rows(query: str, params: tuple | None = None) -> tuple[list[str], list[tuple]]:
+    """db_utils.fetch_rows on DuckDB; falls back to Postgres while the snapshot is missing or stale."""
+    if ENGINE is None or not ENGINE.ready():
+        if ENGINE is not None:
+            ENGINE.stats["fallbacks"] += 1
+        return db_utils.fetch_rows(query, params)
+    t0 = time.perf_counter()
+    cols, rows = ENGINE.execute(query, params)
+    ENGINE.stats["queries"] += 1
+    record_query(query, 0.0, time.perf_counter() - t0, 0.0, len(rows))
+    return cols, rows
+
+
+def fetcher(endpoint: str):
+    """The fetch_rows an endpoint should use: DuckDB when listed in DUCKDB_ENDPOINTS, else Postgres."""
+    if ENGINE is not None and endpoint in DUCKDB_ENDPOINTS:
+        return fetch_rows
+    return db_utils.fetch_rows
@@ -0,0 +1,153 @@
+# utils/community.py
+
+from __future__ import annotations
+
+import csv
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.db_utils import fetch_rows
+from utils.indicators import HourlyProfiles, compute
+
+# keys written per territory (PARAM_META in api/scenarios.py)
+CSC_KEYS = ["community_self_consumption_mwh", "community_self_consumption_total_mwh"]
+
+# groupings built from the territory codes: level -> {grouping: parent code column}
+PARENT_GROUPINGS = {
+    "comune": {"province": "prov_cod", "region": "reg_cod"},
+    "province": {"region": "reg_cod"},
+}
+
+COMMUNITY_WORKERS = int(os.environ.get("COMMUNITY_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+
+def parent_labels(territory_ids: np.ndarray, grouping: str, level: str = "comune") -> np.ndarray:
+    """Group number of each territory: members of one province / region form one community."""
+    col = PARENT_GROUPINGS[level][grouping]
+    _, rows = fetch_rows(f"SELECT id, {col} FROM energy_dw.dim_territory_en WHERE id = ANY(%s);",
+                         ([int(t) for t in territory_ids],))
+    parent = dict(rows)
+    # territories without a parent code stay on their own
+    keys = [str(parent.get(int(t))) if parent.get(int(t)) is not None else f"#{t}" for t in territory_ids]
+    return np.unique(keys, return_inverse=True)[1]
+
+
+def cluster_labels(territory_ids: np.ndarray, path: str, level: str = "comune") -> np.ndarray:
+    """
+    Group number of each territory from a CSV of (code, community) rows, code
+    being mun_cod / prov_cod. Territories not listed are communities of one.
+    """
+    code_col = {"comune": "mun_cod", "province": "prov_cod", "region": "reg_cod"}[level]
+    with open(path, newline="", encoding="utf-8") as f:
+        community = {row[0].strip(): row[1].strip() for row in csv.reader(f) if len(row) >= 2}
+    _, rows = fetch_rows(f"SELECT id, {code_col} FROM energy_dw.dim_territory_en WHERE id = ANY(%s);",
+                         ([int(t) for t in territory_ids],))
+    code = {tid: str(c) for tid, c in rows}
+    keys = []
+    for t in territory_ids:
+        name = community.get(code.get(int(t), ""))
+        keys.append(f"c:{name}" if name else f"#{t}")
+    return np.unique(keys, return_inverse=True)[1]
+
+
+def _group_sum(a: np.ndarray, order: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Sum the rows of a per group; order sorts the rows by group, starts marks each group's first row."""
+    return np.add.reduceat(a[order], starts, axis=0)
+
+
+def community_self_consumption(surplus: np.ndarray, deficit: np.ndarray, slot_weights: np.ndarray,
+                               labels: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Net the members of each community per time slot. surplus / deficit are
+    (territory, slot) = max(p - c, 0) / max(c - p, 0) per typical-day hour,
+    slot_weights how often each slot occurs. In a slot a community shares
+    min(sum of surplus, sum of deficit); each member is credited its share
+    of the community's deficit. Returns per territory csc_mwh and per
+    community (in label order) csc_mwh, surplus_mwh, deficit_mwh, members.
+    """
+    order = np.argsort(labels, kind="stable")
+    starts = np.flatnonzero(np.r_[True, np.diff(labels[order]) != 0])
+    groups = labels[order][starts]
+
+    g_surplus = _group_sum(surplus, order, starts)  # (G, slot)
+    g_deficit = _group_sum(deficit, order, starts)
+    g_csc = np.minimum(g_surplus, g_deficit)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covered = np.where(g_deficit > 0, g_csc / g_deficit, 0.0)  # share of each member's deficit met
+
+    position = np.empty(labels.max() + 1, dtype=np.int64)
+    position[groups] = np.arange(groups.size)
+    csc = (deficit * covered[position[labels]]) @ slot_weights
+
+    return {
+        "csc_mwh": csc,
+        "community_csc_mwh": g_csc @ slot_weights,
+        "community_surplus_mwh": g_surplus @ slot_weights,
+        "community_deficit_mwh": g_deficit @ slot_weights,
+        "community_members": np.diff(np.r_[starts, labels.size]),
+    }
+
+
+class CommunityInputs:
+    """Per-slot surplus / deficit of every territory, the part every grouping shares."""
+
+    def __init__(self, profiles: HourlyProfiles, uplift_pct: float = 0.0):
+        c = profiles.consumption.reshape(len(profiles.territory_ids), -1)
+        p = profiles.production(uplift_pct).reshape(len(profiles.territory_ids), -1)
+        self.territory_ids = profiles.territory_ids
+        self.surplus = np.maximum(p - c, 0.0)
+        self.deficit = np.maximum(c - p, 0.0)
+        self.slot_weights = np.repeat(profiles.weights.reshape(-1), profiles.consumption.shape[-1])
+        self.indicators = compute(profiles.consumption, profiles.production(uplift_pct), profiles.weights)
+
+    def evaluate(self, labels: np.ndarray) -> dict:
+        """community_self_consumption() plus the per-territory metrics of CSC_KEYS and a summary."""
+        res = community_self_consumption(self.surplus, self.deficit, self.slot_weights, labels)
+        sc = self.indicators["self_consumption_mwh"]
+        consumption = self.indicators["consumption_mwh"].sum()
+        res["metrics"] = {
+            "community_self_consumption_mwh": res["csc_mwh"],
+            "community_self_consumption_total_mwh": sc + res["csc_mwh"],
+        }
+        res["summary"] = {
+            "communities": int(res["community_members"].size),
+            "self_consumption_mwh": float(sc.sum()),
+            "community_self_consumption_mwh": float(res["csc_mwh"].sum()),
+            # share of all demand met locally, alone or in a community
+            "self_sufficiency_index": float((sc.sum() + res["csc_mwh"].sum()) / consumption) if consumption else 0.0,
+        }
+        return res
+
+
+# worker processes read the inputs inherited at fork instead of receiving them per task
+_WORKER_INPUTS: CommunityInputs | None = None
+
+
+def _init_worker(inputs: CommunityInputs):
+    global _WORKER_INPUTS
+    _WORKER_INPUTS = inputs
+
+
+def _evaluate_in_worker(labels: np.ndarray) -> dict:
+    return _WORKER_INPUTS.evaluate(labels)
+
+
+def evaluate_groupings(inputs: CommunityInputs, groupings: dict[str, np.ndarray],
+                       workers: int = COMMUNITY_WORKERS) -> dict[str, dict]:
+    """
+    CommunityInputs.evaluate() for each grouping (name -> labels). With more
+    than one grouping and worker the groupings are spread over forked worker
+    processes, which share the inputs copy-on-write; only the labels and the
+    results cross the process boundary.
+    """
+    workers = min(workers, len(groupings))
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        return {name: inputs.evaluate(labels) for name, labels in groupings.items()}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                             initializer=_init_worker, initargs=(inputs,)) as pool:
+        results = pool.map(_evaluate_in_worker, groupings.values())
+        return dict(zip(groupings, results))
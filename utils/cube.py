@@ -0,0 +1,423 @@
+# utils/cube.py
+
+from __future__ import annotations
+
+import datetime as dt
+import io
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from utils import dataset_version
+
+# answer agg_* queries from the snapshot instead of SQL
+CUBE_ENABLED = os.environ.get("CUBE_ENABLED", "0") == "1"
+CUBE_SNAPSHOT = os.environ.get(
+    "CUBE_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cube_snapshot")
+)
+# how often a stale / missing snapshot is looked for again on disk
+CUBE_RECHECK_S = float(os.environ.get("CUBE_RECHECK_S", "10"))
+
+FORMAT = 1
+
+# (level, resolution) -> data_source; the agg_* sources of api/energy.py::_pick_data_source
+SOURCES = {
+    ("comune", "monthly"): "agg_comune_monthly",
+    ("comune", "annual"): "agg_comune_annual",
+    ("province", "hourly"): "agg_province_hourly",
+    ("province", "monthly"): "agg_province_monthly",
+    ("province", "annual"): "agg_province_annual",
+    ("region", "hourly"): "agg_region_hourly",
+    ("region", "monthly"): "agg_region_monthly",
+    ("region", "annual"): "agg_region_annual",
+}
+
+_NAME_COL = {"comune": "municipality_name", "province": "province_name", "region": "region_name"}
+
+def copy_frame(cur, sql: str, params: tuple):
+    """Run sql through COPY ... TO STDOUT and parse it with pandas (much faster than fetchall)."""
+    import pandas as pd
+
+    buf = io.StringIO()
+    cur.copy_expert(f"COPY ({cur.mogrify(sql, params).decode('utf-8')}) TO STDOUT WITH (FORMAT csv, HEADER)", buf)
+    buf.seek(0)
+    return pd.read_csv(buf, keep_default_na=True)
+
+
+def _axis(ids) -> tuple[np.ndarray, np.ndarray]:
+    """(sorted unique ids, position of each input id on that axis)."""
+    uniq, pos = np.unique(np.asarray(ids, dtype=np.int64), return_inverse=True)
+    return uniq, pos
+
+
+def _build_one(cur, level: str, resolution: str, data_source: str, path: str) -> dict | None:
+    facts = copy_frame(cur, """
+        SELECT f.scenario_id, f.time_id, f.category_id, f.territory_id,
+               COALESCE(SUM(f.value_mwh), 0) AS value_mwh
+        FROM energy_dw.fact_energy f
+        JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+        WHERE f.data_source = %s
+          AND f.time_resolution = %s
+          AND t.level = %s
+        GROUP BY 1, 2, 3, 4
+    """, (data_source, resolution, level))
+    if facts.empty:
+        return None
+
+    scenario_ids, s_pos = _axis(facts["scenario_id"])
+    time_ids, t_pos = _axis(facts["time_id"])
+    category_ids, c_pos = _axis(facts["category_id"])
+    territory_ids, n_pos = _axis(facts["territory_id"])
+
+    shape = (len(scenario_ids), len(time_ids), len(category_ids), len(territory_ids))
+    values = np.zeros(shape, dtype=np.float32)
+    values[s_pos, t_pos, c_pos, n_pos] = facts["value_mwh"].to_numpy(dtype=np.float32)
+    np.save(os.path.join(path, f"{level}_{resolution}.npy"), values)
+    # which cells had a fact row: SQL only returns territories / x values with data
+    present = np.zeros(shape, dtype=bool)
+    present[s_pos, t_pos, c_pos, n_pos] = True
+    np.save(os.path.join(path, f"{level}_{resolution}.rows.npy"), present)
+
+    cur.execute("SELECT id, code FROM energy_dw.dim_scenario WHERE id = ANY(%s);", (scenario_ids.tolist(),))
+    scen = dict(cur.fetchall())
+    cur.execute("""
+        SELECT id, year, month, day_type, hour, season FROM energy_dw.dim_time WHERE id = ANY(%s);
+    """, (time_ids.tolist(),))
+    times = {r[0]: list(r[1:]) for r in cur.fetchall()}
+    cur.execute("""
+        SELECT id, domain, base_group, code FROM energy_dw.dim_energy_category WHERE id = ANY(%s);
+    """, (category_ids.tolist(),))
+    cats = {r[0]: list(r[1:]) for r in cur.fetchall()}
+    cur.execute(f"""
+        SELECT id, {_NAME_COL[level]}, reg_cod, prov_cod, mun_cod
+        FROM energy_dw.dim_territory_en WHERE id = ANY(%s);
+    """, (territory_ids.tolist(),))
+    terr = {r[0]: list(r[1:]) for r in cur.fetchall()}
+
+    return {
+        "file": f"{level}_{resolution}.npy",
+        "rows_file": f"{level}_{resolution}.rows.npy",
+        "data_source": data_source,
+        "shape": list(values.shape),
+        "scenarios": [scen.get(i) for i in scenario_ids.tolist()],
+        "times": [[i, *times.get(i, [None] * 5)] for i in time_ids.tolist()],
+        "categories": [[i, *cats.get(i, [None] * 3)] for i in category_ids.tolist()],
+        "territories": [[i, *terr.get(i, [None] * 4)] for i in territory_ids.tolist()],
+    }
+
+
+def build_snapshot(path: str = CUBE_SNAPSHOT, sources: dict | None = None, log=print) -> dict:
+    """
+    Read every agg_* source into dense float32 arrays and write the snapshot
+    directory: one <level>_<resolution>.npy per source plus manifest.json with
+    the axes and the dataset version the data belongs to. The directory is
+    swapped in whole; processes that still map the old files keep reading them.
+    """
+    from utils.db_utils import get_connection
+
+    path = os.path.abspath(path)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    conn = get_connection()
+    conn.set_session(readonly=True)
+    cur = conn.cursor()
+    try:
+        # read the version first: data committed after it only makes the snapshot newer
+        version = dataset_version.read_version()
+        manifest = {
+            "format": FORMAT,
+            "dataset_version": version,
+            "built_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+            "cubes": {},
+        }
+        for (level, resolution), data_source in (sources or SOURCES).items():
+            started = time.perf_counter()
+            meta = _build_one(cur, level, resolution, data_source, tmp)
+            if meta is None:
+                log(f"{level}/{resolution}: no rows in {data_source}, skipped")
+                continue
+            manifest["cubes"][f"{level}_{resolution}"] = meta
+            mb = np.prod(meta["shape"]) * 4 / 1e6
+            log(f"{level}/{resolution}: {meta['shape']} ({mb:,.1f} MB) in {time.perf_counter() - started:.1f}s")
+    finally:
+        cur.close()
+        conn.rollback()
+        conn.close()
+
+    with open(os.path.join(tmp, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+
+    old = f"{path}.old-{os.getpid()}"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def _take(arr: np.ndarray, *indices: np.ndarray) -> np.ndarray:
+    """
+    arr[np.ix_(*indices)] over the leading axes, one axis at a time; a
+    contiguous run of positions is taken as a slice (a view of the mapped
+    file, no copy).
+    """
+    for axis, idx in enumerate(indices):
+        if idx.size and idx[-1] - idx[0] + 1 == idx.size:
+            sel = slice(int(idx[0]), int(idx[-1]) + 1)
+        else:
+            sel = idx
+        arr = arr[(slice(None),) * axis + (sel,)]
+    return arr
+
+
+class Cube:
+    """
+    One agg_* source as values[scenario, time, category, territory] (float32,
+    memory-mapped, 0 where there is no fact row) and present[...] (bool, which
+    cells had a row), plus the dimension attributes of each axis. Sums are
+    accumulated in float64.
+    """
+
+    def __init__(self, level: str, resolution: str, meta: dict, values: np.ndarray, present: np.ndarray):
+        self.level = level
+        self.resolution = resolution
+        self.values = values
+        self.present = present
+        self.scenario_index = {code: i for i, code in enumerate(meta["scenarios"])}
+
+        times = meta["times"]
+        self.t_year = np.array([t[1] for t in times], dtype=np.int32)
+        self.t_month = np.array([t[2] if t[2] is not None else 0 for t in times], dtype=np.int16)
+        self.t_day_type = np.array([t[3] or "" for t in times])
+        self.t_hour = np.array([t[4] if t[4] is not None else 0 for t in times], dtype=np.int16)
+        self.t_season = np.array([t[5] or "" for t in times])
+        self.t_attrs = {
+            "year": [t[1] for t in times],
+            "month": [t[2] for t in times],
+            "day_type": [t[3] for t in times],
+            "hour": [t[4] for t in times],
+            "season": [t[5] for t in times],
+        }
+
+        cats = meta["categories"]
+        self.c_domain = np.array([c[1] or "" for c in cats])
+        self.c_base_group = np.array([(c[2] or "").lower() for c in cats])
+        self.c_code = np.array([c[3] or "" for c in cats])
+
+        terr = meta["territories"]
+        self.n_id = [t[0] for t in terr]
+        self.n_dims = {
+            "name": [t[1] for t in terr],
+            "reg_cod": [t[2] for t in terr],
+            "prov_cod": [t[3] for t in terr],
+            "mun_cod": [t[4] for t in terr],
+        }
+        self.n_codes = {k: np.array(["" if v is None else str(v) for v in self.n_dims[k]]) for k in
+                        ("reg_cod", "prov_cod", "mun_cod")}
+
+    def _times(self, years=None, months=None, day_types=None, hours=None, shape: str | None = None) -> np.ndarray:
+        mask = np.ones(self.t_year.shape, dtype=bool)
+        if years:
+            mask &= np.isin(self.t_year, list(years))
+        if months is not None:
+            mask &= np.isin(self.t_month, list(months))
+        if day_types:
+            mask &= np.isin(self.t_day_type, list(day_types))
+        if hours:
+            mask &= np.isin(self.t_hour, list(hours))
+        if shape == "hourly":
+            mask &= self.t_hour > 0
+        elif shape in ("monthly", "season"):
+            mask &= (self.t_month > 0) & (self.t_hour == 0)
+            if shape == "season":
+                mask &= self.t_season != ""
+        elif shape == "annual":
+            mask &= (self.t_month == 0) & (self.t_hour == 0)
+        return np.flatnonzero(mask)
+
+    def _categories(self, domain: str | None = None, base_group: str = "", category_code: str = "") -> np.ndarray:
+        mask = np.ones(self.c_domain.shape, dtype=bool)
+        if domain:
+            mask &= self.c_domain == domain
+        if base_group:
+            mask &= self.c_base_group == base_group.lower()
+        if category_code:
+            mask &= self.c_code == category_code
+        return np.flatnonzero(mask)
+
+    def values_by_territory(self, scenario: str, years, domain: str, base_group: str, category_code: str,
+                            months, day_types, hours, dim_cols: list[str],
+                            order_by: str = "territory_id", order: str = "asc"):
+        """
+        /charts/values (unpaged): (cols, rows) exactly as fetch_rows returns
+        them for the SQL, i.e. territory_id, the dim_cols, value_mwh.
+        months=None means no month filter, [] means none match.
+        """
+        cols = ["territory_id", *dim_cols, "value_mwh"]
+        s = self.scenario_index.get(scenario)
+        t_idx = self._times(years, months, day_types, hours)
+        c_idx = self._categories(domain, base_group, category_code)
+        if s is None or not t_idx.size or not c_idx.size:
+            return cols, []
+
+        n = len(self.n_id)
+        present = np.flatnonzero(_take(self.present[s], t_idx, c_idx).reshape(-1, n).any(axis=0))
+        totals = np.add.reduce(_take(self.values[s], t_idx, c_idx).reshape(-1, n), axis=0, dtype=np.float64)
+        totals = totals[present]
+
+        if order_by == "value":
+            # value then territory_id, both in the requested direction
+            rank = np.lexsort((present, totals))
+            if order == "desc":
+                rank = rank[::-1]
+        else:
+            rank = np.arange(present.size)
+            if order == "desc":
+                rank = rank[::-1]
+        present = present[rank]
+
+        picked = present.tolist()
+        columns = [[self.n_id[i] for i in picked]]
+        columns += [[self.n_dims[c][i] for i in picked] for c in dim_cols]
+        columns.append(totals[rank].tolist())
+        return cols, list(zip(*columns))
+
+    def series(self, scenario: str, years, domain: str, base_group: str, category_code: str,
+               months, day_types, hours, code_field: str, code: str, group_keys: list[str]):
+        """/charts/series: rows of (*group_keys, x, value_mwh) ordered by the same keys."""
+        s = self.scenario_index.get(scenario)
+        t_idx = self._times(years, months, day_types, hours, shape=self.resolution)
+        c_idx = self._categories(domain, base_group, category_code)
+        n_idx = np.flatnonzero(self.n_codes[code_field] == str(code))
+        if s is None or not t_idx.size or not c_idx.size or not n_idx.size:
+            return []
+
+        present = _take(self.present[s], t_idx, c_idx, n_idx).any(axis=(1, 2))
+        totals = _take(self.values[s], t_idx, c_idx, n_idx).sum(axis=(1, 2), dtype=np.float64)
+
+        x_key = {"hourly": "hour", "monthly": "month", "annual": "year"}[self.resolution]
+        keys = [self.t_attrs[k] for k in (*group_keys, x_key)]
+        points: dict[tuple, float] = {}
+        for j, t in enumerate(t_idx.tolist()):
+            if present[j]:
+                k = tuple(col[t] for col in keys)
+                points[k] = points.get(k, 0.0) + float(totals[j])
+        return [(*k, v) for k, v in sorted(points.items())]
+
+    def preview(self, scenario: str, year: int, x_key: str, uplift_categories: list[str]):
+        """
+        /scenarios/preview base rows: (territory_id, name, reg_cod, prov_cod,
+        mun_cod, x, consumption, production_total, production_uplift_base)
+        ordered by territory_id, x. x_key is year, month or season.
+        """
+        s = self.scenario_index.get(scenario)
+        shape = {"year": "annual", "month": "monthly", "season": "season"}[x_key]
+        t_idx = self._times([year], shape=shape)
+        if s is None or not t_idx.size:
+            return []
+
+        sub = _take(self.values[s], t_idx)  # (T, C, N)
+        present_t = _take(self.present[s], t_idx).any(axis=1)  # (T, N)
+
+        def _total(c_idx):
+            if not c_idx.size:
+                return np.zeros(present_t.shape)
+            return _take(sub.swapaxes(0, 1), c_idx).sum(axis=0, dtype=np.float64)
+
+        cons = _total(self._categories("consumption"))
+        prod = _total(self._categories("production"))
+        if uplift_categories:
+            up_idx = np.flatnonzero((self.c_domain == "production") & np.isin(self.c_code, uplift_categories))
+            uplift = _total(up_idx)
+        else:
+            uplift = prod
+
+        xs_of_t = [self.t_attrs[x_key][t] for t in t_idx.tolist()]
+        xs = sorted(set(xs_of_t))
+        group = np.zeros((len(xs), len(xs_of_t)))
+        group[[xs.index(x) for x in xs_of_t], np.arange(len(xs_of_t))] = 1.0
+
+        present = (group @ present_t) > 0  # (X, N)
+        cons_g, prod_g, up_g = group @ cons, group @ prod, group @ uplift
+
+        n_sel, x_sel = np.nonzero(present.T)  # territory-major, like ORDER BY territory_id, x
+        d = self.n_dims
+        return [
+            (self.n_id[n], d["name"][n], d["reg_cod"][n], d["prov_cod"][n], d["mun_cod"][n], xs[x], c, p, u)
+            for n, x, c, p, u in zip(
+                n_sel.tolist(), x_sel.tolist(),
+                cons_g[x_sel, n_sel].tolist(), prod_g[x_sel, n_sel].tolist(), up_g[x_sel, n_sel].tolist(),
+            )
+        ]
+
+
+class CubeEngine:
+    """
+    The snapshot of one process. Files are opened with mmap_mode="r", so
+    every worker maps the same page-cache pages. A cube is only handed out
+    while the snapshot's dataset version is the current one; otherwise the
+    caller falls back to SQL until a newer snapshot shows up on disk.
+    """
+
+    def __init__(self, path: str = CUBE_SNAPSHOT):
+        self.path = path
+        self.version = None
+        self.cubes: dict[tuple[str, str], Cube] = {}
+        self.stats = {"hits": 0, "fallbacks": 0}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        manifest_path = os.path.join(self.path, "manifest.json")
+        try:
+            mtime = os.stat(manifest_path).st_mtime
+            if mtime == self._mtime:
+                return bool(self.cubes)
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+        if manifest.get("format") != FORMAT:
+            return False
+
+        cubes = {}
+        for key, meta in manifest["cubes"].items():
+            level, resolution = key.split("_", 1)
+            values = np.load(os.path.join(self.path, meta["file"]), mmap_mode="r")
+            present = np.load(os.path.join(self.path, meta["rows_file"]), mmap_mode="r")
+            cubes[(level, resolution)] = Cube(level, resolution, meta, values, present)
+        with self._lock:
+            self.cubes = cubes
+            self.version = manifest["dataset_version"]
+            self._mtime = mtime
+        return True
+
+    def get(self, level: str, resolution: str) -> Cube | None:
+        if self.version != dataset_version.current():
+            now = time.monotonic()
+            if now - self._checked >= CUBE_RECHECK_S:
+                self._checked = now
+                self.load()
+            if self.version != dataset_version.current():
+                self.stats["fallbacks"] += 1
+                return None
+        cube = self.cubes.get((level, resolution))
+        self.stats["hits" if cube is not None else "fallbacks"] += 1
+        return cube
+
+
+ENGINE = CubeEngine() if CUBE_ENABLED else None
+
+
+def cube_for(level: str, resolution: str) -> Cube | None:
+    """The cube for an agg_* source, or None to use SQL (disabled, not built, stale)."""
+    if ENGINE is None or (level, resolution) not in SOURCES:
+        return None
+    return ENGINE.get(level, resolution)
@@ -0,0 +1,176 @@
+# utils/dataset_version.py
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2.errors
+from flask import make_response, request
+
+from utils import db_utils
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "energy_dw_dataset_version"
+# LISTEN for bumps in a background thread (one per process); 0 = poll instead
+DATASET_VERSION_LISTEN = os.environ.get("DATASET_VERSION_LISTEN", "1") == "1"
+# without the listener: re-read the version at most this often
+# with it: re-read it this often anyway, in case a notification was missed
+DATASET_VERSION_POLL_S = float(os.environ.get("DATASET_VERSION_POLL_S", "30"))
+
+_VERSION_SQL = "SELECT version FROM energy_dw.dataset_version WHERE id = 1;"
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version: int | None = None
+        self.read_at = 0.0
+        self.listener_pid: int | None = None
+        self.callbacks: list = []
+
+
+_state = _State()
+
+
+def read_version() -> int:
+    """Version from the table; 0 until sql/dataset_version.sql has been applied."""
+    try:
+        _, rows = db_utils.fetch_rows(_VERSION_SQL)
+    except psycopg2.errors.UndefinedTable:
+        return 0
+    return rows[0][0] if rows else 0
+
+
+def _set_version(version: int):
+    with _state.lock:
+        changed = _state.version is not None and version != _state.version
+        _state.version = version
+        _state.read_at = time.monotonic()
+        callbacks = list(_state.callbacks) if changed else []
+    for fn in callbacks:
+        try:
+            fn(version)
+        except Exception:
+            log.exception("dataset version callback")
+
+
+def _listen():
+    while True:
+        conn = None
+        try:
+            conn = db_utils.get_connection()
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {CHANNEL};")
+            _set_version(read_version())
+            while True:
+                if select.select([conn], [], [], DATASET_VERSION_POLL_S) == ([], [], []):
+                    _set_version(read_version())
+                    continue
+                conn.poll()
+                latest = None
+                while conn.notifies:
+                    latest = int(conn.notifies.pop(0).payload)
+                if latest is not None:
+                    _set_version(latest)
+        except Exception:
+            log.exception("dataset version listener, reconnecting in 5 s")
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def _ensure_listener():
+    pid = os.getpid()
+    if _state.listener_pid == pid:
+        return
+    with _state.lock:
+        if _state.listener_pid == pid:
+            return
+        # a forked worker inherits the master's state but not its thread
+        _state.listener_pid = pid
+        _state.version = None
+    threading.Thread(target=_listen, name="dataset-version-listener", daemon=True).start()
+
+
+def current() -> int:
+    """The dataset version this process currently sees."""
+    if DATASET_VERSION_LISTEN:
+        _ensure_listener()
+        stale = _state.version is None
+    else:
+        stale = _state.version is None or time.monotonic() - _state.read_at > DATASET_VERSION_POLL_S
+    if stale:
+        _set_version(read_version())
+    return _state.version
+
+
+def on_change(fn):
+    """Call fn(new_version) whenever the version moves (from the listener thread)."""
+    with _state.lock:
+        _state.callbacks.append(fn)
+    return fn
+
+
+def bump_version(cur, reason: str) -> int:
+    """
+    Bump the version on an open cursor, inside the caller's transaction (the
+    NOTIFY goes out on commit). Returns the new version, or 0 if
+    sql/dataset_version.sql has not been applied.
+    """
+    cur.execute("SELECT to_regproc('energy_dw.bump_dataset_version') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return 0
+    cur.execute("SELECT energy_dw.bump_dataset_version(%s);", (reason,))
+    return cur.fetchone()[0]
+
+
+def bump(reason: str) -> int:
+    """bump_version in its own transaction; this process sees the new version right away."""
+    conn = db_utils.get_connection()
+    try:
+        cur = conn.cursor()
+        version = bump_version(cur, reason)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    if version:
+        _set_version(version)
+    return version
+
+
+def request_etag(version: int | None = None) -> str:
+    """Strong ETag for this request's URL at the given (default: current) dataset version."""
+    version = current() if version is None else version
+    digest = hashlib.sha1(request.full_path.encode("utf-8")).hexdigest()[:16]
+    return f"v{version}-{digest}"
+
+
+def etagged(view):
+    """
+    ETag = dataset version + URL. A matching If-None-Match gets a 304 before
+    the view runs, so revalidating an unchanged response costs no query.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = request_etag()
+        if request.if_none_match.contains(etag):
+            resp = make_response("", 304)
+        else:
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200:
+                return resp
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = "no-cache"
+        return resp
+
+    return wrapper
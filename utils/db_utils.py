@@ -1,8 +1,21 @@
 # utils/db_utils.py
 
+import time
+
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import execute_values
 from config import DB_CONFIG
+from utils.instrumentation import record_query
+from utils.slow_queries import SAMPLER
+
+# NUMERIC results (SUM(value_mwh), param_value, ...) arrive as float, not Decimal
+DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    "DEC2FLOAT",
+    lambda value, cur: float(value) if value is not None else None,
+)
+psycopg2.extensions.register_type(DEC2FLOAT)
 
 
 def get_connection():
@@ -10,35 +23,56 @@ def get_connection():
     return psycopg2.connect(**DB_CONFIG)
 
 
-def fetch_query(query: str, params: tuple | None = None):
-    """Run SELECT and return list[dict]."""
+def fetch_rows(query: str, params: tuple | None = None) -> tuple[list[str], list[tuple]]:
+    """Run SELECT and return (column names, row tuples) without building dicts."""
+    t0 = time.perf_counter()
     conn = get_connection()
+    t1 = time.perf_counter()
     cur = conn.cursor()
     cur.execute(query, params or ())
+    t2 = time.perf_counter()
     rows = cur.fetchall()
+    t3 = time.perf_counter()
     cols = [d[0] for d in cur.description]
+    rendered = cur.query
     cur.close()
     conn.close()
+    record_query(query, t1 - t0, t2 - t1, t3 - t2, len(rows))
+    SAMPLER.maybe_capture(query, params, rendered, t3 - t1)
+    return cols, rows
+
+
+def fetch_query(query: str, params: tuple | None = None):
+    """Run SELECT and return list[dict]."""
+    cols, rows = fetch_rows(query, params)
     return [dict(zip(cols, r)) for r in rows]
 
 
 def execute_query(query: str, params: tuple | None = None):
     """Run INSERT/UPDATE/DELETE."""
+    t0 = time.perf_counter()
     conn = get_connection()
+    t1 = time.perf_counter()
     cur = conn.cursor()
     cur.execute(query, params or ())
     conn.commit()
+    t2 = time.perf_counter()
     cur.close()
     conn.close()
+    record_query(query, t1 - t0, t2 - t1, 0.0, 0)
 
 
 def bulk_insert_values(query_with_values_placeholder: str, rows: list[tuple], page_size: int = 5000):
     """Fast bulk insert using execute_values. Query must contain VALUES %s."""
     if not rows:
         return
+    t0 = time.perf_counter()
     conn = get_connection()
+    t1 = time.perf_counter()
     cur = conn.cursor()
     execute_values(cur, query_with_values_placeholder, rows, page_size=page_size)
     conn.commit()
+    t2 = time.perf_counter()
     cur.close()
     conn.close()
+    record_query(query_with_values_placeholder, t1 - t0, t2 - t1, 0.0, len(rows))
@@ -0,0 +1,71 @@
+# utils/fastjson.py
+
+from __future__ import annotations
+
+import datetime as dt
+import decimal
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _default(o):
+    """Types neither encoder handles natively (orjson covers datetime and numpy itself)."""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (dt.date, dt.time)):
+        return o.isoformat()
+    if np is not None:
+        if isinstance(o, np.generic):
+            return o.item()
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(obj, default=_default, option=_OPTS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+
+    loads = orjson.loads
+else:
+    def dumps_bytes(obj, sort_keys: bool = False) -> bytes:
+        return json.dumps(obj, default=_default, sort_keys=sort_keys, separators=(",", ":"),
+                          ensure_ascii=False).encode("utf-8")
+
+    loads = json.loads
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider on orjson when installed (stdlib otherwise), with
+    Decimal / date / numpy support. Responses are built from the encoded
+    bytes directly, and keys stay sorted like Flask's default provider.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_bytes(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys)).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj), mimetype=self.mimetype)
+
+    def dump_bytes(self, obj) -> bytes:
+        return dumps_bytes(obj, sort_keys=self.sort_keys)
@@ -1,7 +1,33 @@
-from datetime import datetime
 from flask import request
+import numpy as np
 import pandas as pd
 
+SEASONS = ("winter", "spring", "summer", "autumn")
+DAY_TYPES = ("weekday", "weekend")
+
+month_to_season = {
+    12: "winter", 1: "winter", 2: "winter",
+    3: "spring", 4: "spring", 5: "spring",
+    6: "summer", 7: "summer", 8: "summer",
+    9: "autumn", 10: "autumn", 11: "autumn"
+}
+
+
+def filter_months(months, seasons) -> list[int] | None:
+    """Months to filter on, seasons narrowed to their months; None = no filter, [] = nothing matches."""
+    month_set = set(months or ())
+    if seasons:
+        season_set = {m for m, s in month_to_season.items() if s in seasons}
+        return sorted((month_set & season_set) if month_set else season_set)
+    return sorted(month_set) if month_set else None
+
+
+# month number (index 1..12) -> position in SEASONS
+_SEASON_OF_MONTH = np.array(
+    [-1] + [SEASONS.index(month_to_season[m]) for m in range(1, 13)], dtype=np.int8
+)
+
+
 def parse_filters():
     filters = {
         "years": request.args.getlist("year"),
@@ -20,34 +46,101 @@ def parse_filters():
 
     return filters
 
-def apply_filters(df, filters):
+
+def build_calendar(df, date_col: str = "date") -> dict:
+    """
+    Parse `date_col` once into compact calendar arrays aligned with df's rows:
+    year (int16), month / hour / dow / season (int8) and a `valid` mask for
+    unparseable dates. Reuse the result across apply_filters calls on the same
+    frame instead of re-parsing the dates every time.
+    """
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    valid = dates.notna().to_numpy()
+
+    # NaT -> 0 so the int casts are safe; `valid` masks those rows out
+    year = dates.dt.year.fillna(0).to_numpy(dtype=np.int16)
+    month = dates.dt.month.fillna(0).to_numpy(dtype=np.int8)
+
+    return {
+        "valid": valid,
+        "year": year,
+        "month": month,
+        "hour": dates.dt.hour.fillna(0).to_numpy(dtype=np.int8),
+        "dow": dates.dt.weekday.fillna(0).to_numpy(dtype=np.int8),
+        "season": _SEASON_OF_MONTH[month],
+    }
+
+
+def filter_mask(calendar: dict, filters: dict) -> np.ndarray:
+    """Single boolean row mask for the year/month/hour/day_type/season filters."""
+    mask = calendar["valid"].copy()
+
+    if filters.get("years"):
+        mask &= np.isin(calendar["year"], filters["years"])
+
+    if filters.get("months"):
+        mask &= np.isin(calendar["month"], filters["months"])
+
+    if filters.get("hours"):
+        mask &= np.isin(calendar["hour"], filters["hours"])
+
+    day_types = set(filters.get("day_types") or ())
+    if day_types and not day_types.issuperset(DAY_TYPES):
+        weekend = calendar["dow"] >= 5
+        if "weekend" in day_types:
+            mask &= weekend
+        elif "weekday" in day_types:
+            mask &= ~weekend
+        else:
+            mask[:] = False
+
+    if filters.get("seasons"):
+        codes = [SEASONS.index(s) for s in filters["seasons"] if s in SEASONS]
+        mask &= np.isin(calendar["season"], codes)
+
+    return mask
+
+
+def apply_filters(df, filters, calendar: dict | None = None):
+    """
+    Filter rows of df by its `date` column. Does not modify df; the only copy
+    made is the final row selection. Pass a `build_calendar(df)` result to
+    skip date parsing on repeated calls.
+    """
     if "date" not in df.columns:
         return df  # skip filtering if no date column
 
-    df["date"] = pd.to_datetime(df["date"], errors='coerce')
-    df = df.dropna(subset=["date"])
+    if calendar is None:
+        calendar = build_calendar(df)
+
+    return df[filter_mask(calendar, filters)]
+
 
-    if filters["years"]:
-        df = df[df["date"].dt.year.isin(filters["years"])]
+def filters_to_sql(filters: dict, time_alias: str = "tm") -> tuple[str, list]:
+    """
+    Push the same filters down to SQL over energy_dw.dim_time columns.
+    Returns (where_sql, params); where_sql is "TRUE" when nothing is filtered.
+    """
+    where_parts = []
+    params = []
 
-    if filters["months"]:
-        df = df[df["date"].dt.month.isin(filters["months"])]
+    if filters.get("years"):
+        where_parts.append(f"{time_alias}.year = ANY(%s)")
+        params.append(list(filters["years"]))
 
-    if filters["hours"]:
-        df = df[df["date"].dt.hour.isin(filters["hours"])]
+    months = filter_months(filters.get("months"), filters.get("seasons"))
+    if months == []:
+        return "FALSE", []
+    if months:
+        where_parts.append(f"{time_alias}.month = ANY(%s)")
+        params.append(months)
 
-    if filters["day_types"]:
-        df["day_type"] = df["date"].dt.weekday.apply(lambda x: "weekend" if x >= 5 else "weekday")
-        df = df[df["day_type"].isin(filters["day_types"])]
+    if filters.get("hours"):
+        where_parts.append(f"{time_alias}.hour = ANY(%s)")
+        params.append(list(filters["hours"]))
 
-    if filters["seasons"]:
-        month_to_season = {
-            12: "winter", 1: "winter", 2: "winter",
-            3: "spring", 4: "spring", 5: "spring",
-            6: "summer", 7: "summer", 8: "summer",
-            9: "autumn", 10: "autumn", 11: "autumn"
-        }
-        df["season"] = df["date"].dt.month.map(month_to_season)
-        df = df[df["season"].isin(filters["seasons"])]
+    if filters.get("day_types"):
+        where_parts.append(f"{time_alias}.day_type = ANY(%s)")
+        params.append(list(filters["day_types"]))
 
-    return df
+    return (" AND ".join(where_parts) if where_parts else "TRUE"), params
@@ -0,0 +1,204 @@
+# utils/indicators.py
+
+from __future__ import annotations
+
+import calendar
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from utils import dataset_version, db_utils
+from utils.cube import copy_frame
+
+# keys written per territory, same as api/scenarios.py::_calc_indicators
+INDICATOR_KEYS = [
+    "consumption_mwh", "production_mwh", "self_consumption_mwh", "over_production_mwh",
+    "uncovered_demand_mwh", "self_consumption_index", "self_sufficiency_index", "over_production_index",
+]
+
+DAY_TYPES = ("weekday", "weekend")
+
+# level -> fact_energy filter on the hourly rows: raw profiles for comuni, hourly aggregates above
+_HOURLY_SOURCE = {
+    "comune": "f.data_source NOT LIKE 'agg_%%' AND f.data_source NOT LIKE 'future_production_%%'",
+    "province": "f.data_source = 'agg_province_hourly'",
+    "region": "f.data_source = 'agg_region_hourly'",
+}
+
+
+def day_weights(year: int) -> np.ndarray:
+    """(12, 2) number of weekdays / weekend days of each month: how often each typical day occurs."""
+    weights = np.zeros((12, 2))
+    for m in range(12):
+        for day in range(1, calendar.monthrange(year, m + 1)[1] + 1):
+            weights[m, int(calendar.weekday(year, m + 1, day) >= 5)] += 1
+    return weights
+
+
+class HourlyProfiles:
+    """
+    Typical-day profiles of one level / year / scenario, each an array
+    (territory, month, day_type, hour) = (N, 12, 2, 24) in MWh:
+    consumption, production_total and production_uplift (the production of
+    the categories an uplift applies to; all production when none given).
+    Slots without a fact row are 0.
+    """
+
+    def __init__(self, territory_ids: np.ndarray, consumption: np.ndarray, production_total: np.ndarray,
+                 production_uplift: np.ndarray, year: int, by_category: dict[str, np.ndarray] | None = None):
+        self.territory_ids = territory_ids
+        self.consumption = consumption
+        self.production_total = production_total
+        self.production_uplift = production_uplift
+        self.year = year
+        self.weights = day_weights(year)
+        # production of single categories, when asked for (load_profiles(categories=...))
+        self.by_category = by_category or {}
+
+    def production(self, uplift_pct: float = 0.0) -> np.ndarray:
+        """production_total + production_uplift * uplift_pct / 100, like /scenarios/preview."""
+        if not uplift_pct:
+            return self.production_total
+        return self.production_total + self.production_uplift * (uplift_pct / 100.0)
+
+
+def load_profiles(level: str, year: int, scenario: str, uplift_categories: list[str] | None = None,
+                  cur=None, categories: list[str] | None = None) -> HourlyProfiles:
+    """
+    Read the hourly rows of every territory of the level in one COPY, pivoted
+    into arrays. categories: production codes also returned one by one
+    (HourlyProfiles.by_category).
+    """
+    categories = list(categories or ())
+    uplift_sql = "AND ec.code = ANY(%s)" if uplift_categories else ""
+    params = [*([list(uplift_categories)] if uplift_categories else []), *categories, level, year, scenario]
+    category_cols = "".join(
+        f",\n          COALESCE(SUM(CASE WHEN ec.domain = 'production' AND ec.code = %s THEN f.value_mwh END), 0)"
+        f" AS category_{i}"
+        for i in range(len(categories))
+    )
+    sql = f"""
+        SELECT
+          f.territory_id,
+          tm.month,
+          tm.day_type,
+          tm.hour,
+          COALESCE(SUM(CASE WHEN ec.domain = 'consumption' THEN f.value_mwh END), 0) AS consumption,
+          COALESCE(SUM(CASE WHEN ec.domain = 'production' THEN f.value_mwh END), 0) AS production_total,
+          COALESCE(SUM(CASE WHEN ec.domain = 'production' {uplift_sql} THEN f.value_mwh END), 0)
+            AS production_uplift{category_cols}
+        FROM energy_dw.fact_energy f
+        JOIN energy_dw.dim_territory_en t ON t.id = f.territory_id
+        JOIN energy_dw.dim_time tm ON tm.id = f.time_id
+        JOIN energy_dw.dim_energy_category ec ON ec.id = f.category_id
+        JOIN energy_dw.dim_scenario sc ON sc.id = f.scenario_id
+        WHERE t.level = %s
+          AND f.time_resolution = 'hourly'
+          AND tm.year = %s
+          AND tm.hour IS NOT NULL
+          AND sc.code = %s
+          AND {_HOURLY_SOURCE[level]}
+        GROUP BY 1, 2, 3, 4
+    """
+
+    conn = None
+    if cur is None:
+        conn = db_utils.get_connection()
+        conn.set_session(readonly=True)
+        cur = conn.cursor()
+    try:
+        frame = copy_frame(cur, sql, tuple(params))
+    finally:
+        if conn is not None:
+            cur.close()
+            conn.rollback()
+            conn.close()
+
+    territory_ids, n_pos = np.unique(frame["territory_id"].to_numpy(dtype=np.int64), return_inverse=True)
+    m_pos = frame["month"].to_numpy(dtype=np.int64) - 1
+    d_pos = (frame["day_type"].to_numpy() == DAY_TYPES[1]).astype(np.int64)
+    h_pos = frame["hour"].to_numpy(dtype=np.int64) - 1
+
+    def _pivot(col):
+        a = np.zeros((territory_ids.size, 12, 2, 24))
+        a[n_pos, m_pos, d_pos, h_pos] = frame[col].to_numpy(dtype=np.float64)
+        return a
+
+    by_category = {code: _pivot(f"category_{i}") for i, code in enumerate(categories)}
+    return HourlyProfiles(territory_ids, _pivot("consumption"), _pivot("production_total"),
+                          _pivot("production_uplift"), year, by_category)
+
+
+def compute(consumption: np.ndarray, production: np.ndarray, weights: np.ndarray,
+            by_month: bool = False) -> dict[str, np.ndarray]:
+    """
+    SC / OP / UD and the indexes from hourly profiles (..., 12, 2, 24): energy
+    is matched hour by hour, so a midday surplus no longer covers the evening
+    demand as it does with min(c, p) on totals. Each typical day counts as
+    many times as it occurs (weights, (12, 2)). Returns arrays of shape (...,)
+    or (..., 12) with by_month.
+    """
+    def total(a):
+        daily = a.sum(axis=-1) * weights  # (..., 12, 2)
+        return daily.sum(axis=-1) if by_month else daily.sum(axis=(-1, -2))
+
+    c = total(consumption)
+    p = total(production)
+    sc = total(np.minimum(consumption, production))
+    op = p - sc  # = sum of max(p - c, 0) per hour
+    ud = c - sc
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sci = np.where(p > 0, sc / p, 0.0)
+        ssi = np.where(c > 0, sc / c, 0.0)
+        opi = np.where(p > 0, op / p, 0.0)
+
+    return dict(zip(INDICATOR_KEYS, (c, p, sc, op, ud, sci, ssi, opi)))
+
+
+def scenario_indicators(profiles: HourlyProfiles, uplift_pct: float = 0.0,
+                        by_month: bool = False) -> dict[str, np.ndarray]:
+    """compute() for every territory of the profiles with the uplift applied."""
+    return compute(profiles.consumption, profiles.production(uplift_pct), profiles.weights, by_month)
+
+
+def param_rows(scenario_id: int, year: int, territory_ids, metrics: dict[str, np.ndarray],
+               notes: str | None = None, keys: list[str] = INDICATOR_KEYS) -> list[tuple]:
+    """fact_scenario_param rows (scenario_id, territory_id, param_key, param_value, unit, year, notes)."""
+    ids = [int(t) for t in territory_ids]
+    rows = []
+    for k in keys:
+        unit = "MWh" if k.endswith("_mwh") else "ratio"
+        rows += [(scenario_id, tid, k, v, unit, year, notes) for tid, v in zip(ids, metrics[k].tolist())]
+    return rows
+
+
+def persist(scenario_id: int, year: int, territory_ids, metrics: dict[str, np.ndarray],
+            notes: str | None = None, reason: str | None = None, keys: list[str] = INDICATOR_KEYS) -> int:
+    """
+    Replace the keys' rows (default INDICATOR_KEYS) of these territories for (scenario, year)
+    in fact_scenario_param and bump the dataset version, in one transaction.
+    Returns the number of rows written.
+    """
+    rows = param_rows(scenario_id, year, territory_ids, metrics, notes, keys)
+    conn = db_utils.get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            DELETE FROM energy_dw.fact_scenario_param
+            WHERE scenario_id = %s
+              AND year = %s
+              AND territory_id = ANY(%s)
+              AND param_key = ANY(%s);
+        """, (scenario_id, year, [int(t) for t in territory_ids], list(keys)))
+        execute_values(cur, """
+            INSERT INTO energy_dw.fact_scenario_param
+              (scenario_id, territory_id, param_key, param_value, unit, year, notes)
+            VALUES %s;
+        """, rows, page_size=5000)
+        dataset_version.bump_version(cur, reason or f"indicators scenario {scenario_id} {year}")
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    return len(rows)
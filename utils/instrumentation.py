@@ -0,0 +1,306 @@
+# utils/instrumentation.py
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Blueprint, Response, g, has_request_context, jsonify, request
+
+from utils.cache import CACHES
+from utils.fastjson import FastJSONProvider
+
+# histogram upper bounds in seconds (+Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# per-request phases, in Server-Timing order
+PHASES = ("db_connect", "db_execute", "db_fetch", "app", "serialize")
+
+_WS_RE = re.compile(r"\s+")
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_NUM_RE = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL with literals replaced by ? and whitespace collapsed."""
+    sql = _STR_RE.sub("?", sql)
+    sql = _NUM_RE.sub("?", sql)
+    return _WS_RE.sub(" ", sql).strip().rstrip(";").strip()
+
+
+_FINGERPRINTS: dict[str, tuple[str, str]] = {}
+
+
+def fingerprint(sql: str) -> tuple[str, str]:
+    """(12-char id, normalized SQL); the same statement shape always gets the same id."""
+    hit = _FINGERPRINTS.get(sql)
+    if hit is None:
+        norm = normalize_sql(sql)
+        hit = (hashlib.sha1(norm.encode("utf-8")).hexdigest()[:12], norm)
+        if len(_FINGERPRINTS) < 10000:
+            _FINGERPRINTS[sql] = hit
+    return hit
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (not thread-safe by itself)."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for le, n in zip((*BUCKETS, float("inf")), self.counts):
+            total += n
+            yield le, total
+
+
+class Registry:
+    """Process-wide query and request statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries: dict[str, dict] = {}
+        self.requests: dict[str, dict] = {}
+        self.flights: dict[str, dict] = {}
+
+    def record_query(self, sql: str, connect_s: float, execute_s: float, fetch_s: float, rows: int):
+        fp, norm = fingerprint(sql)
+        with self._lock:
+            q = self.queries.get(fp)
+            if q is None:
+                q = self.queries[fp] = {"sql": norm, "hist": Histogram(), "rows": 0, "connect": 0.0}
+            q["hist"].observe(execute_s + fetch_s)
+            q["rows"] += rows
+            q["connect"] += connect_s
+        return fp
+
+    def record_flight(self, sql: str, coalesced: bool):
+        fp, norm = fingerprint(sql)
+        with self._lock:
+            f = self.flights.get(fp)
+            if f is None:
+                f = self.flights[fp] = {"sql": norm, "leader": 0, "coalesced": 0}
+            f["coalesced" if coalesced else "leader"] += 1
+        t = _timings()
+        if t is not None and coalesced:
+            t["coalesced"] += 1
+
+    def record_request(self, endpoint: str, total_s: float, phases: dict):
+        with self._lock:
+            r = self.requests.get(endpoint)
+            if r is None:
+                r = self.requests[endpoint] = {"hist": Histogram(), "phases": dict.fromkeys(PHASES, 0.0)}
+            r["hist"].observe(total_s)
+            for k in PHASES:
+                r["phases"][k] += phases.get(k, 0.0)
+
+    def reset(self):
+        with self._lock:
+            self.queries.clear()
+            self.requests.clear()
+            self.flights.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "queries": [
+                    {
+                        "fingerprint": fp,
+                        "sql": q["sql"],
+                        "count": q["hist"].count,
+                        "total_ms": round(q["hist"].sum * 1000, 3),
+                        "mean_ms": round(q["hist"].sum * 1000 / q["hist"].count, 3) if q["hist"].count else 0.0,
+                        "rows": q["rows"],
+                    }
+                    for fp, q in sorted(self.queries.items(), key=lambda kv: -kv[1]["hist"].sum)
+                ],
+                "requests": {
+                    ep: {
+                        "count": r["hist"].count,
+                        "total_ms": round(r["hist"].sum * 1000, 3),
+                        "phases_ms": {k: round(v * 1000, 3) for k, v in r["phases"].items()},
+                    }
+                    for ep, r in sorted(self.requests.items())
+                },
+                "single_flight": [
+                    {"fingerprint": fp, "sql": f["sql"], "leader": f["leader"], "coalesced": f["coalesced"]}
+                    for fp, f in sorted(self.flights.items(), key=lambda kv: -kv[1]["coalesced"])
+                ],
+                "caches": {
+                    name: {**c.stats, "entries": len(c)} for name, c in sorted(CACHES.items())
+                },
+            }
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def hist(name, labels, h):
+            for le, n in h.cumulative():
+                le_s = "+Inf" if le == float("inf") else repr(le)
+                lines.append(f'{name}_bucket{{{labels},le="{le_s}"}} {n}')
+            lines.append(f"{name}_sum{{{labels}}} {h.sum!r}")
+            lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+        with self._lock:
+            lines.append("# HELP energy_query_duration_seconds Execute + fetch time per query fingerprint.")
+            lines.append("# TYPE energy_query_duration_seconds histogram")
+            for fp, q in sorted(self.queries.items()):
+                hist("energy_query_duration_seconds", f'fingerprint="{fp}"', q["hist"])
+
+            lines.append("# HELP energy_query_rows_total Rows returned per query fingerprint.")
+            lines.append("# TYPE energy_query_rows_total counter")
+            for fp, q in sorted(self.queries.items()):
+                lines.append(f'energy_query_rows_total{{fingerprint="{fp}"}} {q["rows"]}')
+
+            lines.append("# HELP energy_query_connect_seconds_total Connection wait per query fingerprint.")
+            lines.append("# TYPE energy_query_connect_seconds_total counter")
+            for fp, q in sorted(self.queries.items()):
+                lines.append(f'energy_query_connect_seconds_total{{fingerprint="{fp}"}} {q["connect"]!r}')
+
+            lines.append("# HELP energy_request_duration_seconds Request latency per endpoint.")
+            lines.append("# TYPE energy_request_duration_seconds histogram")
+            for ep, r in sorted(self.requests.items()):
+                hist("energy_request_duration_seconds", f'endpoint="{ep}"', r["hist"])
+
+            lines.append("# HELP energy_request_phase_seconds_total Request time per endpoint and phase.")
+            lines.append("# TYPE energy_request_phase_seconds_total counter")
+            for ep, r in sorted(self.requests.items()):
+                for k, v in r["phases"].items():
+                    lines.append(f'energy_request_phase_seconds_total{{endpoint="{ep}",phase="{k}"}} {v!r}')
+
+            lines.append("# HELP energy_singleflight_calls_total Shared reads per query fingerprint; "
+                         "coalesced calls waited for an identical query already in flight.")
+            lines.append("# TYPE energy_singleflight_calls_total counter")
+            for fp, f in sorted(self.flights.items()):
+                for k in ("leader", "coalesced"):
+                    lines.append(f'energy_singleflight_calls_total{{fingerprint="{fp}",result="{k}"}} {f[k]}')
+
+        caches = sorted(CACHES.items())
+        lines.append("# HELP energy_cache_requests_total Cache lookups; stale ones were served while refreshing.")
+        lines.append("# TYPE energy_cache_requests_total counter")
+        for name, c in caches:
+            for k in ("hit", "stale", "miss"):
+                lines.append(f'energy_cache_requests_total{{cache="{name}",result="{k}"}} {c.stats[k]}')
+
+        lines.append("# HELP energy_cache_refreshes_total Background refreshes of stale entries.")
+        lines.append("# TYPE energy_cache_refreshes_total counter")
+        for name, c in caches:
+            for k in ("ok", "error"):
+                lines.append(f'energy_cache_refreshes_total{{cache="{name}",result="{k}"}} {c.stats["refresh_" + k]}')
+
+        lines.append("# HELP energy_cache_entries Entries held per cache.")
+        lines.append("# TYPE energy_cache_entries gauge")
+        for name, c in caches:
+            lines.append(f'energy_cache_entries{{cache="{name}"}} {len(c)}')
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _timings() -> dict | None:
+    if not has_request_context():
+        return None
+    return g.get("_timings")
+
+
+def record_query(sql: str, connect_s: float, execute_s: float, fetch_s: float, rows: int):
+    """Called by utils.db_utils for every statement it runs."""
+    REGISTRY.record_query(sql, connect_s, execute_s, fetch_s, rows)
+    t = _timings()
+    if t is not None:
+        t["db_connect"] += connect_s
+        t["db_execute"] += execute_s
+        t["db_fetch"] += fetch_s
+        t["queries"] += 1
+
+
+class InstrumentedJSONProvider(FastJSONProvider):
+    """FastJSONProvider that books encoding time to the request's serialize phase."""
+
+    def _timed(self, fn, obj, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(obj, **kwargs)
+        finally:
+            t = _timings()
+            if t is not None:
+                t["serialize"] += time.perf_counter() - t0
+
+    def dumps(self, obj, **kwargs):
+        return self._timed(super().dumps, obj, **kwargs)
+
+    def dump_bytes(self, obj):
+        return self._timed(super().dump_bytes, obj)
+
+
+def _before_request():
+    g._timings = {"start": time.perf_counter(), "queries": 0, "coalesced": 0, **dict.fromkeys(PHASES, 0.0)}
+
+
+def _after_request(response):
+    t = g.pop("_timings", None)
+    if t is None:
+        return response
+
+    total = time.perf_counter() - t["start"]
+    t["app"] = max(total - t["db_connect"] - t["db_execute"] - t["db_fetch"] - t["serialize"], 0.0)
+    endpoint = request.endpoint or "unmatched"
+    if not endpoint.startswith(("debug.", "slow_queries.", "warmup.")):
+        REGISTRY.record_request(endpoint, total, t)
+
+    parts = [f"{k.replace('_', '-')};dur={t[k] * 1000:.2f}" for k in PHASES]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    parts.append(f'queries;desc="{t["queries"]}"')
+    if t["coalesced"]:
+        parts.append(f'coalesced;desc="{t["coalesced"]}"')
+    response.headers["Server-Timing"] = ", ".join(parts)
+    return response
+
+
+debug_bp = Blueprint("debug", __name__)
+
+
+@debug_bp.get("/metrics")
+def metrics():
+    """
+    GET /debug/metrics            Prometheus text format
+    GET /debug/metrics?format=json  same data with the normalized SQL per fingerprint
+    Same access rule as /debug/slow-queries (ADMIN_TOKEN or localhost).
+    """
+    from utils.slow_queries import _authorized
+
+    if not _authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
+    if request.args.get("format") == "json":
+        return jsonify(REGISTRY.snapshot())
+    return Response(REGISTRY.prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+def init_app(app):
+    """
+    Request timing hooks, Server-Timing header, JSON timing, /debug/metrics
+    and /debug/slow-queries (utils/slow_queries.py).
+    """
+    from utils.slow_queries import slow_queries_bp
+
+    app.json = InstrumentedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.register_blueprint(debug_bp, url_prefix="/debug")
+    app.register_blueprint(slow_queries_bp, url_prefix="/debug")
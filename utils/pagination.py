@@ -0,0 +1,116 @@
+# utils/pagination.py
+
+from __future__ import annotations
+
+MAX_LIMIT = 10000
+ALLOWED_ORDER_BY = {"territory_id", "value"}
+ALLOWED_ORDER = {"asc", "desc"}
+
+
+def parse_page_args(args, allowed_fields: list[str]):
+    """
+    Parse projection / keyset pagination params shared by the choropleth endpoints:
+
+      fields=name,value_mwh     -> only these keys (territory_id is always returned)
+      limit=50                  -> page size (also used for top-N)
+      order_by=territory_id|value
+      order=asc|desc            -> default asc for territory_id, desc for value
+      after=<territory_id>      -> keyset cursor (last territory_id of previous page)
+      after_value=<float>       -> keyset cursor value, required with order_by=value
+
+    Returns (page, error). error is a message suitable for a 400 response.
+    """
+    fields_raw = (args.get("fields") or "").strip()
+    fields = None
+    if fields_raw:
+        fields = [f.strip() for f in fields_raw.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            return None, f"Invalid fields: {', '.join(unknown)}"
+        if "territory_id" not in fields:
+            fields.insert(0, "territory_id")
+
+    order_by = (args.get("order_by") or "territory_id").lower().strip()
+    if order_by not in ALLOWED_ORDER_BY:
+        return None, "Invalid order_by"
+
+    order = (args.get("order") or ("desc" if order_by == "value" else "asc")).lower().strip()
+    if order not in ALLOWED_ORDER:
+        return None, "Invalid order"
+
+    limit = args.get("limit", type=int)
+    if limit is not None and not (0 < limit <= MAX_LIMIT):
+        return None, f"limit must be between 1 and {MAX_LIMIT}"
+
+    after = args.get("after", type=int)
+    after_value = args.get("after_value", type=float)
+    if order_by == "value" and after is not None and after_value is None:
+        return None, "after_value is required with order_by=value"
+
+    return {
+        "fields": fields,
+        "limit": limit,
+        "order_by": order_by,
+        "order": order,
+        "after": after,
+        "after_value": after_value,
+    }, None
+
+
+def is_paged(page: dict) -> bool:
+    return page["limit"] is not None or page["after"] is not None
+
+
+def wants(page: dict, field: str) -> bool:
+    return page["fields"] is None or field in page["fields"]
+
+
+def page_clauses(page: dict, value_col: str) -> tuple[str, str, list]:
+    """
+    Build WHERE / ORDER BY / LIMIT for an outer query over a subquery exposing
+    `territory_id` and `value_col`. Keyset on (value, territory_id) when ordering
+    by value so ties never skip or repeat rows between pages.
+    """
+    direction = "DESC" if page["order"] == "desc" else "ASC"
+    op = "<" if page["order"] == "desc" else ">"
+
+    where_parts = []
+    params: list = []
+
+    if page["order_by"] == "value":
+        # NULL values have no rank
+        where_parts.append(f"{value_col} IS NOT NULL")
+        if page["after"] is not None:
+            where_parts.append(f"({value_col}, territory_id) {op} (%s, %s)")
+            params += [page["after_value"], page["after"]]
+        order_sql = f"{value_col} {direction}, territory_id {direction}"
+    else:
+        if page["after"] is not None:
+            where_parts.append(f"territory_id {op} %s")
+            params.append(page["after"])
+        order_sql = f"territory_id {direction}"
+
+    where_sql = " AND ".join(where_parts) if where_parts else "TRUE"
+    tail_sql = f"ORDER BY {order_sql}"
+    if page["limit"] is not None:
+        tail_sql += " LIMIT %s"
+        params.append(page["limit"])
+
+    return where_sql, tail_sql, params
+
+
+def page_response(items: list[dict], page: dict, value_key: str, last_row: dict | None = None):
+    """
+    Wrap a page of items. `next` is the cursor for the following page,
+    or None when this page is the last one.
+    """
+    if not is_paged(page):
+        return items
+
+    nxt = None
+    if page["limit"] is not None and len(items) == page["limit"] and last_row is not None:
+        nxt = {"after": last_row["territory_id"]}
+        if page["order_by"] == "value":
+            nxt["after_value"] = last_row[value_key]
+
+    return {"items": items, "next": nxt}
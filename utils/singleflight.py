@@ -0,0 +1,104 @@
+# utils/singleflight.py
+
+from __future__ import annotations
+
+import threading
+
+from utils.db_utils import fetch_rows
+from utils.instrumentation import REGISTRY
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution: the first
+    caller runs fn, callers arriving while it is in flight wait and get the same
+    result (or the same exception). Nothing is kept once the call finishes, so
+    this is not a cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+
+    def do(self, key, fn):
+        """Returns (result, shared); shared is True for callers that did not run fn."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_FLIGHTS = SingleFlight()
+
+
+def _freeze(value):
+    """Hashable form of query params (lists for ANY(%s) become tuples)."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def fetch_rows_shared(query: str, params: tuple | None = None, fetch=None) -> tuple[list[str], list[tuple]]:
+    """
+    fetch_rows for read endpoints: identical (query, params) in flight at the
+    same time run once. The row list is shared between callers, don't mutate it.
+    fetch replaces db_utils.fetch_rows (utils.columnar.fetcher).
+    """
+    fetch = fetch or fetch_rows
+    (cols, rows), shared = _FLIGHTS.do((query, _freeze(params)), lambda: fetch(query, params))
+    REGISTRY.record_flight(query, shared)
+    return cols, rows
+
+
+def fetch_query_shared(query: str, params: tuple | None = None):
+    """fetch_query on top of fetch_rows_shared; every caller gets its own dicts."""
+    cols, rows = fetch_rows_shared(query, params)
+    return [dict(zip(cols, r)) for r in rows]
+
+
+def fetch_rows_cached(cache, query: str, params: tuple | None = None,
+                      fetch=None) -> tuple[list[str], list[tuple]]:
+    """fetch_rows_shared through a cache keyed by (query, params)."""
+    return cache.get_or_compute((query, _freeze(params)), lambda: fetch_rows_shared(query, params, fetch))
+
+
+def fetch_query_cached(cache, query: str, params: tuple | None = None):
+    """fetch_query_shared through a cache keyed by (query, params)."""
+    cols, rows = fetch_rows_cached(cache, query, params)
+    return [dict(zip(cols, r)) for r in rows]
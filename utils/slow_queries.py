@@ -0,0 +1,199 @@
+# utils/slow_queries.py
+
+from __future__ import annotations
+
+import datetime as dt
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, has_request_context, jsonify, request
+
+from utils.instrumentation import fingerprint
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "500"))
+# entries kept in the ring buffer
+SLOW_QUERY_BUFFER = int(os.environ.get("SLOW_QUERY_BUFFER", "100"))
+# at most this many EXPLAINs per minute, process-wide ...
+SLOW_QUERY_PER_MINUTE = int(os.environ.get("SLOW_QUERY_PER_MINUTE", "6"))
+# ... and at most one per fingerprint in this window
+SLOW_QUERY_COOLDOWN_S = float(os.environ.get("SLOW_QUERY_COOLDOWN_S", "300"))
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.environ.get("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+# required as X-Admin-Token on /debug/slow-queries; unset = localhost only
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+_READ_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE_RE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|DROP|ALTER)\b", re.IGNORECASE)
+
+
+def _is_read_only(sql: str) -> bool:
+    return bool(_READ_RE.match(sql)) and not _WRITE_RE.search(sql)
+
+
+def _jsonable(params) -> list:
+    out = []
+    for p in params or ():
+        if isinstance(p, (str, int, float, bool, type(None))):
+            out.append(p)
+        elif isinstance(p, (list, tuple)):
+            out.append(_jsonable(p))
+        else:
+            out.append(repr(p))
+    return out
+
+
+class SlowQuerySampler:
+    """
+    Keeps the last N slow SELECTs with their rendered SQL, parameters and an
+    EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) plan.
+
+    EXPLAIN ANALYZE runs the query again, so capture is throttled (per minute
+    and per fingerprint), runs on one background thread in a read-only
+    transaction that is rolled back, and is skipped while a previous plan is
+    still being taken. The request that hit the slow query never waits for it.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, size: int = SLOW_QUERY_BUFFER,
+                 per_minute: int = SLOW_QUERY_PER_MINUTE, cooldown_s: float = SLOW_QUERY_COOLDOWN_S):
+        self.threshold_ms = threshold_ms
+        self.per_minute = per_minute
+        self.cooldown_s = cooldown_s
+        self.entries: deque = deque(maxlen=size)
+        self.stats = {"slow": 0, "captured": 0, "throttled": 0, "explain_errors": 0}
+        self._lock = threading.Lock()
+        self._recent: deque = deque()
+        self._last_by_fp: dict[str, float] = {}
+        self._busy = False
+        self._executor: ThreadPoolExecutor | None = None
+        self._pid: int | None = None
+
+    def _executor_for_pid(self) -> ThreadPoolExecutor:
+        """
+        The EXPLAIN thread of this process, created lazily (call with _lock held).
+        A forked worker inherits the parent's executor without its thread, and
+        possibly _busy set for a plan that will never finish there: start over.
+        """
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+            self._pid = os.getpid()
+            self._busy = False
+        return self._executor
+
+    def maybe_capture(self, query: str, params, rendered: bytes | str | None, seconds: float):
+        """Called by utils.db_utils.fetch_query after every statement; cheap unless slow."""
+        if seconds * 1000 < self.threshold_ms or not _is_read_only(query):
+            return
+
+        fp, _ = fingerprint(query)
+        now = time.monotonic()
+        with self._lock:
+            executor = self._executor_for_pid()
+            self.stats["slow"] += 1
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if (
+                self._busy
+                or len(self._recent) >= self.per_minute
+                or now - self._last_by_fp.get(fp, float("-inf")) < self.cooldown_s
+            ):
+                self.stats["throttled"] += 1
+                return
+            self._recent.append(now)
+            self._last_by_fp[fp] = now
+            self._busy = True
+            self.stats["captured"] += 1
+
+        if isinstance(rendered, bytes):
+            rendered = rendered.decode("utf-8", errors="replace")
+        entry = {
+            "captured_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+            "fingerprint": fp,
+            "duration_ms": round(seconds * 1000, 2),
+            "endpoint": request.full_path if has_request_context() else None,
+            "sql": rendered or query,
+            "query": query,
+            "params": _jsonable(params),
+            "plan": None,
+            "explain_ms": None,
+            "error": None,
+        }
+        with self._lock:
+            self.entries.appendleft(entry)
+        executor.submit(self._explain, entry, query, params)
+
+    def _explain(self, entry: dict, query: str, params):
+        from utils.db_utils import get_connection
+
+        conn = None
+        try:
+            conn = get_connection()
+            conn.set_session(readonly=True)
+            cur = conn.cursor()
+            cur.execute("SET LOCAL statement_timeout = %s;", (SLOW_QUERY_EXPLAIN_TIMEOUT_MS,))
+            t0 = time.perf_counter()
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params or ())
+            entry["plan"] = cur.fetchone()[0]
+            entry["explain_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+            cur.close()
+        except Exception as e:
+            entry["error"] = str(e).strip()
+            with self._lock:
+                self.stats["explain_errors"] += 1
+        finally:
+            if conn is not None:
+                conn.rollback()
+                conn.close()
+            with self._lock:
+                self._busy = False
+
+    def snapshot(self, limit: int | None = None, plans: bool = True) -> list[dict]:
+        with self._lock:
+            entries = list(self.entries)[:limit]
+        if not plans:
+            entries = [{k: v for k, v in e.items() if k != "plan"} for e in entries]
+        return entries
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self._last_by_fp.clear()
+
+
+SAMPLER = SlowQuerySampler()
+
+slow_queries_bp = Blueprint("slow_queries", __name__)
+
+
+def _authorized() -> bool:
+    if ADMIN_TOKEN:
+        return request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+@slow_queries_bp.get("/slow-queries")
+def list_slow_queries():
+    """
+    GET /debug/slow-queries?limit=20&plans=0
+    Newest first. plans=0 leaves out the EXPLAIN JSON.
+    """
+    if not _authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
+    limit = request.args.get("limit", type=int)
+    plans = request.args.get("plans", "1") != "0"
+    return jsonify({
+        "threshold_ms": SAMPLER.threshold_ms,
+        "stats": dict(SAMPLER.stats),
+        "entries": SAMPLER.snapshot(limit, plans),
+    })
+
+
+@slow_queries_bp.delete("/slow-queries")
+def clear_slow_queries():
+    if not _authorized():
+        return jsonify({"error": "Forbidden"}), 403
+    SAMPLER.clear()
+    return jsonify({"status": "ok"})
@@ -0,0 +1,91 @@
+# utils/sweep.py
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.indicators import compute
+
+SWEEP_WORKERS = int(os.environ.get("SWEEP_WORKERS", str(min(4, os.cpu_count() or 1))))
+# profile cells x sweep points below which the sweep runs in the request thread (pool overhead > math)
+SWEEP_POOL_MIN_CELLS = int(os.environ.get("SWEEP_POOL_MIN_CELLS", "20000000"))
+# where the base arrays are written for the workers to map; tmpfs when there is one
+SWEEP_TMPDIR = os.environ.get("SWEEP_TMPDIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _sweep_pool() -> ProcessPoolExecutor:
+    """
+    Shared pool, created lazily once per process. Workers are spawned, not
+    forked: the API process runs threads (gunicorn, cache refresh, dataset
+    version listener) and forking it mid-request is unsafe.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=SWEEP_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _point(arrays: dict[str, np.ndarray], weights: np.ndarray, combination: list[str], uplift_pct: float,
+           keys: list[str]) -> dict[str, np.ndarray]:
+    """Indicators of every territory for one (uplift categories, uplift_pct) point of the grid."""
+    production = arrays["production_total"]
+    if uplift_pct:
+        # no categories = the uplift applies to all production, like /scenarios/preview
+        base = sum(arrays[f"category:{c}"] for c in combination) if combination else production
+        production = production + base * (uplift_pct / 100.0)
+    metrics = compute(arrays["consumption"], production, weights)
+    return {k: metrics[k] for k in keys}
+
+
+def _point_in_worker(folder: str, names: list[str], weights: np.ndarray, combination: list[str],
+                     uplift_pct: float, keys: list[str]) -> dict[str, np.ndarray]:
+    # memory-mapped: every worker reads the same page-cache pages, nothing is pickled per task
+    arrays = {name: np.load(os.path.join(folder, f"{i}.npy"), mmap_mode="r") for i, name in enumerate(names)}
+    return _point(arrays, weights, combination, uplift_pct, keys)
+
+
+def run_sweep(consumption: np.ndarray, production_total: np.ndarray, by_category: dict[str, np.ndarray],
+              weights: np.ndarray, combinations: list[list[str]], uplifts: list[float],
+              keys: list[str]) -> dict[str, np.ndarray]:
+    """
+    Evaluate the grid combinations x uplifts over base profiles computed once
+    ((territory, ...) arrays as in utils.indicators.compute). Returns key ->
+    array (combination, territory, uplift). Large grids fan the points out to
+    the worker pool, the base arrays shared through memory-mapped files.
+    """
+    arrays = {"consumption": consumption, "production_total": production_total,
+              **{f"category:{c}": a for c, a in by_category.items()}}
+    points = [(c, u) for c in combinations for u in uplifts]
+
+    if SWEEP_WORKERS <= 1 or consumption.size * len(points) < SWEEP_POOL_MIN_CELLS:
+        results = [_point(arrays, weights, c, u, keys) for c, u in points]
+    else:
+        folder = tempfile.mkdtemp(prefix="sweep-", dir=SWEEP_TMPDIR)
+        try:
+            names = list(arrays)
+            for i, name in enumerate(names):
+                np.save(os.path.join(folder, f"{i}.npy"), arrays[name])
+            pool = _sweep_pool()
+            futures = [pool.submit(_point_in_worker, folder, names, weights, c, u, keys) for c, u in points]
+            results = [f.result() for f in futures]
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    n = consumption.shape[0]
+    return {
+        k: np.array([r[k] for r in results]).reshape(len(combinations), len(uplifts), n).transpose(0, 2, 1)
+        for k in keys
+    }
@@ -0,0 +1,176 @@
+# utils/warmup.py
+
+from __future__ import annotations
+
+import gc
+import logging
+import os
+import threading
+import time
+
+from flask import Blueprint, current_app, jsonify
+
+from utils import dataset_version
+from utils.cache import CACHES
+from utils.db_utils import fetch_rows
+
+log = logging.getLogger(__name__)
+
+# hot combinations: every level x domain for the latest year of the baseline scenario
+WARM_LEVELS = [s for s in os.environ.get("WARM_LEVELS", "region,province,comune").split(",") if s]
+WARM_DOMAINS = [s for s in os.environ.get("WARM_DOMAINS", "consumption,production").split(",") if s]
+WARM_SCENARIO = os.environ.get("WARM_SCENARIO", "0")
+WARM_PARAM_KEYS = [s for s in os.environ.get("WARM_PARAM_KEYS", "consumption_mwh,production_mwh").split(",") if s]
+# empty = latest year in dim_time
+WARM_YEAR = int(os.environ["WARM_YEAR"]) if os.environ.get("WARM_YEAR") else None
+# run warm() when app.py is imported (gunicorn --preload warms once, before the fork)
+CACHE_WARM = os.environ.get("CACHE_WARM", "0") == "1"
+# seconds between refresher checks for new data; 0 = no refresher
+CACHE_REFRESH_S = float(os.environ.get("CACHE_REFRESH_S", "300"))
+
+def _latest_year() -> int | None:
+    _, rows = fetch_rows("SELECT MAX(year) FROM energy_dw.dim_time;")
+    return rows[0][0] if rows else None
+
+
+def hot_urls(year: int | None = None) -> list[str]:
+    """The requests warm() replays, from the WARM_* settings."""
+    year = year or WARM_YEAR or _latest_year()
+    urls = ["/scenarios", "/scenarios/param-keys"]
+    urls += [f"/map/territories?level={lv}" for lv in WARM_LEVELS]
+    if year is None:
+        return urls
+    for lv in WARM_LEVELS:
+        urls += [
+            f"/charts/values?level={lv}&resolution=annual&domain={d}&year={year}&scenario={WARM_SCENARIO}"
+            for d in WARM_DOMAINS
+        ]
+        urls += [
+            f"/scenarios/values?level={lv}&scenario={WARM_SCENARIO}&year={year}&param_key={k}"
+            for k in WARM_PARAM_KEYS
+        ]
+    return urls
+
+
+def clear_caches():
+    """Drop every in-process response cache."""
+    for cache in CACHES.values():
+        cache.clear()
+
+
+def warm(app) -> dict:
+    """
+    Replay hot_urls() through the test client so the geometry, dimension and
+    response caches are filled. Failures are logged, never raised: a cold
+    cache only costs latency.
+    """
+    started = time.perf_counter()
+    done, failed = 0, []
+    try:
+        urls = hot_urls()
+    except Exception:
+        log.exception("cache warm-up: could not build the request list")
+        return {"requests": 0, "failed": [], "seconds": 0.0}
+
+    client = app.test_client()
+    for url in urls:
+        try:
+            resp = client.get(url)
+            if resp.status_code == 200:
+                done += 1
+            else:
+                failed.append(url)
+        except Exception:
+            log.exception("cache warm-up: %s", url)
+            failed.append(url)
+
+    seconds = round(time.perf_counter() - started, 3)
+    log.info("cache warm-up: %d/%d requests in %.1f s", done, len(urls), seconds)
+    return {"requests": done, "failed": failed, "seconds": seconds}
+
+
+def warm_for_preload(app) -> dict:
+    """
+    warm() in the master process before workers fork. gc.freeze() moves the
+    cached objects out of the collector's generations so workers don't touch
+    (and copy) their pages on every GC pass.
+    """
+    result = warm(app)
+    gc.collect()
+    gc.freeze()
+    return result
+
+
+class CacheRefresher:
+    """
+    Background thread that re-warms the caches after a data load. It wakes
+    up when the dataset version moves (utils/dataset_version.py) or every
+    interval; on a new version the old entries are dropped and the hot
+    requests replayed.
+    """
+
+    def __init__(self, app, interval_s: float = CACHE_REFRESH_S):
+        self.app = app
+        self.interval_s = interval_s
+        self.last = None
+        self._stamp = None
+        self._force = False
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval_s <= 0 or self._thread is not None:
+            return self
+        dataset_version.on_change(lambda version: self._wake.set())
+        self._thread = threading.Thread(target=self._run, name="cache-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def trigger(self):
+        """Re-warm now (e.g. right after a load script)."""
+        self._force = True
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            force, self._force = self._force, False
+            try:
+                stamp = dataset_version.current()
+                if force or stamp != self._stamp:
+                    if self._stamp is not None:
+                        clear_caches()
+                    self.last = warm(self.app)
+                    self._stamp = stamp
+            except Exception:
+                log.exception("cache refresher")
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+
+
+REFRESHER: CacheRefresher | None = None
+
+
+def start_refresher(app) -> CacheRefresher:
+    """Start the refresher once per process (in gunicorn: per worker, after the fork)."""
+    global REFRESHER
+    if REFRESHER is None:
+        REFRESHER = CacheRefresher(app).start()
+    return REFRESHER
+
+
+warmup_bp = Blueprint("warmup", __name__)
+
+
+@warmup_bp.post("/cache/warm")
+def rewarm():
+    """
+    POST /debug/cache/warm
+    Clears and re-warms this process's caches (same auth as /debug/slow-queries).
+    """
+    from utils.slow_queries import _authorized
+
+    if not _authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
+    clear_caches()
+    return jsonify(warm(current_app._get_current_object()))